@@ -0,0 +1,257 @@
+"""
+ASGI エントリポイント
+
+main.py と同じ Flask アプリケーション（ルート・計算サービス）を ASGI サーバーで動かす。
+リクエスト本文の受信とレスポンスの送信はイベントループ上で非同期に行うため、
+通信の遅いクライアントが多数つながっていてもスレッドを占有しない。
+短時間で終わるAPIはイベントループ上でそのまま実行し、スレッドプールの空きを待たせない。
+一括計算・ジョブ・分析系など時間のかかるAPI（OFFLOADED_PATHS）は、本文を受信し終えてから
+上限付きのスレッドプールで実行し、レスポンス本文もチャンクごとにスレッドプールで取り出す。
+
+    pip install uvicorn
+    uvicorn asgi:app --app-dir api --port 5001
+"""
+import asyncio
+import contextvars
+import io
+import os
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, List, Optional, Tuple
+
+from main import create_app
+
+# スレッドプールで実行するパス（このパスとその下のパス。一括計算・ジョブ・分析系など時間のかかるAPI）
+# ほかのパス（相続人の判定・税額計算・ヘルスチェックなど短時間で終わるAPI）はイベントループ上でそのまま実行する
+OFFLOADED_PATHS = (
+    '/api/calculation/batch',
+    '/api/calculation/inverse-tax',
+    '/api/calculation/optimize-division',
+    '/api/calculation/what-if',
+    '/api/jobs',
+    '/api/simulation',
+)
+
+# イベントループ上で実行するリクエストの本文の上限（スレッドプールで実行するパスは上限なし）
+MAX_INLINE_BODY_SIZE = 10 * 1024 * 1024
+
+# スレッドプールで実行中・実行待ちにできるリクエスト数（超えた場合は 503 を返す）
+MAX_OFFLOADED_REQUESTS = 64
+
+# 受信したリクエスト本文をメモリに置く上限（超えた分は一時ファイルに書き出す）
+_SPOOL_MEMORY_SIZE = 1024 * 1024
+
+# レスポンス本文をスレッドプールから1回に取り出す単位
+_CHUNK_SIZE = 64 * 1024
+
+
+class AsgiAdapter:
+    """WSGI の Flask アプリケーションを ASGI アプリケーションとして提供する"""
+
+    def __init__(self, wsgi_app, executor: Optional[ThreadPoolExecutor] = None,
+                 offloaded_paths: Iterable[str] = OFFLOADED_PATHS,
+                 max_inline_body_size: int = MAX_INLINE_BODY_SIZE,
+                 max_offloaded_requests: int = MAX_OFFLOADED_REQUESTS):
+        self.wsgi_app = wsgi_app
+        self.executor = executor or ThreadPoolExecutor(
+            max_workers=min(32, (os.cpu_count() or 1) + 4), thread_name_prefix='asgi-offload')
+        self.offloaded_paths = tuple(offloaded_paths)
+        self.max_inline_body_size = max_inline_body_size
+        self.max_offloaded_requests = max_offloaded_requests
+        self._offloaded_requests = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self._http(scope, receive, send)
+        else:
+            raise ValueError(f"未対応のASGIスコープです: {scope['type']}")
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    def _offloads(self, path: str) -> bool:
+        return any(path == prefix or path.startswith(prefix + '/') for prefix in self.offloaded_paths)
+
+    async def _http(self, scope, receive, send):
+        if not self._offloads(scope['path']):
+            body = await self._read_body(receive)
+            if body is None:
+                await self._send_error(send, 413, b'Request Entity Too Large')
+                return
+            await self._respond_inline(self._environ(scope, body), send)
+            return
+
+        # 本文はすべてイベントループ上で受信してから実行する（送信の遅いクライアントがスレッドを占有しない）
+        with tempfile.SpooledTemporaryFile(max_size=_SPOOL_MEMORY_SIZE) as body:
+            await self._spool_body(receive, body)
+            body.seek(0)
+            if self._offloaded_requests >= self.max_offloaded_requests:
+                await self._send_error(send, 503, b'Service Unavailable', [(b'retry-after', b'1')])
+                return
+            self._offloaded_requests += 1
+            try:
+                await self._respond_offloaded(self._environ(scope, body), send)
+            finally:
+                self._offloaded_requests -= 1
+
+    async def _respond_inline(self, environ, send) -> None:
+        """ビュー関数をイベントループ上で実行し、レスポンスを送信する"""
+        status, headers, body = self._start(environ)
+        try:
+            data = b''.join(body)
+        finally:
+            body.close()
+        await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+        await send({'type': 'http.response.body', 'body': data, 'more_body': False})
+
+    async def _respond_offloaded(self, environ, send) -> None:
+        """ビュー関数とレスポンス本文の取り出しをスレッドプールで実行し、送信はイベントループ上で行う
+
+        スレッドを使うのは本文を _CHUNK_SIZE 程度取り出す間だけで、クライアントへの送信を待つ間は返す。
+        Flask のコンテキスト（stream_with_context）や計測のコンテキスト変数は、
+        リクエストごとに1つの Context を各スレッドで順に使うことで引き継ぐ。
+        """
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+
+        def run(function, *args):
+            return loop.run_in_executor(self.executor, context.run, function, *args)
+
+        status, headers, body = await run(self._start, environ)
+        try:
+            await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+            while True:
+                data, more_body = await run(_read_chunk, body)
+                await send({'type': 'http.response.body', 'body': data, 'more_body': more_body})
+                if not more_body:
+                    break
+        finally:
+            await run(body.close)
+
+    @staticmethod
+    async def _send_error(send, status: int, message: bytes, headers: List[Tuple[bytes, bytes]] = ()) -> None:
+        await send({'type': 'http.response.start', 'status': status,
+                    'headers': [(b'content-type', b'text/plain; charset=utf-8'), *headers]})
+        await send({'type': 'http.response.body', 'body': message})
+
+    async def _read_body(self, receive) -> Optional[bytes]:
+        """リクエスト本文を非同期に受信する（上限を超えた場合は None）"""
+        chunks = []
+        size = 0
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                break
+            chunk = message.get('body', b'')
+            size += len(chunk)
+            if size > self.max_inline_body_size:
+                return None
+            chunks.append(chunk)
+            if not message.get('more_body', False):
+                break
+        return b''.join(chunks)
+
+    @staticmethod
+    async def _spool_body(receive, body) -> None:
+        """リクエスト本文を非同期に受信し、一時ファイル（_SPOOL_MEMORY_SIZE まではメモリ）に書き込む"""
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return
+            body.write(message.get('body', b''))
+            if not message.get('more_body', False):
+                return
+
+    def _start(self, environ) -> Tuple[int, List[Tuple[bytes, bytes]], Iterable[bytes]]:
+        """ビュー関数を実行し、（ステータス, ヘッダ, レスポンス本文のイテレータ）を返す"""
+        response_start = []
+
+        def start_response(status, response_headers, exc_info=None):
+            response_start[:] = [status, response_headers]
+            return lambda data: None  # write() は Flask では使われない
+
+        body = self.wsgi_app(environ, start_response)
+        status, response_headers = response_start
+        headers = [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in response_headers]
+        return int(status.split(' ', 1)[0]), headers, _ResponseBody(body)
+
+    @staticmethod
+    def _environ(scope, body) -> dict:
+        """ASGI のスコープから WSGI の environ を作成"""
+        server = scope.get('server') or ('localhost', 80)
+        client = scope.get('client') or ('', 0)
+        environ = {
+            'REQUEST_METHOD': scope['method'],
+            'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+            'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+            'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+            'SERVER_NAME': server[0],
+            'SERVER_PORT': str(server[1]),
+            'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+            'REMOTE_ADDR': client[0],
+            'REMOTE_PORT': str(client[1]),
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': scope.get('scheme', 'http'),
+            'wsgi.input': io.BytesIO(body) if isinstance(body, bytes) else body,
+            'wsgi.input_terminated': True,
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': False,
+            'wsgi.run_once': False,
+        }
+        for raw_name, raw_value in scope.get('headers', []):
+            name = raw_name.decode('latin-1').upper().replace('-', '_')
+            value = raw_value.decode('latin-1')
+            if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+                name = 'HTTP_' + name
+            environ[name] = f'{environ[name]},{value}' if name in environ else value
+        return environ
+
+
+class _ResponseBody:
+    """WSGI のレスポンス本文（少しずつ取り出せるイテレータ。最後に close() を呼ぶ）"""
+
+    def __init__(self, body):
+        self._iterator = iter(body)
+        self.close = getattr(body, 'close', lambda: None)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> bytes:
+        return next(self._iterator)
+
+
+def _read_chunk(body: _ResponseBody) -> Tuple[bytes, bool]:
+    """レスポンス本文を _CHUNK_SIZE 程度まとめて取り出す（本文, 続きがあるか）"""
+    chunks = []
+    size = 0
+    for chunk in body:
+        chunks.append(chunk)
+        size += len(chunk)
+        if size >= _CHUNK_SIZE:
+            return b''.join(chunks), True
+    return b''.join(chunks), False
+
+
+def create_asgi_app(executor: Optional[ThreadPoolExecutor] = None) -> AsgiAdapter:
+    """ASGI アプリケーションを作成する"""
+    return AsgiAdapter(create_app().wsgi_app, executor)
+
+
+app = create_asgi_app()
+
+
+if __name__ == '__main__':
+    import uvicorn
+    uvicorn.run(app, host='0.0.0.0', port=5001)
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+相続税計算のコマンドラインツール
+
+    python api/cli.py import 案件.xlsx [--chunk-size 1000]
+    python api/cli.py export 案件.xlsx 結果.xlsx [--format xlsx|csv] [--chunk-size 1000]
+    python api/cli.py worker [--workers 2]
+
+import: Excel ブックの案件を一括計算し、1行1件の結果を NDJSON で標準出力に書き出す。
+export: Excel ブックの案件を一括計算し、合計と相続人ごとの明細の行を XLSX / CSV ファイルに書き出す。
+どちらも読み飛ばした行は理由とともに標準エラー出力に書き出す。
+worker: 一括計算ジョブ（POST /api/jobs）を実行するワーカーを起動する（Ctrl+C・SIGTERM で止める）。
+"""
+import argparse
+import json
+import os
+import signal
+import sys
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from services.excel_import import DEFAULT_CHUNK_SIZE, ExcelCaseImporter, ImportReport
+from services.result_export import EXPORT_FORMATS, ExportRecord, export_rows, write_export
+
+
+def _case_line(result) -> dict:
+    case = result.case
+    division_result = result.division_result
+    return {
+        'sheet': case.sheet,
+        'row': case.row,
+        'id': case.case_id,
+        'taxable_amount': case.taxable_amount,
+        'basic_deduction': result.tax_result.basic_deduction,
+        'total_tax_amount': result.tax_result.total_tax_amount,
+        'actual_division_final_tax_amounts': (
+            {detail.heir_id: detail.final_tax_amount for detail in division_result.heir_details}
+            if division_result is not None else None
+        ),
+    }
+
+
+def print_report(report: ImportReport, out=sys.stderr) -> None:
+    """取り込みの集計と読み飛ばした行を書き出す"""
+    for skipped in report.skipped:
+        reasons = '; '.join(f'{error.field}: {error.message}' for error in skipped.errors)
+        print(f'スキップ {skipped.sheet}!{skipped.row}行目 ({skipped.case_id or "-"}): {reasons}', file=out)
+    if report.skipped_count > len(report.skipped):
+        print(f'ほか {report.skipped_count - len(report.skipped)} 行をスキップしました', file=out)
+    for sheet in report.ignored_sheets:
+        print(f'対象外のシート: {sheet}', file=out)
+    print(f'計算 {report.cases_count} 件 / スキップ {report.skipped_count} 行', file=out)
+
+
+def run_import(args) -> int:
+    importer = ExcelCaseImporter(chunk_size=args.chunk_size)
+    report = ImportReport()
+    for chunk in importer.iter_results(args.workbook, report):
+        for result in chunk:
+            sys.stdout.write(json.dumps(_case_line(result), ensure_ascii=False) + '\n')
+    print_report(report)
+    return 0 if report.skipped_count == 0 else 1
+
+
+def run_export(args) -> int:
+    export_format = args.format or os.path.splitext(args.output)[1].lstrip('.').lower()
+    if export_format not in EXPORT_FORMATS:
+        print(f'出力形式を判定できません（--format で {" / ".join(EXPORT_FORMATS)} を指定してください）', file=sys.stderr)
+        return 2
+
+    importer = ExcelCaseImporter(chunk_size=args.chunk_size)
+    report = ImportReport()
+    records = (ExportRecord.from_case_result(result)
+               for chunk in importer.iter_results(args.workbook, report) for result in chunk)
+    write_export(export_rows(records), args.output, export_format)
+    print_report(report)
+    return 0 if report.skipped_count == 0 else 1
+
+
+def run_worker(args) -> int:
+    from routes.jobs import JOB_DATABASE, job_queue
+
+    stopped = threading.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: stopped.set())
+
+    job_queue.workers = args.workers
+    job_queue.start()
+    print(f'ワーカーを {args.workers} 個起動しました（{JOB_DATABASE}）', file=sys.stderr)
+    while not stopped.wait(1.0):
+        pass
+    job_queue.stop()
+    print('ワーカーを停止しました', file=sys.stderr)
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="相続税計算のコマンドラインツール")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    import_parser = subparsers.add_parser('import', help="Excel ブックの案件を一括計算する")
+    import_parser.add_argument('workbook', help="相続税計算アプリ形式の .xlsx ファイル")
+    import_parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                               help="一度に計算する件数")
+    import_parser.set_defaults(handler=run_import)
+
+    export_parser = subparsers.add_parser('export', help="Excel ブックの案件を一括計算し、結果を XLSX / CSV に書き出す")
+    export_parser.add_argument('workbook', help="相続税計算アプリ形式の .xlsx ファイル")
+    export_parser.add_argument('output', help="書き出すファイル（.xlsx または .csv）")
+    export_parser.add_argument('--format', choices=EXPORT_FORMATS, help="出力形式（省略時は拡張子から判定）")
+    export_parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                               help="一度に計算する件数")
+    export_parser.set_defaults(handler=run_export)
+
+    worker_parser = subparsers.add_parser('worker', help="一括計算ジョブのワーカーを起動する")
+    worker_parser.add_argument('--workers', type=int, default=2, help="ワーカー数")
+    worker_parser.set_defaults(handler=run_worker)
+
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
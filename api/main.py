@@ -2,33 +2,45 @@ from flask import Flask, jsonify
 from flask_cors import CORS
 from routes.inheritance import inheritance_bp
 
-app = Flask(__name__)
-CORS(app)
 
-# # --- Database Configuration ---
-# # Get the absolute path for the project directory
-# project_dir = os.path.abspath(os.path.dirname(__name__))
-# # Define the database file path
-# database_file = f"sqlite:///{os.path.join(project_dir, 'database', 'app.db')}"
+def create_app():
+    """Flask アプリケーションを作成する
 
-# app.config['SQLALCHEMY_DATABASE_URI'] = database_file
-# app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    サーバーレス環境ではコールドスタートの時間がそのまま応答時間になるため、
+    モジュールの読み込みは必要最小限にしている（NumPy を使う分析系APIは初回リクエスト時に読み込む）。
+    """
+    app = Flask(__name__)
+    CORS(app)
 
-# # --- Initialize Extensions ---
-# db.init_app(app)
-# migrate = Migrate(app, db)
+    # # --- Database Configuration ---
+    # # Get the absolute path for the project directory
+    # project_dir = os.path.abspath(os.path.dirname(__name__))
+    # # Define the database file path
+    # database_file = f"sqlite:///{os.path.join(project_dir, 'database', 'app.db')}"
 
-# with app.app_context():
-#     db.create_all()
+    # app.config['SQLALCHEMY_DATABASE_URI'] = database_file
+    # app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
-# --- Blueprints Registration ---
-app.register_blueprint(inheritance_bp, url_prefix='/api')
-# app.register_blueprint(user_bp, url_prefix='/api/users')
+    # # --- Initialize Extensions ---
+    # db.init_app(app)
+    # migrate = Migrate(app, db)
 
+    # with app.app_context():
+    #     db.create_all()
 
-@app.route('/api/health', methods=['GET'])
-def health_check():
-    return jsonify({"status": "OK"}), 200
+    # --- Blueprints Registration ---
+    app.register_blueprint(inheritance_bp, url_prefix='/api')
+    # app.register_blueprint(user_bp, url_prefix='/api/users')
+
+    @app.route('/api/health', methods=['GET'])
+    def health_check():
+        return jsonify({"status": "OK"}), 200
+
+    return app
+
+
+# Vercel は api/main.py の app を参照する
+app = create_app()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,180 @@
+"""
+法定相続人の列指向テーブル
+
+多数の案件の法定相続人を、Heir オブジェクトのリストではなく
+列ごとの NumPy 配列（相続人の種類・続柄のコード、法定相続分の分子・分母、
+2割加算・養子のフラグ）で保持する。案件ごとの相続人は
+estate_offsets[i]:estate_offsets[i + 1] の範囲に並ぶ。
+"""
+from dataclasses import dataclass
+from typing import List, Sequence
+
+import numpy as np
+
+from models.inheritance import FamilyStructure, Heir, HeirType, RelationshipType
+
+# コードは列挙型の定義順の添字
+HEIR_TYPE_CODES = tuple(HeirType)
+RELATIONSHIP_CODES = tuple(RelationshipType)
+SPOUSE_CODE = HEIR_TYPE_CODES.index(HeirType.SPOUSE)
+CHILD_CODE = HEIR_TYPE_CODES.index(HeirType.CHILD)
+PARENT_CODE = HEIR_TYPE_CODES.index(HeirType.PARENT)
+SIBLING_CODE = HEIR_TYPE_CODES.index(HeirType.SIBLING)
+
+# 1案件内の相続人の並び（determine_legal_heirs と同じ順序）
+# (相続人の種類, 続柄, IDの接頭辞, 名前の接頭辞, 2割加算, 養子)
+_SLOTS = (
+    (HeirType.SPOUSE, RelationshipType.SPOUSE, "spouse", "配偶者", False, False),
+    (HeirType.CHILD, RelationshipType.GRANDCHILD_ADOPTED, "child_", "孫養子", True, True),
+    (HeirType.CHILD, RelationshipType.ADOPTED_CHILD, "child_", "養子", False, True),
+    (HeirType.CHILD, RelationshipType.CHILD, "child_", "子供", False, False),
+    (HeirType.PARENT, RelationshipType.PARENT, "parent_", "親", False, False),
+    (HeirType.SIBLING, RelationshipType.SIBLING, "sibling_", "兄弟姉妹", True, False),
+    (HeirType.SIBLING, RelationshipType.HALF_SIBLING, "half_sibling_", "半血兄弟姉妹", True, False),
+    (HeirType.OTHER, RelationshipType.OTHER, "non_heir_", "法定相続人以外", True, False),
+)
+_SLOT_HEIR_TYPES = np.array([HEIR_TYPE_CODES.index(s[0]) for s in _SLOTS], dtype=np.int8)
+_SLOT_RELATIONSHIPS = np.array([RELATIONSHIP_CODES.index(s[1]) for s in _SLOTS], dtype=np.int8)
+_SLOT_TWO_FOLD = np.array([s[4] for s in _SLOTS], dtype=bool)
+_SLOT_ADOPTED = np.array([s[5] for s in _SLOTS], dtype=bool)
+_SLOT_BY_RELATIONSHIP = {RELATIONSHIP_CODES.index(s[1]): s for s in _SLOTS}
+
+_FIELDS = ('spouse_exists', 'children_count', 'adopted_children_count', 'grandchild_adopted_count',
+           'parents_alive', 'siblings_count', 'half_siblings_count', 'non_heirs_count')
+
+
+def _nonzero(values: np.ndarray) -> np.ndarray:
+    """0除算の回避（0の場合は該当する相続人がいないため値は使われない）"""
+    return np.where(values == 0, 1, values)
+
+
+@dataclass(frozen=True)
+class HeirTable:
+    """多数の案件の法定相続人（列指向）"""
+    estate_offsets: np.ndarray  # (案件数 + 1,) 各案件の相続人の開始位置
+    heir_types: np.ndarray  # 相続人の種類のコード（HEIR_TYPE_CODES の添字）
+    relationships: np.ndarray  # 続柄のコード（RELATIONSHIP_CODES の添字）
+    ordinals: np.ndarray  # ID・名前の連番（child_1 の 1 など）
+    share_numerators: np.ndarray  # 法定相続分の分子（既約）
+    share_denominators: np.ndarray  # 法定相続分の分母
+    inheritance_shares: np.ndarray  # 法定相続分（分子 / 分母 の浮動小数点値。表示用）
+    two_fold_additions: np.ndarray  # 2割加算の対象かどうか
+    is_adopted: np.ndarray  # 養子かどうか
+
+    def __len__(self) -> int:
+        return len(self.estate_offsets) - 1
+
+    @property
+    def heir_counts(self) -> np.ndarray:
+        """案件ごとの相続人数"""
+        return np.diff(self.estate_offsets)
+
+    @property
+    def estate_index(self) -> np.ndarray:
+        """相続人ごとの案件番号"""
+        return np.repeat(np.arange(len(self)), self.heir_counts)
+
+    def to_heirs(self, estate: int) -> List[Heir]:
+        """1案件分の相続人を Heir のリストとして取り出す"""
+        heirs = []
+        for row in range(self.estate_offsets[estate], self.estate_offsets[estate + 1]):
+            heir_type, relationship, id_prefix, name_prefix, _, _ = _SLOT_BY_RELATIONSHIP[int(self.relationships[row])]
+            ordinal = "" if heir_type == HeirType.SPOUSE else str(self.ordinals[row])
+            heirs.append(Heir(
+                id=id_prefix + ordinal,
+                name=name_prefix + ordinal,
+                heir_type=heir_type,
+                relationship=relationship,
+                inheritance_share=float(self.inheritance_shares[row]),
+                two_fold_addition=bool(self.two_fold_additions[row]),
+                is_adopted=bool(self.is_adopted[row]),
+                share_numerator=int(self.share_numerators[row]),
+                share_denominator=int(self.share_denominators[row]),
+            ))
+        return heirs
+
+    def deduction_heirs_counts(self) -> np.ndarray:
+        """案件ごとの基礎控除計算用の法定相続人数（養子の制限を適用）"""
+        estate_index = self.estate_index
+        size = len(self)
+        is_child = self.heir_types == CHILD_CODE
+        adopted = np.bincount(estate_index, weights=is_child & self.is_adopted, minlength=size)
+        biological = np.bincount(estate_index, weights=is_child & ~self.is_adopted, minlength=size)
+        others = np.bincount(
+            estate_index, weights=np.isin(self.heir_types, (SPOUSE_CODE, PARENT_CODE, SIBLING_CODE)),
+            minlength=size,
+        )
+        # 実子がいる場合、養子は1人まで。実子がいない場合、養子は2人まで
+        adopted_limit = np.where(biological > 0, 1, 2)
+        return (others + biological + np.minimum(adopted, adopted_limit)).astype(np.int64)
+
+    @classmethod
+    def from_family_structures(cls, family_structures: Sequence[FamilyStructure]) -> "HeirTable":
+        """家族構成ごとの法定相続人をまとめて判定する（determine_legal_heirs の列指向版）"""
+        (spouse, children, adopted, grandchild_adopted,
+         parents, siblings, half_siblings, non_heirs) = np.array(
+            [[getattr(fs, name) for name in _FIELDS] for fs in family_structures], dtype=np.int64
+        ).reshape(-1, len(_FIELDS)).T
+        spouse = spouse.astype(bool)
+        has_children = children > 0
+        has_parents = ~has_children & (parents > 0)
+        has_siblings = ~has_children & ~has_parents & ((siblings > 0) | (half_siblings > 0))
+        sibling_units = 2 * siblings + half_siblings  # 半血兄弟姉妹を1単位とした人数
+
+        # 配偶者の法定相続分（分子/分母）
+        spouse_num = np.select([has_children, has_parents, has_siblings], [1, 2, 3], 1) * spouse
+        spouse_den = np.select([has_children, has_parents, has_siblings], [2, 3, 4], 1)
+        others_num = spouse_den - spouse_num
+
+        # 子供の内訳（孫養子 → 養子 → 実子の順に並ぶ）
+        adopted_in_children = np.minimum(adopted, children)
+        grandchild_in_children = np.minimum(grandchild_adopted, adopted_in_children)
+
+        zeros = np.zeros_like(children)
+        counts = np.stack([
+            spouse.astype(np.int64),
+            grandchild_in_children,
+            adopted_in_children - grandchild_in_children,
+            children - adopted_in_children,
+            np.where(has_parents, parents, 0),
+            np.where(has_siblings, siblings, 0),
+            np.where(has_siblings, half_siblings, 0),
+            non_heirs,
+        ], axis=1)
+        first_ordinals = np.stack([
+            zeros + 1, zeros + 1, grandchild_in_children + 1, adopted_in_children + 1,
+            zeros + 1, zeros + 1, zeros + 1, zeros + 1,
+        ], axis=1)
+
+        numerators = np.stack([
+            spouse_num, others_num, others_num, others_num, others_num,
+            2 * others_num, others_num, zeros,
+        ], axis=1)
+        denominators = np.stack([
+            spouse_den, spouse_den * _nonzero(children), spouse_den * _nonzero(children), spouse_den * _nonzero(children),
+            spouse_den * _nonzero(parents), spouse_den * _nonzero(sibling_units), spouse_den * _nonzero(sibling_units),
+            zeros + 1,
+        ], axis=1)
+
+        flat_counts = counts.ravel()
+        total = int(flat_counts.sum())
+        slot_index = np.repeat(np.tile(np.arange(len(_SLOTS)), len(counts)), flat_counts)
+        block_starts = np.cumsum(flat_counts) - flat_counts
+        ordinals = np.arange(total) - np.repeat(block_starts, flat_counts) + np.repeat(first_ordinals.ravel(), flat_counts)
+
+        numerators = np.repeat(numerators.ravel(), flat_counts)
+        denominators = np.repeat(denominators.ravel(), flat_counts)
+        divisor = np.gcd(numerators, denominators)
+        divisor[divisor == 0] = 1
+
+        return cls(
+            estate_offsets=np.concatenate([[0], np.cumsum(counts.sum(axis=1))]).astype(np.int64),
+            heir_types=_SLOT_HEIR_TYPES[slot_index],
+            relationships=_SLOT_RELATIONSHIPS[slot_index],
+            ordinals=ordinals.astype(np.int32),
+            share_numerators=numerators // divisor,
+            share_denominators=denominators // divisor,
+            inheritance_shares=numerators / denominators,
+            two_fold_additions=_SLOT_TWO_FOLD[slot_index],
+            is_adopted=_SLOT_ADOPTED[slot_index],
+        )
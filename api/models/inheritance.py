@@ -2,7 +2,9 @@
 相続税計算のためのデータモデル
 """
 from dataclasses import dataclass
-from typing import Dict, List, Optional
+from datetime import date
+from fractions import Fraction
+from typing import Dict, List, Optional, Union
 from enum import Enum
 
 
@@ -26,9 +28,13 @@ class RelationshipType(Enum):
     OTHER = "その他"
 
 
-@dataclass
+# 浮動小数点の法定相続分から有理数を復元するときの分母の上限
+MAX_SHARE_DENOMINATOR = 10 ** 6
+
+
+@dataclass(frozen=True, slots=True)
 class Heir:
-    """法定相続人を表すクラス"""
+    """法定相続人を表すクラス（キャッシュで共有されるため不変）"""
     id: str
     name: str
     heir_type: HeirType
@@ -36,10 +42,24 @@ class Heir:
     inheritance_share: float  # 法定相続分（割合）
     two_fold_addition: bool = False  # 2割加算の対象かどうか
     is_adopted: bool = False  # 養子かどうか
+    share_numerator: int = 0  # 法定相続分の分子（既約）
+    share_denominator: int = 0  # 法定相続分の分母（0 は未指定で、inheritance_share から求める）
 
+    def __post_init__(self):
+        if self.share_denominator == 0:
+            share = Fraction(self.inheritance_share).limit_denominator(MAX_SHARE_DENOMINATOR)
+            object.__setattr__(self, 'share_numerator', share.numerator)
+            object.__setattr__(self, 'share_denominator', share.denominator)
 
-@dataclass
+    @property
+    def legal_share(self) -> Fraction:
+        """法定相続分（有理数）"""
+        return Fraction(self.share_numerator, self.share_denominator)
+
+
+@dataclass(frozen=True)
 class FamilyStructure:
+    """家族構成（ハッシュ可能で、法定相続人判定のキャッシュキーとして使用）"""
     spouse_exists: bool
     children_count: int
     adopted_children_count: int
@@ -59,23 +79,36 @@ class TaxCalculationInput:
     heirs: Optional[List[Heir]] = None
 
 
-@dataclass
-class HeirTaxDetail:
-    """各相続人の税額詳細"""
+@dataclass(frozen=True, slots=True)
+class LegalShareTaxDetail:
+    """法定相続分による各相続人の税額詳細"""
     heir_id: str
-    name: str # 法定相続人名または入力された名前
+    name: str  # 法定相続人名
     relationship: str
-    legal_share_amount: Optional[int] = None # 法定相続分に応じる取得金額
-    tax_before_addition: Optional[int] = None # 2割加算前の税額
-    two_fold_addition: Optional[int] = None # 2割加算額
-    tax_after_addition: Optional[int] = None # 2割加算後の税額
-    
-    # 実際分割でのみ使用
-    heir_name: Optional[str] = None
-    inheritance_amount: Optional[int] = None
-    tax_amount: Optional[int] = None
-    surcharge_deduction_amount: Optional[int] = None # 加算減算額
-    final_tax_amount: Optional[int] = None
+    legal_share_amount: int  # 法定相続分に応じる取得金額
+    tax_before_addition: int  # 2割加算前の税額
+    two_fold_addition: int  # 2割加算額
+    tax_after_addition: int  # 2割加算後の税額
+
+
+@dataclass(frozen=True, slots=True)
+class DivisionTaxDetail:
+    """実際の分割による各相続人の税額詳細"""
+    heir_id: str
+    heir_name: str  # 入力された名前
+    relationship: str
+    inheritance_amount: int  # 取得金額
+    tax_amount: int  # 配分税額
+    surcharge_deduction_amount: int  # 加算減算額
+    final_tax_amount: int  # 最終納税額
+
+    @property
+    def name(self) -> str:
+        return self.heir_name
+
+
+# 後方互換のための型エイリアス
+HeirTaxDetail = Union[LegalShareTaxDetail, DivisionTaxDetail]
 
 
 @dataclass
@@ -86,7 +119,7 @@ class TaxCalculationResult:
     basic_deduction: int  # 基礎控除額
     taxable_inheritance: int  # 課税遺産総額
     total_tax_amount: int  # 相続税の総額
-    heir_tax_details: List[HeirTaxDetail]
+    heir_tax_details: List[LegalShareTaxDetail]
 
 
 @dataclass
@@ -107,6 +140,7 @@ class DivisionInput:
     amounts: Optional[Dict[str, int]] = None
     percentages: Optional[Dict[str, float]] = None
     rounding_method: str = 'round'
+    inheritance_date: Optional[date] = None  # 相続開始日（省略時は現行の速算表を適用）
 
 
 @dataclass
@@ -116,7 +150,7 @@ class DivisionResult:
     basic_deduction: int
     taxable_estate: int
     total_tax_amount: int
-    heir_details: List[HeirTaxDetail]
+    heir_details: List[DivisionTaxDetail]
 
 
 @dataclass
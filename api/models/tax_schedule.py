@@ -0,0 +1,110 @@
+"""
+相続税速算表のコンパイル済み表現
+
+TAX_TABLE（辞書のリスト）を起動時に一度だけ整数配列へ変換し、
+二分探索と整数演算（円単位・切り捨て）で税額を求める。
+税制改正に備えて、速算表は適用開始日ごとにバージョン管理する。
+"""
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+from models.inheritance import TAX_TABLE, BASIC_DEDUCTION_BASE, BASIC_DEDUCTION_PER_HEIR
+
+
+@dataclass(frozen=True)
+class TaxSchedule:
+    """適用開始日つきの相続税速算表"""
+    effective_from: date  # 適用開始日（この日以後の相続に適用）
+    upper_bounds: Tuple[int, ...]  # 各区分の上限額（最後の区分は上限なしのため含まない）
+    rate_percents: Tuple[int, ...]  # 税率（%）
+    deductions: Tuple[int, ...]  # 控除額
+    basic_deduction_base: int  # 基礎控除の定額部分
+    basic_deduction_per_heir: int  # 基礎控除の法定相続人1人あたりの額
+
+    @classmethod
+    def compile(cls, table: List[Dict], effective_from: date,
+                basic_deduction_base: int, basic_deduction_per_heir: int) -> "TaxSchedule":
+        """TAX_TABLE 形式の速算表からコンパイルする"""
+        rows = sorted(table, key=lambda row: row["max_amount"])
+        rate_percents = []
+        for row in rows:
+            percent = round(row["tax_rate"] * 100)
+            if abs(row["tax_rate"] * 100 - percent) > 1e-9:
+                raise ValueError(f"税率は1%単位である必要があります: {row['tax_rate']}")
+            rate_percents.append(percent)
+
+        return cls(
+            effective_from=effective_from,
+            upper_bounds=tuple(int(row["max_amount"]) for row in rows[:-1]),
+            rate_percents=tuple(rate_percents),
+            deductions=tuple(int(row["deduction"]) for row in rows),
+            basic_deduction_base=basic_deduction_base,
+            basic_deduction_per_heir=basic_deduction_per_heir,
+        )
+
+    @property
+    def version(self) -> str:
+        """速算表のバージョン（適用開始日のISO形式）"""
+        return self.effective_from.isoformat()
+
+    def bracket_index(self, amount: int) -> int:
+        """金額が属する区分の番号"""
+        return bisect_left(self.upper_bounds, amount)
+
+    def tax_for(self, amount: int) -> int:
+        """税額を計算（1円未満切り捨て）"""
+        i = bisect_left(self.upper_bounds, amount)
+        return amount * self.rate_percents[i] // 100 - self.deductions[i]
+
+    def basic_deduction(self, legal_heirs_count: int) -> int:
+        """基礎控除額を計算"""
+        return self.basic_deduction_base + self.basic_deduction_per_heir * legal_heirs_count
+
+    def to_table(self) -> List[Dict]:
+        """TAX_TABLE 形式に戻す（最後の区分の上限は None）"""
+        bounds = list(self.upper_bounds) + [None]
+        rows = []
+        min_amount = 0
+        for max_amount, percent, deduction in zip(bounds, self.rate_percents, self.deductions):
+            rows.append({
+                "min_amount": min_amount,
+                "max_amount": max_amount,
+                "tax_rate": percent / 100,
+                "deduction": deduction,
+            })
+            if max_amount is not None:
+                min_amount = max_amount + 1
+        return rows
+
+
+# 平成15年1月1日〜平成26年12月31日の相続に適用された速算表
+_TAX_TABLE_2003 = [
+    {"min_amount": 0, "max_amount": 10000000, "tax_rate": 0.10, "deduction": 0},
+    {"min_amount": 10000001, "max_amount": 30000000, "tax_rate": 0.15, "deduction": 500000},
+    {"min_amount": 30000001, "max_amount": 50000000, "tax_rate": 0.20, "deduction": 2000000},
+    {"min_amount": 50000001, "max_amount": 100000000, "tax_rate": 0.30, "deduction": 7000000},
+    {"min_amount": 100000001, "max_amount": 300000000, "tax_rate": 0.40, "deduction": 17000000},
+    {"min_amount": 300000001, "max_amount": float('inf'), "tax_rate": 0.50, "deduction": 47000000},
+]
+
+# 適用開始日の昇順
+TAX_SCHEDULES: Tuple[TaxSchedule, ...] = (
+    TaxSchedule.compile(_TAX_TABLE_2003, date(2003, 1, 1), 50000000, 10000000),
+    TaxSchedule.compile(TAX_TABLE, date(2015, 1, 1), BASIC_DEDUCTION_BASE, BASIC_DEDUCTION_PER_HEIR),
+)
+
+CURRENT_TAX_SCHEDULE = TAX_SCHEDULES[-1]
+
+_EFFECTIVE_DATES = tuple(schedule.effective_from for schedule in TAX_SCHEDULES)
+
+
+def schedule_for(inheritance_date: Optional[date] = None) -> TaxSchedule:
+    """相続開始日に適用される速算表を取得（省略時は現行の速算表）"""
+    if inheritance_date is None:
+        return CURRENT_TAX_SCHEDULE
+    i = bisect_right(_EFFECTIVE_DATES, inheritance_date)
+    if i == 0:
+        raise ValueError(f"{inheritance_date.isoformat()} に適用される速算表がありません")
+    return TAX_SCHEDULES[i - 1]
@@ -0,0 +1,367 @@
+"""
+分析系API（逆算・分割の最適化・シミュレーション）のビュー関数
+
+NumPy を使うサービスに依存するため、コールドスタートでは読み込まず、
+routes.inheritance から LazyView で初回リクエスト時に読み込む。
+"""
+import os
+
+from flask import jsonify
+
+from routes.inheritance import (
+    calculator, heir_cache, _parse_request, _validation_error_response, _compact_requested
+)
+from routes.schema import (
+    Field, Schema, FAMILY_STRUCTURE_FIELD, INHERITANCE_DATE_FIELD, ROUNDING_METHOD_FIELD, TAXABLE_AMOUNT_FIELD
+)
+from routes.serializers import format_currency, serialize_division_result
+from services.division_optimizer import DivisionConstraints, DivisionOptimizer
+from services.inverse_solver import InverseTaxSolver
+from services.simulation import DISTRIBUTIONS, AssetDistribution, DivisionPolicy, MonteCarloSimulator
+from services.secondary_inheritance import SecondaryInheritanceSimulator
+
+division_optimizer = DivisionOptimizer(calculator)
+inverse_solver = InverseTaxSolver()
+monte_carlo_simulator = MonteCarloSimulator()
+secondary_inheritance_simulator = SecondaryInheritanceSimulator(heir_cache)
+
+# シミュレーションAPIで受け付ける標本数・格子点数の上限
+MAX_SIMULATION_SAMPLES = 1_000_000
+MAX_GRID_POINTS = 10_001
+MAX_SECONDARY_YEARS = 100
+
+
+def _division_constraints(min_amounts, fixed_spouse_amount, fixed_spouse_percentage):
+    return DivisionConstraints(min_amounts=min_amounts or {}, fixed_spouse_amount=fixed_spouse_amount,
+                               fixed_spouse_percentage=fixed_spouse_percentage)
+
+
+def _asset_distribution(name, distribution, **params):
+    return AssetDistribution(name=name, distribution=distribution, params=tuple(sorted(
+        (key, float(value)) for key, value in params.items() if value is not None
+    )))
+
+
+def _validate_assets(assets):
+    # 要素のエラーは要素ごとに報告済み（None）のため、正しく解析できた財産だけ分布のパラメータを確認する
+    for index, asset in enumerate(assets):
+        if asset is not None:
+            try:
+                asset.validate()
+            except ValueError as e:
+                raise ValueError(f"{index + 1}件目: {e}") from None
+
+
+# 財産1件の評価額の確率分布（分布ごとに使うパラメータは AssetDistribution を参照）
+ASSET_SCHEMA = Schema('asset', [
+    Field('name', 'str', '財産の名称', default=''),
+    Field('distribution', 'choice', '分布', default='fixed', choices={name: name for name in DISTRIBUTIONS}),
+    Field('value', 'number', '評価額'),
+    Field('mean', 'number', '評価額の平均'),
+    Field('std', 'number', '評価額の標準偏差', minimum=0),
+    Field('low', 'number', '評価額の下限'),
+    Field('mode', 'number', '評価額の最頻値'),
+    Field('high', 'number', '評価額の上限'),
+], factory=_asset_distribution)
+
+_PERCENTAGES_FIELD = Field('percentages', 'map', '取得割合', item='number', minimum=0, maximum=100)
+_WORKERS_FIELD = Field('workers', 'int', 'ワーカー数', default=1)
+
+INVERSE_TAX_REQUEST = Schema('inverse-tax', [
+    Field('target_tax_amount', 'int', '目標税額', required=True, minimum=0,
+          message='目標税額は0以上である必要があります'),
+    Field('basis', 'choice', '逆算の基準', default='legal_share',
+          choices={'legal_share': 'legal_share', 'division': 'division'}),
+    FAMILY_STRUCTURE_FIELD, INHERITANCE_DATE_FIELD, _PERCENTAGES_FIELD, ROUNDING_METHOD_FIELD,
+])
+
+OPTIMIZE_DIVISION_REQUEST = Schema('optimize-division', [
+    TAXABLE_AMOUNT_FIELD, FAMILY_STRUCTURE_FIELD, INHERITANCE_DATE_FIELD,
+    Field('constraints', 'object', '分割の制約', default=DivisionConstraints(), schema=Schema('constraints', [
+        Field('min_amounts', 'map', '最低取得額', item='int', minimum=0),
+        Field('fixed_spouse_amount', 'int', '配偶者の取得額', minimum=0),
+        Field('fixed_spouse_percentage', 'number', '配偶者の取得割合', minimum=0, maximum=100),
+    ], factory=_division_constraints)),
+])
+
+MONTE_CARLO_REQUEST = Schema('monte-carlo', [
+    Field('sample_count', 'int', '標本数', default=10_000, minimum=1, maximum=MAX_SIMULATION_SAMPLES,
+          message=f'標本数は1以上{MAX_SIMULATION_SAMPLES:,}以下である必要があります'),
+    _WORKERS_FIELD, FAMILY_STRUCTURE_FIELD,
+    Field('assets', 'list', '財産', default=(), schema=ASSET_SCHEMA, check=_validate_assets),
+    Field('division_policy', 'object', '分割方針', schema=Schema('division-policy', [
+        Field('mode', 'choice', '分割方針の指定方法', default='legal_share',
+              choices={'legal_share': 'legal_share', 'percentage': 'percentage'}),
+        _PERCENTAGES_FIELD, ROUNDING_METHOD_FIELD,
+    ])),
+    Field('seed', 'int', '乱数のシード'),
+])
+
+SECONDARY_INHERITANCE_REQUEST = Schema('secondary-inheritance', [
+    TAXABLE_AMOUNT_FIELD,
+    Field('grid_points', 'int', '格子点数', default=101, minimum=2, maximum=MAX_GRID_POINTS,
+          message=f'格子点数は2以上{MAX_GRID_POINTS:,}以下である必要があります'),
+    _WORKERS_FIELD, FAMILY_STRUCTURE_FIELD,
+    Field('spouse_own_assets', 'int', '配偶者の固有財産', default=0, minimum=0),
+    Field('annual_growth_rate', 'number', '財産の年間増減率', default=0.0, minimum=-1, maximum=1),
+    Field('years', 'int', '二次相続までの年数', default=0, minimum=0, maximum=MAX_SECONDARY_YEARS),
+])
+
+
+def _validate_family_structure(family_structure):
+    """家族構成のバリデーション（エラーがあればレスポンスを返す）"""
+    validation_result = calculator.validate_family_structure(family_structure)
+    if not validation_result.is_valid:
+        return _validation_error_response(validation_result.errors)
+    return None
+
+
+def solve_inverse_tax():
+    """目標税額からの課税価格逆算API"""
+    try:
+        data, error_response = _parse_request(INVERSE_TAX_REQUEST)
+        if error_response is not None:
+            return error_response
+        target_tax = data['target_tax_amount']
+        basis = data['basis']
+        
+        family_structure = data['family_structure']
+        error_response = _validate_family_structure(family_structure)
+        if error_response is not None:
+            return error_response
+        
+        tax_curve = heir_cache.get_tax_curve(family_structure, data['inheritance_date'])
+        
+        if basis == 'legal_share':
+            solution = inverse_solver.solve_legal_share(tax_curve, target_tax)
+        else:
+            heirs = heir_cache.get(family_structure).heirs
+            percentages = data['percentages'] or {}
+            try:
+                # 相続人等に含まれないID・合計が100%でない取得割合は受け付けない
+                DivisionPolicy.from_percentages(heirs, percentages)
+            except ValueError as e:
+                return jsonify({
+                    'success': False,
+                    'error': {
+                        'code': 'VALIDATION_ERROR',
+                        'message': str(e)
+                    }
+                }), 400
+            solution = inverse_solver.solve_division(
+                tax_curve,
+                heirs,
+                percentages,
+                target_tax,
+                data['rounding_method']
+            )
+        
+        # レスポンスの作成
+        result = {
+            'basis': basis,
+            'target_tax_amount': target_tax,
+            'max_taxable_amount': solution.max_taxable_amount,
+            'max_taxable_amount_formatted': format_currency(solution.max_taxable_amount),
+            'total_tax_amount': solution.total_tax_amount,
+            'next_total_tax_amount': solution.next_total_tax_amount,
+            'unbounded': solution.max_taxable_amount is None
+        }
+        
+        return jsonify({
+            'success': True,
+            'result': result
+        })
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': {
+                'code': 'INTERNAL_SERVER_ERROR',
+                'message': str(e)
+            }
+        }), 500
+
+
+def optimize_division():
+    """税額が最小となる分割の探索API"""
+    try:
+        data, error_response = _parse_request(OPTIMIZE_DIVISION_REQUEST)
+        if error_response is not None:
+            return error_response
+        taxable_amount = data['taxable_amount']
+        
+        family_structure = data['family_structure']
+        error_response = _validate_family_structure(family_structure)
+        if error_response is not None:
+            return error_response
+        
+        # 法定相続分による相続税の総額
+        legal_heirs = list(heir_cache.get(family_structure).heirs)
+        tax_result = calculator.calculate_tax_by_legal_share(
+            taxable_amount, legal_heirs, data['inheritance_date']
+        )
+        
+        try:
+            optimization = division_optimizer.optimize(
+                taxable_amount, legal_heirs, tax_result.total_tax_amount, data['constraints'],
+                inheritance_date=data['inheritance_date']
+            )
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': {
+                    'code': 'VALIDATION_ERROR',
+                    'message': str(e)
+                }
+            }), 400
+        
+        # レスポンスの作成
+        result = serialize_division_result(optimization.division_result, _compact_requested())
+        result.update({
+            'amounts': optimization.amounts,
+            'total_tax_by_legal_share': tax_result.total_tax_amount,
+            'trade_off_curve': [
+                {
+                    'spouse_amount': point.spouse_amount,
+                    'total_tax_amount': point.total_tax_amount
+                } for point in optimization.trade_off_curve
+            ],
+            'candidates_evaluated': optimization.candidates_evaluated
+        })
+        
+        return jsonify({
+            'success': True,
+            'result': result
+        })
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': {
+                'code': 'INTERNAL_SERVER_ERROR',
+                'message': str(e)
+            }
+        }), 500
+
+
+def simulate_monte_carlo():
+    """財産評価の不確実性を考慮した相続税シミュレーションAPI"""
+    try:
+        data, error_response = _parse_request(MONTE_CARLO_REQUEST)
+        if error_response is not None:
+            return error_response
+        workers = min(max(1, data['workers']), os.cpu_count() or 1)
+        
+        family_structure = data['family_structure']
+        error_response = _validate_family_structure(family_structure)
+        if error_response is not None:
+            return error_response
+        
+        heirs = heir_cache.get(family_structure).heirs
+        try:
+            assets = list(data['assets'])
+            policy_data = data['division_policy']
+            if policy_data is None or policy_data['mode'] == 'legal_share':
+                policy = DivisionPolicy.legal_share(heirs)
+            else:
+                policy = DivisionPolicy.from_percentages(
+                    heirs, policy_data['percentages'] or {}, policy_data['rounding_method']
+                )
+            simulation = monte_carlo_simulator.simulate(
+                assets, heirs, heir_cache.get_tax_curve(family_structure), policy,
+                sample_count=data['sample_count'], seed=data['seed'], workers=workers
+            )
+        except (KeyError, ValueError) as e:
+            return jsonify({
+                'success': False,
+                'error': {
+                    'code': 'VALIDATION_ERROR',
+                    'message': f'シミュレーション条件に問題があります: {e}'
+                }
+            }), 400
+        
+        return jsonify({
+            'success': True,
+            'result': simulation.summary()
+        })
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': {
+                'code': 'INTERNAL_SERVER_ERROR',
+                'message': str(e)
+            }
+        }), 500
+
+
+def simulate_secondary_inheritance():
+    """二次相続を考慮した配偶者の取得割合のシミュレーションAPI"""
+    try:
+        data, error_response = _parse_request(SECONDARY_INHERITANCE_REQUEST)
+        if error_response is not None:
+            return error_response
+        workers = min(max(1, data['workers']), os.cpu_count() or 1)
+        
+        family_structure = data['family_structure']
+        error_response = _validate_family_structure(family_structure)
+        if error_response is not None:
+            return error_response
+        
+        try:
+            simulation = secondary_inheritance_simulator.simulate(
+                family_structure,
+                data['taxable_amount'],
+                grid_points=data['grid_points'],
+                spouse_own_assets=data['spouse_own_assets'],
+                annual_growth_rate=data['annual_growth_rate'],
+                years=data['years'],
+                workers=workers
+            )
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': {
+                    'code': 'VALIDATION_ERROR',
+                    'message': str(e)
+                }
+            }), 400
+        
+        # レスポンスの作成
+        best = simulation.best_index
+        result = {
+            'best': {
+                'spouse_share': float(simulation.spouse_shares[best]),
+                'spouse_amount': int(simulation.spouse_amounts[best]),
+                'first_tax_amount': int(simulation.first_taxes[best]),
+                'second_tax_amount': int(simulation.second_taxes[best]),
+                'combined_tax_amount': int(simulation.combined_taxes[best])
+            },
+            'curve': [
+                {
+                    'spouse_share': float(share),
+                    'spouse_amount': int(spouse_amount),
+                    'first_tax_amount': int(first_tax),
+                    'second_taxable_amount': int(second_estate),
+                    'second_tax_amount': int(second_tax),
+                    'combined_tax_amount': int(combined_tax)
+                } for share, spouse_amount, first_tax, second_estate, second_tax, combined_tax in zip(
+                    simulation.spouse_shares, simulation.spouse_amounts, simulation.first_taxes,
+                    simulation.second_estates, simulation.second_taxes, simulation.combined_taxes
+                )
+            ]
+        }
+        
+        return jsonify({
+            'success': True,
+            'result': result
+        })
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': {
+                'code': 'INTERNAL_SERVER_ERROR',
+                'message': str(e)
+            }
+        }), 500
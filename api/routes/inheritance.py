@@ -1,13 +1,29 @@
 """
 相続税計算API のルート定義
 """
-from flask import Blueprint, request, jsonify
+import importlib.util
+import json
+from datetime import timedelta
+
+from flask import Blueprint, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
 from services.tax_calculator import InheritanceTaxCalculator
-from models.inheritance import (
-    FamilyStructure, TaxCalculationInput, DivisionInput,
-    ValidationError, ValidationResult
+from services.heir_cache import HeirCache
+from services.metrics import metrics, phase, record_heirs_count, counter_lines, gauge_lines
+from services.result_cache import ResultCache, request_key
+from services.what_if import WhatIfAnalyzer
+from services.result_export import EXPORT_FORMATS, MIMETYPES, ExportRecord, export_rows, iter_csv, iter_xlsx
+from models.tax_schedule import CURRENT_TAX_SCHEDULE, TAX_SCHEDULES
+from routes.lazy import LazyView
+from routes.schema import (
+    HEIRS_REQUEST, TAX_AMOUNT_REQUEST, BATCH_LINE_REQUEST, ACTUAL_DIVISION_REQUEST, FULL_REQUEST, TAX_CURVE_REQUEST,
+    WHAT_IF_REQUEST
+)
+from routes.serializers import (
+    dumps, json_response, PrerenderedResponse, serialize_tax_schedule,
+    serialize_heirs_result, serialize_tax_calculation_result, serialize_division_result, serialize_what_if_outcome
 )
+from models.inheritance import DivisionInput, ValidationError
 
 # ブループリントの作成
 inheritance_bp = Blueprint('inheritance', __name__)
@@ -16,86 +32,169 @@ CORS(inheritance_bp)  # CORS対応
 # 計算サービスのインスタンス
 calculator = InheritanceTaxCalculator()
 
+# 法定相続人判定のキャッシュ（heirs / tax-amount / batch で共有）
+heir_cache = HeirCache(calculator, maxsize=1024)
+
+# what-if 分析（法定相続人・税額曲線は heir_cache と共有）
+what_if_analyzer = WhatIfAnalyzer(heir_cache)
+
+# what-if 分析APIで受け付ける変化形の上限
+MAX_WHAT_IF_PERTURBATIONS = 200
+
+
+# 計算結果のキャッシュ（tax-amount / actual-division。入力のハッシュを ETag として使う）
+result_cache = ResultCache(maxsize=4096, ttl=600.0)
+
+
+def _cache_metrics(prefix, label, cache):
+    """キャッシュの統計を Prometheus の行に変換する収集関数を作成"""
+    def collect():
+        lines = []
+        for key, value in cache.stats().items():
+            if key == 'size':
+                lines += gauge_lines(f'{prefix}_size', f'{label} entries', value)
+            elif key != 'maxsize':
+                lines += counter_lines(f'{prefix}_{key}_total', f'{label} {key.replace("_", " ")}', value)
+        return lines
+    return collect
+
+
+metrics.add_collector(_cache_metrics('inheritance_heir_cache', 'Heir cache', heir_cache))
+metrics.add_collector(_cache_metrics('inheritance_result_cache', 'Result cache', result_cache))
+
+# NumPy を使う分析系API（routes.analysis）は初回リクエスト時に読み込む
+for _rule, _view in (
+    ('/calculation/inverse-tax', 'solve_inverse_tax'),
+    ('/calculation/optimize-division', 'optimize_division'),
+    ('/simulation/monte-carlo', 'simulate_monte_carlo'),
+    ('/simulation/secondary-inheritance', 'simulate_secondary_inheritance'),
+):
+    inheritance_bp.add_url_rule(_rule, view_func=LazyView(f'routes.analysis.{_view}'), methods=['POST'])
+
+# 一括計算ジョブAPI（routes.jobs。SQLite とワーカーは初回リクエスト時に用意する）
+for _rule, _view, _method in (
+    ('/jobs', 'submit_job', 'POST'),
+    ('/jobs/<job_id>', 'get_job', 'GET'),
+    ('/jobs/<job_id>', 'delete_job', 'DELETE'),
+    ('/jobs/<job_id>/results', 'get_job_results', 'GET'),
+):
+    inheritance_bp.add_url_rule(_rule, view_func=LazyView(f'routes.jobs.{_view}'), methods=[_method])
+
 
-def format_currency(amount):
-    """金額をカンマ区切りでフォーマット"""
-    if amount is None:
-        return "0"
-    return f"{amount:,}"
+@inheritance_bp.before_request
+def _start_timing():
+    if metrics.enabled and request.endpoint != 'inheritance.get_metrics':
+        metrics.start_request()
 
 
-def format_percentage(rate):
-    """割合をパーセント表示でフォーマット"""
-    if rate is None:
-        return "0.0%"
-    return f"{rate * 100:.1f}%"
+@inheritance_bp.after_request
+def _finish_timing(response):
+    endpoint = request.url_rule.rule if request.url_rule else 'unknown'
+    if response.is_streamed:
+        # 逐次返すレスポンス（一括計算など）は本文を送り終えるまで計測する（ヘッダは送信済みのため Server-Timing は付けない）
+        if metrics.enabled:
+            status = response.status_code
+            response.call_on_close(lambda: metrics.finish_request(endpoint, status))
+        return response
+    server_timing = metrics.finish_request(endpoint, response.status_code)
+    if server_timing is not None:
+        response.headers['Server-Timing'] = server_timing
+        response.headers['Timing-Allow-Origin'] = '*'
+    return response
+
+
+def _compact_requested():
+    """クエリ文字列 ?format=compact の指定（表示用の _formatted フィールドを省略）"""
+    return request.args.get('format') == 'compact'
+
+
+def _cached_json_response(kind, normalized_input, compute):
+    """入力だけで決まる計算結果のレスポンス
+
+    正規化した入力のハッシュを ETag とし、If-None-Match が一致すれば計算せずに 304 を返す。
+    キャッシュにあればシリアライズ済みの結果を返し、なければ compute() の結果をキャッシュする。
+    """
+    key = request_key(kind, dict(normalized_input, compact=_compact_requested()))
+    if key in request.if_none_match:
+        result_cache.record_not_modified()
+        response = Response(status=304)
+    else:
+        body = result_cache.get(key)
+        if body is None:
+            result = compute()
+            with phase('serialize'):
+                body = dumps({'success': True, 'result': result})
+            result_cache.put(key, body)
+        response = Response(body, mimetype='application/json')
+    response.set_etag(key)
+    return response
+
+
+def _validation_error_details(errors):
+    """バリデーションエラーをレスポンス用の形式に変換"""
+    return [
+        {
+            'field': error.field,
+            'code': error.code,
+            'message': error.message
+        } for error in errors
+    ]
+
+
+def _validation_error_response(errors, message='入力値に問題があります'):
+    """バリデーションエラーのレスポンス"""
+    return jsonify({
+        'success': False,
+        'error': {
+            'code': 'VALIDATION_ERROR',
+            'message': message,
+            'details': _validation_error_details(errors)
+        }
+    }), 400
+
+
+def _schema_error_message(errors):
+    """スキーマのエラーのメッセージ（1件ならそのメッセージ）"""
+    return errors[0].message if len(errors) == 1 else '入力値に問題があります'
+
+
+def _parse_request(schema):
+    """リクエストの JSON を schema で解析し、(値, エラー時のレスポンス) を返す"""
+    with phase('parse'):
+        value, errors = schema.parse(request.get_json(silent=True))
+    if errors:
+        return None, _validation_error_response(errors, _schema_error_message(errors))
+    return value, None
 
 
 @inheritance_bp.route('/calculation/heirs', methods=['POST'])
 def determine_heirs():
     """法定相続人判定API"""
     try:
-        data = request.get_json()
-        
-        # 入力データの検証
-        family_structure_data = data.get('family_structure', {})
-        family_structure = FamilyStructure(
-            spouse_exists=family_structure_data.get('spouse_exists', False),
-            children_count=family_structure_data.get('children_count', 0),
-            adopted_children_count=family_structure_data.get('adopted_children_count', 0),
-            grandchild_adopted_count=family_structure_data.get('grandchild_adopted_count', 0),
-            parents_alive=family_structure_data.get('parents_alive', 0),
-            grandparents_alive=family_structure_data.get('grandparents_alive', 0),
-            siblings_count=family_structure_data.get('siblings_count', 0),
-            half_siblings_count=family_structure_data.get('half_siblings_count', 0),
-            non_heirs_count=family_structure_data.get('non_heirs_count', 0)
-        )
+        data, error_response = _parse_request(HEIRS_REQUEST)
+        if error_response is not None:
+            return error_response
+        family_structure = data['family_structure']
         
         # バリデーション
         validation_result = calculator.validate_family_structure(family_structure)
         if not validation_result.is_valid:
-            return jsonify({
-                'success': False,
-                'error': {
-                    'code': 'VALIDATION_ERROR',
-                    'message': '入力値に問題があります',
-                    'details': [
-                        {
-                            'field': error.field,
-                            'code': error.code,
-                            'message': error.message
-                        } for error in validation_result.errors
-                    ]
-                }
-            }), 400
+            return _validation_error_response(validation_result.errors)
         
         # 法定相続人の判定
-        legal_heirs = calculator.determine_legal_heirs(family_structure)
-        basic_deduction = calculator.calculate_basic_deduction(legal_heirs)
+        with phase('heirs'):
+            heir_template = heir_cache.get(family_structure)
+        legal_heirs = heir_template.heirs
+        basic_deduction = heir_template.basic_deduction
+        record_heirs_count(len(legal_heirs))
         
         # レスポンスの作成
-        result = {
-            'legal_heirs': [
-                {
-                    'id': heir.id,
-                    'name': heir.name,
-                    'type': heir.heir_type.value,
-                    'relationship': heir.relationship.value,
-                    'inheritance_share': heir.inheritance_share,
-                    'inheritance_share_formatted': format_percentage(heir.inheritance_share),
-                    'two_fold_addition': heir.two_fold_addition,
-                    'is_adopted': heir.is_adopted
-                } for heir in legal_heirs
-            ],
-            'total_heirs_count': len(legal_heirs),
-            'basic_deduction': basic_deduction,
-            'basic_deduction_formatted': format_currency(basic_deduction)
-        }
-        
-        return jsonify({
-            'success': True,
-            'result': result
-        })
+        with phase('serialize'):
+            result = serialize_heirs_result(legal_heirs, basic_deduction, _compact_requested())
+            return json_response({
+                'success': True,
+                'result': result
+            })
         
     except Exception as e:
         return jsonify({
@@ -111,84 +210,206 @@ def determine_heirs():
 def calculate_tax_amount():
     """相続税額計算API"""
     try:
-        data = request.get_json()
+        data, error_response = _parse_request(TAX_AMOUNT_REQUEST)
+        if error_response is not None:
+            return error_response
+        taxable_amount = data['taxable_amount']
+        family_structure = data['family_structure']
+        inheritance_date = data['inheritance_date']
         
-        # 入力データの取得
-        taxable_amount = data.get('taxable_amount', 0)
-        family_structure_data = data.get('family_structure', {})
+        def compute():
+            # 法定相続人の判定
+            with phase('heirs'):
+                legal_heirs = list(heir_cache.get(family_structure).heirs)
+            record_heirs_count(len(legal_heirs))
         
-        if taxable_amount <= 0:
-            return jsonify({
+            # 相続税計算
+            tax_result = calculator.calculate_tax_by_legal_share(taxable_amount, legal_heirs, inheritance_date)
+        
+            # レスポンスの作成
+            with phase('serialize'):
+                return serialize_tax_calculation_result(taxable_amount, tax_result, _compact_requested())
+        
+        return _cached_json_response('tax-amount', data, compute)
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': {
+                'code': 'INTERNAL_SERVER_ERROR',
+                'message': str(e)
+            }
+        }), 500
+
+
+def _evaluate_batch_line(raw_line, line_number):
+    """一括計算の1行分を解析・計算し、(出力する1行分の辞書, 計算結果) を返す
+
+    計算結果は (課税価格の合計額, TaxCalculationResult, DivisionResult または None)。
+    エラーの場合は None で、辞書に success: False とエラーの内容が入る。
+    """
+    try:
+        data = json.loads(raw_line)
+    except ValueError as e:
+        return {
+            'line': line_number,
+            'success': False,
+            'error': {
+                'code': 'INVALID_JSON',
+                'message': f'JSONとして解析できません: {e}'
+            }
+        }, None
+
+    output = {'line': line_number}
+    try:
+        if isinstance(data, dict) and 'id' in data:
+            output['id'] = data['id']
+
+        request_data, errors = BATCH_LINE_REQUEST.parse(data)
+        if not errors:
+            family_structure = request_data['family_structure']
+            errors = calculator.validate_family_structure(family_structure).errors
+        division_input = None
+        if not errors:
+            taxable_amount = request_data['taxable_amount']
+            inheritance_date = request_data['inheritance_date']
+            legal_heirs = list(heir_cache.get(family_structure).heirs)
+            if request_data['division'] is not None:
+                division_input = DivisionInput(
+                    total_amount=taxable_amount,
+                    heirs=legal_heirs,
+                    total_tax_amount=0,  # 相続税の総額は計算後に設定する
+                    inheritance_date=inheritance_date,
+                    **request_data['division']
+                )
+                errors = calculator.validate_division_input(division_input, legal_heirs).errors
+        if errors:
+            output.update({
                 'success': False,
                 'error': {
                     'code': 'VALIDATION_ERROR',
-                    'message': '課税価格の合計額は正の値である必要があります'
+                    'message': _schema_error_message(errors),
+                    'details': _validation_error_details(errors)
                 }
-            }), 400
-        
-        # 家族構成の作成
-        family_structure = FamilyStructure(
-            spouse_exists=family_structure_data.get('spouse_exists', False),
-            children_count=family_structure_data.get('children_count', 0),
-            adopted_children_count=family_structure_data.get('adopted_children_count', 0),
-            grandchild_adopted_count=family_structure_data.get('grandchild_adopted_count', 0),
-            parents_alive=family_structure_data.get('parents_alive', 0),
-            grandparents_alive=family_structure_data.get('grandparents_alive', 0),
-            siblings_count=family_structure_data.get('siblings_count', 0),
-            half_siblings_count=family_structure_data.get('half_siblings_count', 0),
-            non_heirs_count=family_structure_data.get('non_heirs_count', 0)
+            })
+            return output, None
+
+        tax_result = calculator.calculate_tax_by_legal_share(taxable_amount, legal_heirs, inheritance_date)
+        division_result = None
+        if division_input is not None:
+            division_input.total_tax_amount = tax_result.total_tax_amount
+            division_result = calculator.calculate_actual_division(division_input)
+        output['success'] = True
+        return output, (taxable_amount, tax_result, division_result)
+
+    except Exception as e:
+        output.update({
+            'success': False,
+            'error': {
+                'code': 'INVALID_REQUEST',
+                'message': str(e)
+            }
+        })
+        return output, None
+
+
+def _calculate_batch_line(raw_line, line_number, compact=False):
+    """一括計算APIの1行分を計算し、出力する1行分の辞書を返す"""
+    output, results = _evaluate_batch_line(raw_line, line_number)
+    if results is not None:
+        taxable_amount, tax_result, division_result = results
+        output['result'] = serialize_tax_calculation_result(taxable_amount, tax_result, compact)
+        if division_result is not None:
+            output['result']['actual_division'] = serialize_division_result(division_result, compact)
+    return output
+
+
+@inheritance_bp.route('/calculation/batch', methods=['POST'])
+def calculate_batch():
+    """相続税額一括計算API（NDJSON）
+
+    1行1件の tax-amount リクエストを逐次読み込み、1行1件の結果を逐次返す。
+    入力全体をメモリに載せないため、件数によらずメモリ使用量は一定。
+    行ごとのエラーはその行の結果として返し、一括処理全体は中断しない。
+    """
+    compact = _compact_requested()
+
+    def generate():
+        for line_number, raw_line in enumerate(request.stream, start=1):
+            if not raw_line.strip():
+                continue
+            output = _calculate_batch_line(raw_line, line_number, compact)
+            yield dumps(output) + b'\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+
+@inheritance_bp.route('/calculation/batch/export', methods=['POST'])
+def export_batch():
+    """相続税額一括計算の結果のダウンロード（CSV / XLSX）
+
+    入力は一括計算APIと同じ NDJSON。1件ごとの合計の行と相続人ごとの明細の行を
+    ?format=csv（既定）または xlsx で返す。計算は出力を送りながら1行ずつ進めるため、
+    件数によらずメモリ使用量は一定。エラーの行は「エラー」の行として書き出す。
+    """
+    export_format = request.args.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        return _validation_error_response(
+            [ValidationError('format', 'INVALID_VALUE', '出力形式は csv または xlsx を指定してください')],
+            '出力形式は csv または xlsx を指定してください'
         )
+    if export_format == 'xlsx' and importlib.util.find_spec('openpyxl') is None:
+        return jsonify({
+            'success': False,
+            'error': {
+                'code': 'UNSUPPORTED_FORMAT',
+                'message': 'XLSX の書き出しには openpyxl が必要です'
+            }
+        }), 501
+
+    def records():
+        for line_number, raw_line in enumerate(request.stream, start=1):
+            if not raw_line.strip():
+                continue
+            output, results = _evaluate_batch_line(raw_line, line_number)
+            case_id = None if output.get('id') is None else str(output['id'])
+            if results is None:
+                yield ExportRecord(case_id, error=f"{line_number}行目: {output['error']['message']}")
+            else:
+                yield ExportRecord(case_id, *results)
+
+    rows = export_rows(records())
+    body = iter_xlsx(rows) if export_format == 'xlsx' else iter_csv(rows)
+    response = Response(stream_with_context(body), mimetype=MIMETYPES[export_format])
+    response.headers['Content-Disposition'] = f'attachment; filename=results.{export_format}'
+    return response
+
+
+@inheritance_bp.route('/calculation/actual-division', methods=['POST'])
+def calculate_actual_division():
+    """実際の分割による税額配分計算API"""
+    try:
+        division_input, error_response = _parse_request(ACTUAL_DIVISION_REQUEST)
+        if error_response is not None:
+            return error_response
+        heirs = division_input.heirs
         
-        # 法定相続人の判定
-        legal_heirs = calculator.determine_legal_heirs(family_structure)
+        # バリデーション
+        validation_result = calculator.validate_division_input(division_input, heirs)
+        if not validation_result.is_valid:
+            return _validation_error_response(validation_result.errors, '分割入力データに問題があります')
         
-        # 相続税計算
-        tax_result = calculator.calculate_tax_by_legal_share(taxable_amount, legal_heirs)
+        record_heirs_count(len(heirs))
         
-        # レスポンスの作成
-        result = {
-            'taxable_amount': taxable_amount,
-            'taxable_amount_formatted': format_currency(taxable_amount),
-            'legal_heirs': [
-                {
-                    'id': heir.id,
-                    'name': heir.name,
-                    'type': heir.heir_type.value,
-                    'relationship': heir.relationship.value,
-                    'inheritance_share': heir.inheritance_share,
-                    'inheritance_share_formatted': format_percentage(heir.inheritance_share),
-                    'legal_share_amount': int(taxable_amount * heir.inheritance_share),
-                    'legal_share_amount_formatted': format_currency(int(taxable_amount * heir.inheritance_share)),
-                    'two_fold_addition': heir.two_fold_addition
-                } for heir in legal_heirs
-            ],
-            'basic_deduction': tax_result.basic_deduction,
-            'basic_deduction_formatted': format_currency(tax_result.basic_deduction),
-            'taxable_inheritance': tax_result.taxable_inheritance,
-            'taxable_inheritance_formatted': format_currency(tax_result.taxable_inheritance),
-            'total_tax_amount': tax_result.total_tax_amount,
-            'total_tax_amount_formatted': format_currency(tax_result.total_tax_amount),
-            'heir_tax_details': [
-                {
-                    'heir_id': detail.heir_id,
-                    'heir_name': detail.name,
-                    'relationship': detail.relationship,
-                    'legal_share_amount': detail.legal_share_amount,
-                    'legal_share_amount_formatted': format_currency(detail.legal_share_amount),
-                    'tax_before_addition': detail.tax_before_addition,
-                    'tax_before_addition_formatted': format_currency(detail.tax_before_addition),
-                    'two_fold_addition': detail.two_fold_addition,
-                    'two_fold_addition_formatted': format_currency(detail.two_fold_addition),
-                    'tax_after_addition': detail.tax_after_addition,
-                    'tax_after_addition_formatted': format_currency(detail.tax_after_addition)
-                } for detail in tax_result.heir_tax_details
-            ]
-        }
+        def compute():
+            # 実際の分割割合で計算
+            division_result = calculator.calculate_actual_division(division_input)
         
-        return jsonify({
-            'success': True,
-            'result': result
-        })
+            # レスポンスの作成
+            with phase('serialize'):
+                return serialize_division_result(division_result, _compact_requested())
+        
+        return _cached_json_response('actual-division', {'division_input': division_input}, compute)
         
     except Exception as e:
         return jsonify({
@@ -200,83 +421,191 @@ def calculate_tax_amount():
         }), 500
 
 
-@inheritance_bp.route('/calculation/actual-division', methods=['POST'])
-def calculate_actual_division():
-    """実際の分割による税額配分計算API"""
+@inheritance_bp.route('/calculation/full', methods=['POST'])
+def calculate_full():
+    """法定相続人判定・相続税額計算・実際の分割による税額配分を1回で行うAPI
+
+    heirs → tax-amount → actual-division の3回の呼び出しをまとめたもの。
+    法定相続人の判定は1回だけ行い、相続税の総額もサーバー内で実際の分割の計算に引き渡す。
+    division を省略した場合は法定相続人判定と相続税額計算の結果のみを返す。
+    """
     try:
-        data = request.get_json()
-        
-        # 入力データの取得
-        taxable_amount = data.get('total_amount', 0)
-        total_tax_amount = data.get('total_tax_amount', 0)
-        heirs_data = data.get('heirs', [])
-        
-        # 相続人データの復元
-        from models.inheritance import Heir, HeirType, RelationshipType
-        heirs = []
-        for heir_data in heirs_data:
-            heirs.append(Heir(
-                id=heir_data['id'],
-                name=heir_data['name'],
-                heir_type=HeirType(heir_data['type']),
-                relationship=RelationshipType(heir_data['relationship']),
-                inheritance_share=heir_data['inheritance_share'],
-                two_fold_addition=heir_data.get('two_fold_addition', False),
-                is_adopted=heir_data.get('is_adopted', False)
-            ))
-        
-        # 分割入力データの作成
-        division_input = DivisionInput(
-            mode=data.get('mode', 'amount'),
-            amounts=data.get('amounts'),
-            percentages=data.get('percentages'),
-            total_amount=taxable_amount,
-            heirs=heirs,
-            total_tax_amount=total_tax_amount,
-            rounding_method=data.get('rounding_method', 'round')
-        )
+        data, error_response = _parse_request(FULL_REQUEST)
+        if error_response is not None:
+            return error_response
+        taxable_amount = data['taxable_amount']
+        family_structure = data['family_structure']
+        inheritance_date = data['inheritance_date']
         
-        # バリデーション
-        validation_result = calculator.validate_division_input(division_input, heirs)
+        validation_result = calculator.validate_family_structure(family_structure)
         if not validation_result.is_valid:
+            return _validation_error_response(validation_result.errors)
+        
+        # 法定相続人の判定（1回のみ）
+        with phase('heirs'):
+            heir_template = heir_cache.get(family_structure)
+        legal_heirs = list(heir_template.heirs)
+        record_heirs_count(len(legal_heirs))
+        
+        # 分割の指定（総額・相続人は判定結果を使う）
+        division_data = data['division']
+        division_input = None
+        if division_data is not None:
+            division_input = DivisionInput(
+                total_amount=taxable_amount,
+                heirs=legal_heirs,
+                total_tax_amount=0,  # 相続税の総額は計算後に設定する
+                inheritance_date=inheritance_date,
+                **division_data
+            )
+            validation_result = calculator.validate_division_input(division_input, legal_heirs)
+            if not validation_result.is_valid:
+                return _validation_error_response(validation_result.errors, '分割入力データに問題があります')
+        
+        def compute():
+            compact = _compact_requested()
+            tax_result = calculator.calculate_tax_by_legal_share(taxable_amount, legal_heirs, inheritance_date)
+            division_result = None
+            if division_input is not None:
+                division_input.total_tax_amount = tax_result.total_tax_amount
+                division_result = calculator.calculate_actual_division(division_input)
+        
+            with phase('serialize'):
+                return {
+                    'heirs': serialize_heirs_result(legal_heirs, tax_result.basic_deduction, compact),
+                    'tax_amount': serialize_tax_calculation_result(taxable_amount, tax_result, compact),
+                    'actual_division': (serialize_division_result(division_result, compact)
+                                        if division_result is not None else None)
+                }
+        
+        return _cached_json_response('full', {
+            'taxable_amount': taxable_amount,
+            'family_structure': family_structure,
+            'inheritance_date': inheritance_date,
+            'division': division_input
+        }, compute)
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': {
+                'code': 'INTERNAL_SERVER_ERROR',
+                'message': str(e)
+            }
+        }), 500
+
+
+@inheritance_bp.route('/calculation/what-if', methods=['POST'])
+def calculate_what_if():
+    """what-if 分析API
+
+    基本ケース（family_structure・taxable_amount・division）と変化形の一覧（perturbations）を受け取り、
+    基本ケースと各変化形の税額、基本ケースとの差額を返す。
+    法定相続人・基礎控除額・税額曲線は家族構成ごとに1回だけ求めて変化形の間で共有する。
+    変化形ごとの入力エラーはその変化形の結果として返し、全体は中断しない。
+    """
+    try:
+        data, error_response = _parse_request(WHAT_IF_REQUEST)
+        if error_response is not None:
+            return error_response
+        perturbations = data['perturbations']
+        if len(perturbations) > MAX_WHAT_IF_PERTURBATIONS:
             return jsonify({
                 'success': False,
                 'error': {
                     'code': 'VALIDATION_ERROR',
-                    'message': '分割入力データに問題があります',
-                    'details': [
-                        {
-                            'field': error.field,
-                            'code': error.code,
-                            'message': error.message
-                        } for error in validation_result.errors
-                    ]
+                    'message': f'変化形は{MAX_WHAT_IF_PERTURBATIONS}件以下である必要があります'
                 }
             }), 400
+        taxable_amount = data['taxable_amount']
+        family_structure = data['family_structure']
+        
+        validation_result = calculator.validate_family_structure(family_structure)
+        if not validation_result.is_valid:
+            return _validation_error_response(validation_result.errors)
+        
+        with phase('heirs'):
+            legal_heirs = list(heir_cache.get(family_structure).heirs)
+        record_heirs_count(len(legal_heirs))
+        
+        if data['division'] is not None:
+            division_input = DivisionInput(total_amount=taxable_amount, heirs=legal_heirs, total_tax_amount=0,
+                                           inheritance_date=data['inheritance_date'], **data['division'])
+            validation_result = calculator.validate_division_input(division_input, legal_heirs)
+            if not validation_result.is_valid:
+                return _validation_error_response(validation_result.errors, '分割入力データに問題があります')
+        
+        def compute():
+            base, variants = what_if_analyzer.analyze(
+                family_structure, taxable_amount, perturbations, data['division'], data['inheritance_date']
+            )
+            compact = _compact_requested()
+            with phase('serialize'):
+                return {
+                    'base': serialize_what_if_outcome(base, compact=compact),
+                    'variants': [
+                        dict(serialize_what_if_outcome(variant, base, compact), success=True) if variant.is_valid else {
+                            'label': variant.label,
+                            'success': False,
+                            'error': {
+                                'code': 'VALIDATION_ERROR',
+                                'message': _schema_error_message(variant.errors),
+                                'details': _validation_error_details(variant.errors)
+                            }
+                        } for variant in variants
+                    ]
+                }
         
-        # 実際の分割割合で計算
-        division_result = calculator.calculate_actual_division(division_input)
+        return _cached_json_response('what-if', data, compute)
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': {
+                'code': 'INTERNAL_SERVER_ERROR',
+                'message': str(e)
+            }
+        }), 500
+
 
+@inheritance_bp.route('/calculation/tax-curve', methods=['POST'])
+def get_tax_curve():
+    """相続税総額の曲線（折れ点）取得API"""
+    try:
+        data, error_response = _parse_request(TAX_CURVE_REQUEST)
+        if error_response is not None:
+            return error_response
+        family_structure = data['family_structure']
+        
+        validation_result = calculator.validate_family_structure(family_structure)
+        if not validation_result.is_valid:
+            return _validation_error_response(validation_result.errors)
+        
+        with phase('heirs'):
+            tax_curve = heir_cache.get_tax_curve(family_structure, data['inheritance_date'])
+        
         # レスポンスの作成
         result = {
-            'total_tax_amount': division_result.total_tax_amount,
-            'total_tax_amount_formatted': format_currency(division_result.total_tax_amount),
-            'heir_details': [
+            'basic_deduction': tax_curve.basic_deduction,
+            'segments': [
                 {
-                    'heir_id': detail.heir_id,
-                    'heir_name': detail.heir_name,
-                    'inheritance_amount': detail.inheritance_amount,
-                    'inheritance_amount_formatted': format_currency(detail.inheritance_amount),
-                    'tax_amount': detail.tax_amount,
-                    'tax_amount_formatted': format_currency(detail.tax_amount),
-                    'surcharge_deduction_amount': detail.surcharge_deduction_amount,
-                    'surcharge_deduction_amount_formatted': format_currency(detail.surcharge_deduction_amount),
-                    'final_tax_amount': detail.final_tax_amount,
-                    'final_tax_amount_formatted': format_currency(detail.final_tax_amount),
-                } for detail in division_result.heir_details
+                    'start_amount': segment.start_amount,
+                    'tax_at_start': segment.tax_at_start,
+                    'marginal_rate': segment.marginal_rate
+                } for segment in tax_curve.segments()
             ]
         }
         
+        # 指定された課税価格での税額
+        amounts = data['amounts']
+        if amounts:
+            result['points'] = [
+                {
+                    'taxable_amount': amount,
+                    'total_tax_amount': tax_curve.total_tax(amount)
+                } for amount in amounts
+            ]
+        
         return jsonify({
             'success': True,
             'result': result
@@ -292,28 +621,79 @@ def calculate_actual_division():
         }), 500
 
 
+TAX_TABLE_LAST_UPDATED = '2025-06-30T00:00:00Z'
+
+# 全版をまとめた速算表は新しい版の追加で変わるため1日、版を指定した速算表は変わらないため1年キャッシュさせる
+TAX_TABLE_MAX_AGE = 24 * 60 * 60
+TAX_SCHEDULE_VERSION_MAX_AGE = 365 * 24 * 60 * 60
+
+
+def _prerender_tax_tables():
+    """速算表のレスポンス（キーは版。None は現行の速算表と全版の一覧）"""
+    schedules = []
+    responses = {}
+    for i, schedule in enumerate(TAX_SCHEDULES):
+        next_schedule = TAX_SCHEDULES[i + 1] if i + 1 < len(TAX_SCHEDULES) else None
+        document = serialize_tax_schedule(
+            schedule, next_schedule.effective_from - timedelta(days=1) if next_schedule else None)
+        schedules.append(document)
+        responses[schedule.version] = PrerenderedResponse({
+            'success': True,
+            'data': dict(document, last_updated=TAX_TABLE_LAST_UPDATED)
+        }, TAX_SCHEDULE_VERSION_MAX_AGE, immutable=True)
+
+    responses[None] = PrerenderedResponse({
+        'success': True,
+        'data': {
+            'tax_table': CURRENT_TAX_SCHEDULE.to_table(),
+            'current_version': CURRENT_TAX_SCHEDULE.version,
+            'schedules': schedules,
+            'last_updated': TAX_TABLE_LAST_UPDATED
+        }
+    }, TAX_TABLE_MAX_AGE)
+    return responses
+
+
+_TAX_TABLE_RESPONSES = _prerender_tax_tables()
+
+
 @inheritance_bp.route('/utilities/tax-table', methods=['GET'])
 def get_tax_table():
-    """相続税速算表取得API"""
-    try:
-        from models.inheritance import TAX_TABLE
-        
-        return jsonify({
-            'success': True,
-            'data': {
-                'tax_table': TAX_TABLE,
-                'last_updated': '2025-06-30T00:00:00Z'
-            }
-        })
-        
-    except Exception as e:
+    """相続税速算表取得API（?version=適用開始日 で版を指定）"""
+    prerendered = _TAX_TABLE_RESPONSES.get(request.args.get('version'))
+    if prerendered is None:
         return jsonify({
             'success': False,
             'error': {
-                'code': 'INTERNAL_SERVER_ERROR',
-                'message': str(e)
+                'code': 'NOT_FOUND',
+                'message': f"速算表の版が見つかりません: {request.args.get('version')}"
             }
-        }), 500
+        }), 404
+    return prerendered.response(request)
+
+
+@inheritance_bp.route('/utilities/heir-cache', methods=['GET'])
+def get_heir_cache_stats():
+    """法定相続人判定キャッシュの統計取得API"""
+    return jsonify({
+        'success': True,
+        'data': heir_cache.stats()
+    })
+
+
+@inheritance_bp.route('/utilities/result-cache', methods=['GET'])
+def get_result_cache_stats():
+    """計算結果キャッシュの統計取得API"""
+    return jsonify({
+        'success': True,
+        'data': result_cache.stats()
+    })
+
+
+@inheritance_bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    """メトリクス取得API（Prometheus のテキスト形式）"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
 
 
 @inheritance_bp.route('/health', methods=['GET'])
@@ -0,0 +1,174 @@
+"""
+一括計算ジョブAPI のビュー関数
+
+大量の一括計算をジョブとして登録し、ワーカースレッドで実行する。
+ジョブは SQLite に保存するため、コールドスタートでは読み込まず、
+routes.inheritance から LazyView で初回リクエスト時に読み込む（ワーカーもそのときに起動する）。
+
+環境変数
+- INHERITANCE_JOB_DATABASE: ジョブを保存する SQLite ファイル（既定は api/database/jobs.db）
+- INHERITANCE_JOB_WORKERS: このプロセスで起動するワーカー数（0 なら起動せず、`python api/cli.py worker` に任せる）
+- INHERITANCE_JOB_RETENTION: 完了したジョブを結果ごと保存しておく秒数（既定は7日）
+"""
+import os
+from datetime import datetime, timezone
+
+from flask import Response, jsonify, request
+
+from routes.inheritance import (
+    _calculate_batch_line, _compact_requested, _schema_error_message, _validation_error_response
+)
+from routes.serializers import dumps
+from models.inheritance import ValidationError
+from services.job_queue import DEFAULT_RETENTION, JobQueue, JobStore
+
+JOB_DATABASE = os.environ.get('INHERITANCE_JOB_DATABASE') or os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'database', 'jobs.db')
+JOB_WORKERS = int(os.environ.get('INHERITANCE_JOB_WORKERS', '2'))
+JOB_RETENTION = float(os.environ.get('INHERITANCE_JOB_RETENTION', DEFAULT_RETENTION))
+
+# 結果の取得で1ページに返す件数の既定値と上限
+DEFAULT_RESULTS_PAGE_SIZE = 100
+MAX_RESULTS_PAGE_SIZE = 1000
+
+
+def process_batch_line(raw_line, line_number, options):
+    """ジョブの1行分を一括計算APIと同じ形式で計算する"""
+    output = _calculate_batch_line(raw_line, line_number, options.get('compact', False))
+    return output['success'], dumps(output)
+
+
+# ワーカーはジョブAPIの最初のリクエストで起動する（`python api/cli.py worker` では起動数を指定して起動する）
+job_queue = JobQueue(JobStore(JOB_DATABASE), process_batch_line, workers=JOB_WORKERS, retention=JOB_RETENTION)
+
+
+def _timestamp(value):
+    return datetime.fromtimestamp(value, timezone.utc).isoformat() if value is not None else None
+
+
+def _serialize_job(job):
+    return {
+        'job_id': job.id,
+        'status': job.status,
+        'total': job.total,
+        'processed': job.processed,
+        'failed': job.failed,
+        'progress': round(job.progress, 4),
+        'error': job.error,
+        'created_at': _timestamp(job.created_at),
+        'started_at': _timestamp(job.started_at),
+        'finished_at': _timestamp(job.finished_at),
+    }
+
+
+def _job_not_found():
+    return jsonify({
+        'success': False,
+        'error': {
+            'code': 'NOT_FOUND',
+            'message': 'ジョブが見つかりません'
+        }
+    }), 404
+
+
+def _page_args():
+    """クエリ文字列の after・limit を解析し、(after, limit, エラーの一覧) を返す"""
+    values, errors = {}, []
+    for name, default, minimum, maximum in (
+        ('after', 0, 0, None),
+        ('limit', DEFAULT_RESULTS_PAGE_SIZE, 1, MAX_RESULTS_PAGE_SIZE),
+    ):
+        raw = request.args.get(name)
+        value = int(raw) if raw is not None and raw.isdigit() else (default if raw is None else None)
+        if value is None or value < minimum or (maximum is not None and value > maximum):
+            limit = f'{minimum}以上{maximum}以下' if maximum is not None else f'{minimum}以上'
+            errors.append(ValidationError(name, 'INVALID_VALUE', f'{name} は{limit}の整数である必要があります'))
+        values[name] = value
+    return values['after'], values['limit'], errors
+
+
+def submit_job():
+    """一括計算ジョブの登録API
+
+    入力は一括計算API（/calculation/batch）と同じ NDJSON。入力を保存して 202 とジョブIDを返し、
+    計算はワーカーが行う。?format=compact を付けると結果を compact 形式で保存する。
+    """
+    job_queue.start()
+    try:
+        def lines():
+            for line_number, raw_line in enumerate(request.stream, start=1):
+                if raw_line.strip():
+                    yield line_number, raw_line.decode('utf-8', errors='replace')
+
+        job = job_queue.submit(lines(), {'compact': _compact_requested()})
+        response = jsonify({
+            'success': True,
+            'result': _serialize_job(job)
+        })
+        response.status_code = 202
+        response.headers['Location'] = f'/api/jobs/{job.id}'
+        return response
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': {
+                'code': 'INTERNAL_SERVER_ERROR',
+                'message': str(e)
+            }
+        }), 500
+
+
+def get_job(job_id):
+    """ジョブの状態・進捗の取得API"""
+    job_queue.start()
+    job = job_queue.store.get(job_id)
+    if job is None:
+        return _job_not_found()
+    return jsonify({
+        'success': True,
+        'result': _serialize_job(job)
+    })
+
+
+def delete_job(job_id):
+    """ジョブの削除API（入力・結果ごと削除する。実行中のジョブは計算を打ち切る）"""
+    job_queue.start()
+    job = job_queue.store.get(job_id)
+    if job is None or not job_queue.store.delete(job_id):
+        return _job_not_found()
+    return jsonify({
+        'success': True,
+        'result': _serialize_job(job)
+    })
+
+
+def get_job_results(job_id):
+    """ジョブの結果の取得API（行番号をカーソルとするページング）
+
+    ?after=<行番号>&limit=<件数> で、行番号 after より後の計算済みの結果を返す。
+    各結果は一括計算APIの1行と同じ形式。次のページは after に next_after を指定する（null なら最後まで取得済み）。
+    ジョブの実行中でも計算済みの分を取得できる。
+    """
+    job_queue.start()
+    job = job_queue.store.get(job_id)
+    if job is None:
+        return _job_not_found()
+    after, limit, errors = _page_args()
+    if errors:
+        return _validation_error_response(errors, _schema_error_message(errors))
+
+    rows = job_queue.store.results(job_id, after, limit)
+    # 1ページ分あるか実行中なら続きがある（実行中は計算済みの分だけ返すので、同じ after で再度取得する）
+    if len(rows) == limit or not job.is_finished:
+        next_after = rows[-1][0] if rows else after
+    else:
+        next_after = None
+    # {"success": true, "result": {"job": ..., "next_after": ..., "items": [...]}}
+    # items は保存済みの JSON をそのままつなげる
+    body = b''.join((
+        b'{"success":true,"result":{"job":', dumps(_serialize_job(job)),
+        b',"next_after":', dumps(next_after),
+        b',"items":[', b','.join(payload for _, payload in rows), b']}}',
+    ))
+    return Response(body, mimetype='application/json')
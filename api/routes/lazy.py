@@ -0,0 +1,22 @@
+"""
+ビュー関数の遅延読み込み
+
+Flask のドキュメントにある LazyView パターン。重い依存を持つビューは
+URLルールだけを登録しておき、モジュールは初回リクエスト時に読み込む。
+"""
+from werkzeug.utils import cached_property, import_string
+
+
+class LazyView:
+    """'モジュール名.関数名' で指定したビュー関数を初回呼び出し時に読み込む"""
+
+    def __init__(self, import_name):
+        self.__module__, self.__name__ = import_name.rsplit('.', 1)
+        self.import_name = import_name
+
+    @cached_property
+    def view(self):
+        return import_string(self.import_name)
+
+    def __call__(self, *args, **kwargs):
+        return self.view(*args, **kwargs)
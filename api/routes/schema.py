@@ -0,0 +1,422 @@
+"""
+APIリクエストの解析・検証
+
+各APIのリクエスト（JSON）を、フィールド定義から起動時に一度だけ組み立てたフィールドごとの解析関数で解析する。
+1回の走査で型の確認・既定値の補完・値の範囲の確認を行ってモデル（FamilyStructure など）に変換し、
+エラーは最初の1件で止めずにすべてのフィールドについて集めて返す。
+JSON の null は省略と同じ扱い（既定値を使う）。数値の NaN・Infinity は受け付けない。
+"""
+import math
+from datetime import date
+from fractions import Fraction
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from models.inheritance import (
+    DivisionInput, FamilyStructure, Heir, HeirType, MAX_SHARE_DENOMINATOR, RelationshipType, ValidationError
+)
+from models.tax_schedule import schedule_for
+from services.what_if import Perturbation
+
+_MISSING = object()
+
+_TYPE_NAMES = {
+    'bool': '真偽値',
+    'int': '整数',
+    'number': '数値',
+    'str': '文字列',
+    'date': '日付（YYYY-MM-DD）',
+    'choice': '文字列',
+    'object': 'オブジェクト',
+    'list': '配列',
+    'map': 'オブジェクト',
+}
+
+
+def _as_int(value):
+    """整数（整数値の浮動小数点数 100000000.0 なども受け付ける）。それ以外は _MISSING"""
+    if value.__class__ is int:
+        return value
+    if value.__class__ is float and value.is_integer():
+        return int(value)
+    return _MISSING
+
+
+def _as_number(value):
+    """有限の数値（NaN・Infinity は受け付けない。bool は int の派生型のため含めない）。それ以外は _MISSING"""
+    if value.__class__ is int:
+        return value
+    if value.__class__ is float and math.isfinite(value):
+        return value
+    return _MISSING
+
+
+def _as_type(type_):
+    def convert(value):
+        return value if value.__class__ is type_ else _MISSING
+    return convert
+
+
+# 型の確認と変換（変換できない値は _MISSING）
+_CONVERTERS = {
+    'bool': _as_type(bool),
+    'int': _as_int,
+    'number': _as_number,
+    'str': _as_type(str),
+    'date': _as_type(str),
+    'choice': _as_type(str),
+    'object': _as_type(dict),
+    'list': _as_type(list),
+    'map': _as_type(dict),
+}
+
+
+class Field(NamedTuple):
+    """リクエストのフィールド定義"""
+    name: str  # JSON のキー
+    kind: str  # bool / int / number / str / date / choice / object / list / map / any
+    label: str  # エラーメッセージに使う名前
+    default: Any = None  # 省略時の値
+    required: bool = False
+    minimum: Optional[float] = None  # 最小値（int / number。exclusive_minimum なら含まない）
+    exclusive_minimum: bool = False
+    maximum: Optional[float] = None  # 最大値（int / number）
+    choices: Optional[Dict[str, Any]] = None  # choice の値 -> 変換後の値
+    schema: Optional["Schema"] = None  # object・list の要素のスキーマ
+    item: Optional[str] = None  # list・map の要素の型（int / number / str）
+    message: Optional[str] = None  # 範囲外のときのメッセージ
+    attr: Optional[str] = None  # 変換後のモデルの引数名（省略時は name）
+    flat: bool = False  # object のフィールドのエラーを親の名前を付けずに報告する
+    check: Optional[Callable[[Any], None]] = None  # 追加の検証（ValueError を送出すると INVALID_VALUE）
+
+
+def _field_error(errors: List[ValidationError], path: str, code: str, message: str) -> None:
+    errors.append(ValidationError(field=path, code=code, message=message))
+
+
+def _parse_date(value):
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        return _MISSING
+
+
+def _range_message(field: Field) -> str:
+    if field.message:
+        return field.message
+    parts = []
+    if field.minimum is not None:
+        parts.append(f"{field.minimum:,}{'より大きい' if field.exclusive_minimum else '以上'}")
+    if field.maximum is not None:
+        parts.append(f"{field.maximum:,}以下")
+    return f"{field.label}は{'、'.join(parts)}である必要があります"
+
+
+def _range_check(field: Field) -> Optional[Callable[[Any], bool]]:
+    """値が範囲内かを返す関数（範囲の指定がなければ None）"""
+    minimum, maximum, exclusive = field.minimum, field.maximum, field.exclusive_minimum
+    if minimum is None and maximum is None:
+        return None
+
+    def in_range(value) -> bool:
+        if minimum is not None and (value <= minimum if exclusive else value < minimum):
+            return False
+        return maximum is None or value <= maximum
+    return in_range
+
+
+# 値の解析関数: (値, エラーの一覧, フィールドのパス) → 変換後の値（エラーのときは _MISSING）
+ValueParser = Callable[[Any, List[ValidationError], str], Any]
+
+
+def _scalar_parser(field: Field, kind: str, type_message: str) -> ValueParser:
+    """int / number / bool / str / date / choice の値の解析関数"""
+    convert = _CONVERTERS[kind]
+    in_range = _range_check(field) if kind in ('int', 'number') else None
+    range_message = _range_message(field)
+
+    def parse(value, errors, path):
+        value = convert(value)
+        if value is _MISSING:
+            _field_error(errors, path, 'INVALID_TYPE', type_message)
+            return _MISSING
+        if in_range is not None and not in_range(value):
+            _field_error(errors, path, 'INVALID_VALUE', range_message)
+            return _MISSING
+        return value
+
+    if kind == 'date':
+        date_message = f"{field.label}の形式が不正です（YYYY-MM-DD）"
+
+        def parse_date(value, errors, path):
+            value = parse(value, errors, path)
+            if value is _MISSING:
+                return _MISSING
+            parsed = _parse_date(value)
+            if parsed is _MISSING:
+                _field_error(errors, path, 'INVALID_VALUE', date_message)
+            return parsed
+        return parse_date
+
+    if kind == 'choice':
+        choices = field.choices
+        choice_message = f"{field.label}は {', '.join(choices)} のいずれかである必要があります"
+
+        def parse_choice(value, errors, path):
+            value = parse(value, errors, path)
+            if value is _MISSING:
+                return _MISSING
+            choice = choices.get(value, _MISSING)
+            if choice is _MISSING:
+                _field_error(errors, path, 'INVALID_VALUE', choice_message)
+            return choice
+        return parse_choice
+
+    return parse
+
+
+def _value_parser(field: Field) -> ValueParser:
+    """フィールドの値（null 以外）の解析関数"""
+    kind = field.kind
+    type_message = f"{field.label}は{_TYPE_NAMES.get(kind, '')}である必要があります"
+    if kind == 'any':
+        return lambda value, errors, path: value
+    if kind not in _CONVERTERS:
+        raise ValueError(f"未対応の型です: {kind}")
+    if kind not in ('object', 'list', 'map'):
+        return _scalar_parser(field, kind, type_message)
+
+    convert = _CONVERTERS[kind]
+
+    def check_type(value, errors, path) -> bool:
+        if convert(value) is _MISSING:
+            _field_error(errors, path, 'INVALID_TYPE', type_message)
+            return False
+        return True
+
+    if kind == 'object':
+        if field.schema is None:
+            return lambda value, errors, path: value if check_type(value, errors, path) else _MISSING
+        parse_object = field.schema.parse_into
+        flat = field.flat
+
+        def parse(value, errors, path):
+            if not check_type(value, errors, path):
+                return _MISSING
+            return parse_object(value, errors, path[:-len(field.name)] if flat else path + '.')
+        return parse
+
+    if kind == 'list' and field.schema is not None:
+        parse_item = field.schema.parse_into
+        item_message = f"{field.label}の要素はオブジェクトである必要があります"
+
+        def parse(value, errors, path):
+            if not check_type(value, errors, path):
+                return _MISSING
+            items = []
+            for index, item in enumerate(value):
+                if item.__class__ is dict:
+                    items.append(parse_item(item, errors, f"{path}[{index}]."))
+                else:
+                    _field_error(errors, f"{path}[{index}]", 'INVALID_TYPE', item_message)
+            return items
+        return parse
+
+    if field.item is None:
+        return lambda value, errors, path: value if check_type(value, errors, path) else _MISSING
+    parse_item = _scalar_parser(field, field.item, f"{field.label}の各要素は{_TYPE_NAMES[field.item]}である必要があります")
+
+    if kind == 'list':
+        def parse(value, errors, path):
+            if not check_type(value, errors, path):
+                return _MISSING
+            items = []
+            for index, item in enumerate(value):
+                item = parse_item(item, errors, f"{path}[{index}]")
+                if item is not _MISSING:
+                    items.append(item)
+            return items
+        return parse
+
+    def parse(value, errors, path):
+        if not check_type(value, errors, path):
+            return _MISSING
+        items = {}
+        for key, item in value.items():
+            item = parse_item(item, errors, f"{path}.{key}")
+            if item is not _MISSING:
+                items[key] = item
+        return items
+    return parse
+
+
+def _field_parser(field: Field) -> Callable[[Dict, List[ValidationError], str], Any]:
+    """1フィールド分の解析関数: (リクエストの辞書, エラーの一覧, パスの接頭辞) → 変換後の値"""
+    key = field.name
+    default = field.default
+    required = field.required
+    missing_message = field.label + 'を入力してください'
+    parse_value = _value_parser(field)
+    check = field.check
+    check_message = field.label + 'が不正です: '
+
+    def parse(data, errors, prefix):
+        path = prefix + key
+        value = data.get(key)
+        if value is None:
+            if required:
+                _field_error(errors, path, 'MISSING', missing_message)
+            value = default
+        else:
+            value = parse_value(value, errors, path)
+            if value is _MISSING:
+                value = default
+        if check is not None and value is not None:
+            try:
+                check(value)
+            except ValueError as e:
+                _field_error(errors, path, 'INVALID_VALUE', check_message + str(e))
+        return value
+    return parse
+
+
+class Schema:
+    """フィールド定義から組み立てた解析関数を持つリクエストのスキーマ"""
+
+    def __init__(self, name: str, fields: Sequence[Field], factory: Optional[Callable] = None):
+        self.name = name
+        self.fields = tuple(fields)
+        self.factory = factory
+        self._parsers = tuple((field.attr or field.name, _field_parser(field)) for field in self.fields)
+
+    def parse(self, data) -> Tuple[Any, List[ValidationError]]:
+        """リクエストを解析する。（変換後の値, エラーの一覧）を返し、エラーがあれば値は None"""
+        errors: List[ValidationError] = []
+        if data.__class__ is not dict:
+            _field_error(errors, 'request', 'INVALID_TYPE', 'リクエストはJSONオブジェクトである必要があります')
+            return None, errors
+        return self.parse_into(data, errors), errors
+
+    def parse_into(self, data: Dict, errors: List[ValidationError], prefix: str = ''):
+        """入れ子のオブジェクトとして解析する（エラーは errors に追加し、あれば None を返す）"""
+        error_count = len(errors)
+        values = {name: parse(data, errors, prefix) for name, parse in self._parsers}
+        if len(errors) != error_count:
+            return None
+        if self.factory is not None:
+            return self.factory(**values)
+        return values
+
+
+def _validate_inheritance_date(value: date) -> None:
+    schedule_for(value)  # 適用できる速算表がない場合は ValueError
+
+
+@lru_cache(maxsize=4096)
+def _share_fraction(share: float) -> Tuple[int, int]:
+    """浮動小数点の法定相続分を有理数（分子, 分母）に復元（同じ相続分が繰り返し現れるためキャッシュする）"""
+    fraction = Fraction(share).limit_denominator(MAX_SHARE_DENOMINATOR)
+    return fraction.numerator, fraction.denominator
+
+
+def _make_heir(**fields) -> Heir:
+    numerator, denominator = _share_fraction(fields['inheritance_share'])
+    return Heir(share_numerator=numerator, share_denominator=denominator, **fields)
+
+
+_COUNT = dict(kind='int', default=0, minimum=0)
+
+FAMILY_STRUCTURE_SCHEMA = Schema('family_structure', [
+    Field('spouse_exists', 'bool', '配偶者の有無', default=False),
+    Field('children_count', label='子供の数', message='子供の数は0以上である必要があります', **_COUNT),
+    Field('adopted_children_count', label='養子の数', message='養子の数は0以上である必要があります', **_COUNT),
+    Field('grandchild_adopted_count', label='孫養子の数', message='孫養子の数は0以上である必要があります', **_COUNT),
+    Field('parents_alive', label='親の生存数', message='親の生存数は0以上である必要があります', **_COUNT),
+    Field('grandparents_alive', label='祖父母の生存数', **_COUNT),
+    Field('siblings_count', label='兄弟姉妹の数', message='兄弟姉妹の数は0以上である必要があります', **_COUNT),
+    Field('half_siblings_count', label='半血兄弟姉妹の数', message='半血兄弟姉妹の数は0以上である必要があります',
+          **_COUNT),
+    Field('non_heirs_count', label='法定相続人以外の人数', **_COUNT),
+], factory=FamilyStructure)
+
+HEIR_SCHEMA = Schema('heir', [
+    Field('id', 'str', '相続人ID', required=True),
+    Field('name', 'str', '相続人名', required=True),
+    Field('type', 'choice', '相続人の種類', required=True, attr='heir_type',
+          choices={member.value: member for member in HeirType}),
+    Field('relationship', 'choice', '続柄', required=True,
+          choices={member.value: member for member in RelationshipType}),
+    Field('inheritance_share', 'number', '法定相続分', required=True, minimum=0, maximum=1),
+    Field('two_fold_addition', 'bool', '2割加算の対象', default=False),
+    Field('is_adopted', 'bool', '養子かどうか', default=False),
+], factory=_make_heir)
+
+# 家族構成（従来どおり、エラーのフィールド名は children_count などをそのまま使う）
+FAMILY_STRUCTURE_FIELD = Field('family_structure', 'object', '家族構成', default=FamilyStructure(
+    spouse_exists=False, children_count=0, adopted_children_count=0, grandchild_adopted_count=0,
+    parents_alive=0, grandparents_alive=0, siblings_count=0, half_siblings_count=0
+), schema=FAMILY_STRUCTURE_SCHEMA, flat=True)
+
+TAXABLE_AMOUNT_FIELD = Field('taxable_amount', 'int', '課税価格の合計額', required=True, minimum=0,
+                             exclusive_minimum=True, message='課税価格の合計額は正の値である必要があります')
+
+INHERITANCE_DATE_FIELD = Field('inheritance_date', 'date', '相続開始日', check=_validate_inheritance_date)
+
+ROUNDING_METHOD_FIELD = Field('rounding_method', 'choice', '端数処理', default='round',
+                              choices={'round': 'round', 'floor': 'floor', 'ceil': 'ceil'})
+
+DIVISION_FIELDS = [
+    Field('mode', 'choice', '分割の指定方法', default='amount',
+          choices={'amount': 'amount', 'percentage': 'percentage'}),
+    Field('amounts', 'map', '取得金額', item='int', minimum=0),
+    Field('percentages', 'map', '取得割合', item='number', minimum=0, maximum=100),
+    ROUNDING_METHOD_FIELD,
+]
+
+DIVISION_FIELD = Field('division', 'object', '分割の指定', schema=Schema('division', DIVISION_FIELDS))
+
+HEIRS_REQUEST = Schema('heirs', [FAMILY_STRUCTURE_FIELD])
+
+TAX_AMOUNT_REQUEST = Schema('tax-amount', [TAXABLE_AMOUNT_FIELD, FAMILY_STRUCTURE_FIELD, INHERITANCE_DATE_FIELD])
+
+# 一括計算の1行（tax-amount と同じ内容に、結果に付けて返す id と省略可能な分割の指定を加えたもの）
+BATCH_LINE_REQUEST = Schema('batch-line', [
+    Field('id', 'any', 'ID'), TAXABLE_AMOUNT_FIELD, FAMILY_STRUCTURE_FIELD, INHERITANCE_DATE_FIELD, DIVISION_FIELD
+])
+
+ACTUAL_DIVISION_REQUEST = Schema('actual-division', [
+    *DIVISION_FIELDS,
+    Field('total_amount', 'int', '課税価格の合計額', default=0, minimum=0),
+    Field('total_tax_amount', 'int', '相続税の総額', default=0, minimum=0),
+    Field('heirs', 'list', '相続人', default=(), schema=HEIR_SCHEMA),
+    INHERITANCE_DATE_FIELD,
+], factory=DivisionInput)
+
+FULL_REQUEST = Schema('full', [
+    TAXABLE_AMOUNT_FIELD, FAMILY_STRUCTURE_FIELD, INHERITANCE_DATE_FIELD, DIVISION_FIELD,
+])
+
+TAX_CURVE_REQUEST = Schema('tax-curve', [
+    FAMILY_STRUCTURE_FIELD, INHERITANCE_DATE_FIELD,
+    Field('amounts', 'list', '課税価格', item='int', minimum=0),
+])
+
+# what-if 分析の変化形（家族構成は人数の増減で指定する。負の値で減らす）
+PERTURBATION_SCHEMA = Schema('perturbation', [
+    Field('label', 'str', 'ラベル'),
+    Field('family_structure_delta', 'object', '家族構成の増減', schema=Schema('family-structure-delta', [
+        Field('spouse_exists', 'bool', '配偶者の有無'),
+        *(Field(f.name, 'int', f.label + 'の増減', default=0) for f in FAMILY_STRUCTURE_SCHEMA.fields if f.kind == 'int'),
+    ])),
+    Field('taxable_amount', 'int', '課税価格の合計額', minimum=0, exclusive_minimum=True,
+          message='課税価格の合計額は正の値である必要があります'),
+    Field('taxable_amount_change_rate', 'number', '課税価格の増減率', minimum=-1, exclusive_minimum=True,
+          message='課税価格の増減率は-1より大きい値である必要があります'),
+    Field('spouse_percentage', 'number', '配偶者の取得割合', minimum=0, maximum=100),
+    DIVISION_FIELD,
+], factory=Perturbation)
+
+WHAT_IF_REQUEST = Schema('what-if', [
+    TAXABLE_AMOUNT_FIELD, FAMILY_STRUCTURE_FIELD, INHERITANCE_DATE_FIELD, DIVISION_FIELD,
+    Field('perturbations', 'list', '変化形', required=True, schema=PERTURBATION_SCHEMA),
+])
@@ -0,0 +1,198 @@
+"""
+APIレスポンスのシリアライザ
+
+レスポンスの各レコード（相続人、税額明細など）を辞書に変換する。
+金額・割合には表示用の `_formatted` フィールドを付けるが、
+機械処理向けの compact モードではこれを省略する。
+JSONへの変換は orjson があればそれを使い、なければ標準の json を使う。
+どちらもキーは辞書に追加した順のまま、日本語は \\uXXXX にエスケープせず UTF-8 で出力する
+（Flask の jsonify はキーを並べ替え、ASCII にエスケープする。JSON として解析した内容は同じ）。
+"""
+import hashlib
+import json
+from typing import Callable, Dict
+
+from flask import Response
+
+try:
+    import orjson
+except ImportError:  # orjson は任意の依存
+    orjson = None
+
+
+def format_currency(amount):
+    """金額をカンマ区切りでフォーマット"""
+    if amount is None:
+        return "0"
+    return f"{amount:,}"
+
+
+def format_percentage(rate):
+    """割合をパーセント表示でフォーマット"""
+    if rate is None:
+        return "0.0%"
+    return f"{rate * 100:.1f}%"
+
+
+def _with_formatted(result: Dict, key: str, value, compact: bool,
+                    formatter: Callable = format_currency) -> None:
+    result[key] = value
+    if not compact:
+        result[key + '_formatted'] = formatter(value)
+
+
+def serialize_heir(heir, compact: bool = False) -> Dict:
+    """法定相続人（Heir）"""
+    result = {
+        'id': heir.id,
+        'name': heir.name,
+        'type': heir.heir_type.value,
+        'relationship': heir.relationship.value,
+    }
+    _with_formatted(result, 'inheritance_share', heir.inheritance_share, compact, format_percentage)
+    result['two_fold_addition'] = heir.two_fold_addition
+    result['is_adopted'] = heir.is_adopted
+    return result
+
+
+def serialize_legal_share_heir(heir, detail, compact: bool = False) -> Dict:
+    """相続税額計算の相続人一覧の1人分（detail は同じ相続人の税額明細）"""
+    result = {
+        'id': heir.id,
+        'name': heir.name,
+        'type': heir.heir_type.value,
+        'relationship': heir.relationship.value,
+    }
+    _with_formatted(result, 'inheritance_share', heir.inheritance_share, compact, format_percentage)
+    _with_formatted(result, 'legal_share_amount', detail.legal_share_amount, compact)
+    result['two_fold_addition'] = heir.two_fold_addition
+    return result
+
+
+def serialize_legal_share_detail(detail, compact: bool = False) -> Dict:
+    """法定相続分による税額明細（LegalShareTaxDetail）"""
+    result = {
+        'heir_id': detail.heir_id,
+        'heir_name': detail.name,
+        'relationship': detail.relationship,
+    }
+    _with_formatted(result, 'legal_share_amount', detail.legal_share_amount, compact)
+    _with_formatted(result, 'tax_before_addition', detail.tax_before_addition, compact)
+    _with_formatted(result, 'two_fold_addition', detail.two_fold_addition, compact)
+    _with_formatted(result, 'tax_after_addition', detail.tax_after_addition, compact)
+    return result
+
+
+def serialize_division_detail(detail, compact: bool = False) -> Dict:
+    """実際の分割による税額明細（DivisionTaxDetail）"""
+    result = {
+        'heir_id': detail.heir_id,
+        'heir_name': detail.heir_name,
+    }
+    _with_formatted(result, 'inheritance_amount', detail.inheritance_amount, compact)
+    _with_formatted(result, 'tax_amount', detail.tax_amount, compact)
+    _with_formatted(result, 'surcharge_deduction_amount', detail.surcharge_deduction_amount, compact)
+    _with_formatted(result, 'final_tax_amount', detail.final_tax_amount, compact)
+    return result
+
+
+def serialize_heirs_result(heirs, basic_deduction: int, compact: bool = False) -> Dict:
+    """法定相続人判定APIの result 部分"""
+    result = {
+        'legal_heirs': [serialize_heir(heir, compact) for heir in heirs],
+        'total_heirs_count': len(heirs),
+    }
+    _with_formatted(result, 'basic_deduction', basic_deduction, compact)
+    return result
+
+
+def serialize_tax_calculation_result(taxable_amount: int, tax_result, compact: bool = False) -> Dict:
+    """相続税額計算APIの result 部分（TaxCalculationResult）"""
+    details = tax_result.heir_tax_details
+    result = {}
+    _with_formatted(result, 'taxable_amount', taxable_amount, compact)
+    result['legal_heirs'] = [
+        serialize_legal_share_heir(heir, detail, compact)
+        for heir, detail in zip(tax_result.legal_heirs, details)
+    ]
+    _with_formatted(result, 'basic_deduction', tax_result.basic_deduction, compact)
+    _with_formatted(result, 'taxable_inheritance', tax_result.taxable_inheritance, compact)
+    _with_formatted(result, 'total_tax_amount', tax_result.total_tax_amount, compact)
+    result['heir_tax_details'] = [serialize_legal_share_detail(detail, compact) for detail in details]
+    return result
+
+
+def serialize_division_result(division_result, compact: bool = False) -> Dict:
+    """実際の分割による税額配分計算APIの result 部分（DivisionResult）"""
+    result = {}
+    _with_formatted(result, 'total_tax_amount', division_result.total_tax_amount, compact)
+    result['heir_details'] = [
+        serialize_division_detail(detail, compact) for detail in division_result.heir_details
+    ]
+    return result
+
+
+def serialize_what_if_outcome(outcome, base=None, compact: bool = False) -> Dict:
+    """what-if 分析APIの1ケース分（WhatIfOutcome）。base を渡すと基本ケースとの差額を付ける"""
+    result = {'label': outcome.label, 'total_heirs_count': len(outcome.heirs)}
+    _with_formatted(result, 'taxable_amount', outcome.taxable_amount, compact)
+    _with_formatted(result, 'basic_deduction', outcome.basic_deduction, compact)
+    _with_formatted(result, 'taxable_estate', outcome.taxable_estate, compact)
+    _with_formatted(result, 'total_tax_amount', outcome.total_tax_amount, compact)
+    division_result = outcome.division_result
+    result['actual_division'] = serialize_division_result(division_result, compact) if division_result else None
+    if base is not None:
+        base_division = base.division_result
+        result['difference'] = {
+            'total_tax_amount': outcome.total_tax_amount - base.total_tax_amount,
+            'actual_division_total_tax_amount': (division_result.total_tax_amount - base_division.total_tax_amount
+                                                 if division_result and base_division else None),
+        }
+    return result
+
+
+_json_encoder = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+
+
+def dumps(payload) -> bytes:
+    """JSON（UTF-8）に変換"""
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return _json_encoder.encode(payload).encode('utf-8')
+
+
+def json_response(payload, status: int = 200) -> Response:
+    """シリアライズ済みのJSONレスポンスを作成"""
+    return Response(dumps(payload), status=status, mimetype='application/json')
+
+
+def serialize_tax_schedule(schedule, effective_to=None) -> Dict:
+    """速算表（TaxSchedule）1版分。最後の区分の上限は null"""
+    return {
+        'version': schedule.version,
+        'effective_from': schedule.effective_from.isoformat(),
+        'effective_to': effective_to.isoformat() if effective_to else None,
+        'basic_deduction_base': schedule.basic_deduction_base,
+        'basic_deduction_per_heir': schedule.basic_deduction_per_heir,
+        'tax_table': schedule.to_table(),
+    }
+
+
+class PrerenderedResponse:
+    """起動時に一度だけJSONに変換しておく、内容の変わらないレスポンス（強い ETag とキャッシュ期間つき）"""
+
+    def __init__(self, payload, max_age: int, immutable: bool = False):
+        self.body = dumps(payload)
+        self.etag = hashlib.sha256(self.body).hexdigest()[:32]
+        self.max_age = max_age
+        self.immutable = immutable
+
+    def response(self, request) -> Response:
+        """If-None-Match などの条件付きリクエストに応じたレスポンス（一致すれば 304）"""
+        response = Response(self.body, mimetype='application/json')
+        response.set_etag(self.etag)
+        response.cache_control.public = True
+        response.cache_control.max_age = self.max_age
+        if self.immutable:
+            response.cache_control.immutable = True
+        return response.make_conditional(request)
@@ -0,0 +1,232 @@
+"""
+相続税の一括計算（NumPyによるベクトル化）
+
+多数の案件をまとめて計算するためのサービス。
+計算結果は InheritanceTaxCalculator の逐次計算と完全に一致する。
+逐次計算と同じく、法定相続分・按分は整数（分子・分母）の演算で1円未満を切り捨てる。
+"""
+from dataclasses import dataclass
+from datetime import date
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from models.heir_table import HeirTable, SPOUSE_CODE
+from models.inheritance import FamilyStructure, Heir, HeirType
+from models.tax_schedule import TaxSchedule, schedule_for
+from services.heir_cache import HeirCache
+from services.integer_math import mul_div_floor
+from services.tax_calculator import InheritanceTaxCalculator
+
+
+@dataclass
+class BatchTaxResult:
+    """法定相続分による一括計算の結果（各配列の先頭次元は案件）"""
+    basic_deduction: np.ndarray  # 基礎控除額
+    taxable_inheritance: np.ndarray  # 課税遺産総額
+    total_tax_amount: np.ndarray  # 相続税の総額
+    heir_tax_amounts: np.ndarray  # 各相続人の税額 (案件数, 最大相続人数)。相続人が少ない案件は0埋め
+    heir_counts: np.ndarray  # 各案件の相続人数
+
+
+@lru_cache(maxsize=None)
+def _schedule_arrays(schedule: TaxSchedule) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """速算表ごとの配列（速算表ごとに一度だけ作成）"""
+    return (
+        np.array(schedule.upper_bounds, dtype=np.int64),
+        np.array(schedule.rate_percents, dtype=np.int64),
+        np.array(schedule.deductions, dtype=np.int64),
+    )
+
+
+def tax_from_table(amounts: np.ndarray, schedule: Optional[TaxSchedule] = None) -> np.ndarray:
+    """税額速算表から税額を計算（TaxSchedule.tax_for のベクトル版）"""
+    upper_bounds, rate_percents, deductions = _schedule_arrays(schedule or schedule_for())
+    brackets = np.searchsorted(upper_bounds, amounts, side="left")
+    return amounts * rate_percents[brackets] // 100 - deductions[brackets]
+
+
+class BatchTaxCalculator:
+    """相続税一括計算サービス"""
+
+    def __init__(self, calculator: InheritanceTaxCalculator = None, heir_cache: HeirCache = None):
+        self.calculator = calculator or InheritanceTaxCalculator()
+        self.heir_cache = heir_cache or HeirCache(self.calculator)
+
+    def calculate_tax_by_legal_share(
+        self,
+        taxable_amounts: Sequence[int],
+        family_structures: Union[FamilyStructure, Sequence[FamilyStructure]],
+        inheritance_date: Optional[date] = None,
+    ) -> BatchTaxResult:
+        """法定相続分による相続税の一括計算
+
+        family_structures には案件ごとの家族構成、または全案件共通の家族構成を1つ渡す。
+        同じ家族構成の案件はまとめて計算するため、家族構成の種類が少ないほど速い。
+        """
+        schedule = schedule_for(inheritance_date)
+        amounts = np.asarray(taxable_amounts, dtype=np.int64)
+        case_count = len(amounts)
+        if isinstance(family_structures, FamilyStructure):
+            family_structures = [family_structures] * case_count
+        if len(family_structures) != case_count:
+            raise ValueError("taxable_amounts と family_structures の件数が一致しません")
+
+        groups = self._group_by_family_structure(family_structures)
+        templates = [self.heir_cache.get(fs) for fs, _ in groups]
+        max_heirs = max((len(template.heirs) for template in templates), default=0)
+
+        basic_deduction = np.zeros(case_count, dtype=np.int64)
+        taxable_inheritance = np.zeros(case_count, dtype=np.int64)
+        total_tax_amount = np.zeros(case_count, dtype=np.int64)
+        heir_tax_amounts = np.zeros((case_count, max_heirs), dtype=np.int64)
+        heir_counts = np.zeros(case_count, dtype=np.int64)
+
+        for (_, indices), template in zip(groups, templates):
+            heirs = template.heirs
+            deduction = schedule.basic_deduction(template.deduction_heirs_count)
+            estates, heir_taxes = self._calculate_group(amounts[indices], heirs, deduction, schedule)
+            basic_deduction[indices] = deduction
+            taxable_inheritance[indices] = estates
+            heir_tax_amounts[indices, :len(heirs)] = heir_taxes
+            total_tax_amount[indices] = heir_taxes.sum(axis=1)
+            heir_counts[indices] = len(heirs)
+
+        return BatchTaxResult(
+            basic_deduction=basic_deduction,
+            taxable_inheritance=taxable_inheritance,
+            total_tax_amount=total_tax_amount,
+            heir_tax_amounts=heir_tax_amounts,
+            heir_counts=heir_counts,
+        )
+
+    @staticmethod
+    def _calculate_group(amounts: np.ndarray, heirs: Sequence[Heir], deduction: int,
+                         schedule: TaxSchedule) -> Tuple[np.ndarray, np.ndarray]:
+        """同一家族構成の案件群を計算する"""
+        estates = np.maximum(0, amounts - deduction)
+        numerators = np.array([heir.share_numerator for heir in heirs], dtype=np.int64)
+        denominators = np.array([heir.share_denominator for heir in heirs], dtype=np.int64)
+
+        heir_taxable = mul_div_floor(estates[:, None], numerators[None, :], denominators[None, :])
+        heir_taxes = tax_from_table(heir_taxable, schedule)
+        return estates, heir_taxes
+
+    @staticmethod
+    def _group_by_family_structure(
+        family_structures: Sequence[FamilyStructure],
+    ) -> List[Tuple[FamilyStructure, np.ndarray]]:
+        """家族構成ごとに案件のインデックスをまとめる"""
+        positions: Dict[FamilyStructure, List[int]] = {}
+        for i, fs in enumerate(family_structures):
+            positions.setdefault(fs, []).append(i)
+        return [(fs, np.array(indices, dtype=np.int64)) for fs, indices in positions.items()]
+
+
+def _sum_by_estate(values: np.ndarray, estate_index: np.ndarray, estate_count: int) -> np.ndarray:
+    """相続人ごとの値を案件ごとに合計（int64 のまま）"""
+    totals = np.zeros(estate_count, dtype=np.int64)
+    np.add.at(totals, estate_index, values)
+    return totals
+
+
+def calculate_legal_share_tax_table(
+    table: HeirTable,
+    taxable_amounts: Sequence[int],
+    inheritance_date: Optional[date] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """法定相続分による相続税を HeirTable の案件ごとに一括計算
+
+    戻り値は (案件ごとの相続税の総額, 相続人ごとの2割加算前の税額)。
+    """
+    schedule = schedule_for(inheritance_date)
+    estate_index = table.estate_index
+    deductions = schedule.basic_deduction(table.deduction_heirs_counts())
+    estates = np.maximum(0, np.asarray(taxable_amounts, dtype=np.int64) - deductions)
+
+    heir_taxable = mul_div_floor(estates[estate_index], table.share_numerators, table.share_denominators)
+    heir_taxes = tax_from_table(heir_taxable, schedule)
+    return _sum_by_estate(heir_taxes, estate_index, len(table)), heir_taxes
+
+
+def _final_division_taxes(amounts, total_actual, total_amounts, total_taxes,
+                          surcharge, spouse, spouse_numerators, spouse_denominators) -> np.ndarray:
+    """実際の分割による最終税額（引数は相続人ごとにブロードキャスト可能な配列）"""
+    total_actual = np.where(total_actual == 0, 1, total_actual)
+    proportional_tax = mul_div_floor(total_taxes, amounts, total_actual)
+
+    # 2割加算
+    adjustment = np.where(surcharge, proportional_tax // 5, 0)
+
+    # 配偶者税額軽減（1円の 1/分母 を単位として比較する）
+    if np.any(spouse):
+        reduction_asset_limit = np.maximum(160_000_000 * spouse_denominators, total_amounts * spouse_numerators)
+        base_for_reduction_calc = np.where(total_amounts > 0, total_amounts, 1)
+        reduction_base_amount = np.minimum(amounts * spouse_denominators, reduction_asset_limit)
+        max_reduction = mul_div_floor(
+            total_taxes, reduction_base_amount, base_for_reduction_calc * spouse_denominators
+        )
+        adjustment = adjustment - np.where(spouse, np.minimum(proportional_tax, max_reduction), 0)
+
+    return np.maximum(0, proportional_tax + adjustment)
+
+
+def calculate_division_tax_batch(
+    heirs: Sequence[Heir],
+    total_amounts: Union[int, Sequence[int]],
+    total_tax_amounts: Union[int, Sequence[int]],
+    amounts: np.ndarray,
+) -> np.ndarray:
+    """実際の分割による各相続人の最終税額を一括計算（calculate_actual_division のベクトル版）
+
+    amounts は (案件数, 相続人数) の取得金額で、列の並びは heirs と同じ。
+    total_amounts / total_tax_amounts は案件ごとの課税価格の合計額と相続税の総額（スカラーも可）。
+    戻り値は (案件数, 相続人数) の最終納税額。
+    """
+    amounts = np.asarray(amounts, dtype=np.int64)
+    case_count = amounts.shape[0]
+    total_amounts = np.broadcast_to(np.asarray(total_amounts, dtype=np.int64), (case_count,))
+    total_taxes = np.broadcast_to(np.asarray(total_tax_amounts, dtype=np.int64), (case_count,))
+
+    spouse = np.array([heir.heir_type == HeirType.SPOUSE for heir in heirs], dtype=bool)
+    spouse_numerator, spouse_denominator = next(
+        ((heir.share_numerator, heir.share_denominator) for heir in heirs if heir.heir_type == HeirType.SPOUSE),
+        (0, 1),
+    )
+    return _final_division_taxes(
+        amounts,
+        amounts.sum(axis=1)[:, None],
+        total_amounts[:, None],
+        total_taxes[:, None],
+        np.array([heir.two_fold_addition for heir in heirs], dtype=bool),
+        spouse,
+        spouse_numerator,
+        spouse_denominator,
+    )
+
+
+def calculate_division_tax_table(
+    table: HeirTable,
+    total_amounts: Sequence[int],
+    total_tax_amounts: Sequence[int],
+    amounts: np.ndarray,
+) -> np.ndarray:
+    """HeirTable の案件ごとに、実際の分割による各相続人の最終税額を一括計算
+
+    amounts は相続人ごとの取得金額（テーブルの行と同じ並び）。
+    戻り値は相続人ごとの最終納税額。
+    """
+    amounts = np.asarray(amounts, dtype=np.int64)
+    estate_index = table.estate_index
+    total_actual = _sum_by_estate(amounts, estate_index, len(table))
+    return _final_division_taxes(
+        amounts,
+        total_actual[estate_index],
+        np.asarray(total_amounts, dtype=np.int64)[estate_index],
+        np.asarray(total_tax_amounts, dtype=np.int64)[estate_index],
+        table.two_fold_additions,
+        table.heir_types == SPOUSE_CODE,
+        table.share_numerators,
+        table.share_denominators,
+    )
@@ -0,0 +1,181 @@
+"""
+税額を最小化する遺産分割の探索
+
+実際の分割による税額は、各相続人の取得金額に対して区分線形になる。
+折れ点は配偶者税額軽減の上限（1億6千万円と法定相続分相当額の大きい方）と、
+2割加算の有無による限界税率の違いから生じる。
+そこで配偶者の取得金額を軸に、格子点と折れ点の候補をまとめて作り、
+calculate_division_tax_batch で一括評価して最小の分割を選ぶ。
+"""
+from dataclasses import dataclass, field
+from datetime import date
+from fractions import Fraction
+from math import lcm
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from models.inheritance import DivisionInput, DivisionResult, Heir, HeirType
+from services.batch_calculator import calculate_division_tax_batch
+from services.integer_math import mul_div_floor
+from services.tax_calculator import InheritanceTaxCalculator
+
+SPOUSE_REDUCTION_FLOOR = 160_000_000  # 配偶者税額軽減の下限額（1億6千万円）
+
+
+@dataclass
+class DivisionConstraints:
+    """分割の制約条件"""
+    min_amounts: Dict[str, int] = field(default_factory=dict)  # 相続人IDごとの最低取得金額
+    fixed_spouse_amount: Optional[int] = None  # 配偶者の取得金額を固定する場合
+    fixed_spouse_percentage: Optional[float] = None  # 配偶者の取得割合（%）を固定する場合
+
+
+@dataclass
+class TradeOffPoint:
+    """配偶者の取得金額と税額の総額の組"""
+    spouse_amount: int
+    total_tax_amount: int
+
+
+@dataclass
+class OptimizationResult:
+    """分割最適化の結果"""
+    amounts: Dict[str, int]  # 税額が最小となる各人の取得金額
+    division_result: DivisionResult  # その分割での計算結果（calculate_actual_division による）
+    trade_off_curve: List[TradeOffPoint]  # 配偶者の取得金額ごとの最小税額
+    candidates_evaluated: int
+
+
+class DivisionOptimizer:
+    """税額最小化のための分割探索サービス"""
+
+    def __init__(self, calculator: InheritanceTaxCalculator = None, grid_points: int = 201):
+        self.calculator = calculator or InheritanceTaxCalculator()
+        self.grid_points = grid_points
+
+    def optimize(
+        self,
+        total_amount: int,
+        heirs: Sequence[Heir],
+        total_tax_amount: int,
+        constraints: Optional[DivisionConstraints] = None,
+        inheritance_date: Optional[date] = None,
+    ) -> OptimizationResult:
+        """税額の総額が最小となる分割を探索する
+
+        配偶者以外への配分は、限界税率の低い相続人（2割加算なし）を優先し、
+        同じ条件の相続人の間では法定相続分の比で配分する。
+        税額が同じ候補が複数ある場合は、配偶者の取得金額が最も少ないものを選ぶ。
+        total_tax_amount は inheritance_date の速算表で求めた相続税の総額を渡す。
+        """
+        constraints = constraints or DivisionConstraints()
+        heirs = list(heirs)
+        if not heirs:
+            raise ValueError("相続人がいません")
+
+        heir_ids = {heir.id for heir in heirs}
+        unknown = [heir_id for heir_id in constraints.min_amounts if heir_id not in heir_ids]
+        if unknown:
+            raise ValueError(f"最低取得金額に相続人等に含まれないIDがあります: {', '.join(unknown)}")
+        min_amounts = np.array(
+            [int(constraints.min_amounts.get(heir.id, 0)) for heir in heirs], dtype=np.int64
+        )
+        if (min_amounts < 0).any():
+            raise ValueError("最低取得金額は0以上である必要があります")
+        if min_amounts.sum() > total_amount:
+            raise ValueError("最低取得金額の合計が課税価格の合計額を超えています")
+
+        spouse_index = next(
+            (i for i, heir in enumerate(heirs) if heir.heir_type == HeirType.SPOUSE), None
+        )
+        spouse_amounts = self._spouse_candidates(total_amount, heirs, spouse_index, min_amounts, constraints)
+        amounts = self._allocate(total_amount, heirs, spouse_index, min_amounts, spouse_amounts)
+
+        final_taxes = calculate_division_tax_batch(heirs, total_amount, total_tax_amount, amounts)
+        total_taxes = final_taxes.sum(axis=1)
+        best = int(np.argmin(total_taxes))
+
+        best_amounts = {heir.id: int(amounts[best, i]) for i, heir in enumerate(heirs)}
+        # 曲線には配分後の配偶者の取得金額を載せる
+        allocated_spouse_amounts = amounts[:, spouse_index] if spouse_index is not None else spouse_amounts
+        division_result = self.calculator.calculate_actual_division(DivisionInput(
+            mode='amount',
+            total_amount=total_amount,
+            heirs=heirs,
+            total_tax_amount=total_tax_amount,
+            amounts=best_amounts,
+            inheritance_date=inheritance_date,
+        ))
+
+        return OptimizationResult(
+            amounts=best_amounts,
+            division_result=division_result,
+            trade_off_curve=[
+                TradeOffPoint(spouse_amount=int(s), total_tax_amount=int(t))
+                for s, t in zip(allocated_spouse_amounts, total_taxes)
+            ],
+            candidates_evaluated=len(spouse_amounts),
+        )
+
+    def _spouse_candidates(self, total_amount, heirs, spouse_index, min_amounts, constraints) -> np.ndarray:
+        """配偶者の取得金額の候補（昇順・重複なし）"""
+        fixed_specified = constraints.fixed_spouse_amount is not None or constraints.fixed_spouse_percentage is not None
+        if spouse_index is None:
+            if fixed_specified:
+                raise ValueError("配偶者がいないため、配偶者の取得金額・取得割合は指定できません")
+            return np.zeros(1, dtype=np.int64)
+
+        low = int(min_amounts[spouse_index])
+        high = total_amount - int(min_amounts.sum()) + low
+        if len(heirs) == 1:
+            low = high = total_amount  # 配偶者のみの場合は全額を配偶者が取得する
+
+        fixed = constraints.fixed_spouse_amount
+        if fixed is None and constraints.fixed_spouse_percentage is not None:
+            fixed = int(round(total_amount * constraints.fixed_spouse_percentage / 100))
+        if fixed is not None:
+            if not low <= fixed <= high:
+                raise ValueError("配偶者の固定取得金額が他の制約と両立しません")
+            return np.array([fixed], dtype=np.int64)
+
+        # 折れ点: 配偶者税額軽減の上限額の前後
+        spouse = heirs[spouse_index]
+        reduction_limit = max(SPOUSE_REDUCTION_FLOOR, total_amount * spouse.share_numerator // spouse.share_denominator)
+        kinks = [reduction_limit + d for d in (-1, 0, 1)]
+
+        grid = np.linspace(low, high, num=max(2, self.grid_points)).round().astype(np.int64)
+        candidates = np.concatenate([grid, np.array(kinks + [low, high], dtype=np.int64)])
+        candidates = candidates[(candidates >= low) & (candidates <= high)]
+        return np.unique(candidates)
+
+    @staticmethod
+    def _allocate(total_amount, heirs, spouse_index, min_amounts, spouse_amounts) -> np.ndarray:
+        """配偶者の取得金額ごとに、残額を配偶者以外へ配分した取得金額の行列を作る"""
+        amounts = np.tile(min_amounts, (len(spouse_amounts), 1))
+        if spouse_index is not None:
+            amounts[:, spouse_index] = spouse_amounts
+        remainders = total_amount - amounts.sum(axis=1)
+
+        others = [i for i in range(len(heirs)) if i != spouse_index]
+        if not others:
+            # 配偶者のみの場合は全額を配偶者へ
+            amounts[:, spouse_index] += remainders
+            return amounts
+
+        # 限界税率の低い相続人（2割加算なし）を優先して配分
+        receivers = [i for i in others if not heirs[i].two_fold_addition] or others
+        weights = [heirs[i].legal_share for i in receivers]
+        if sum(weights) <= 0:
+            weights = [Fraction(1)] * len(receivers)
+        # 法定相続分の比を共通の分母の整数比にして、残額 × 分子 // 分母 で配分する（浮動小数点の誤差を避ける）
+        weight_total = sum(weights)
+        weights = [weight / weight_total for weight in weights]
+        denominator = lcm(*(weight.denominator for weight in weights))
+        numerators = np.array([weight.numerator * (denominator // weight.denominator) for weight in weights],
+                              dtype=np.int64)
+
+        shares = mul_div_floor(remainders[:, None], numerators[None, :], denominator)
+        shares[:, 0] += remainders - shares.sum(axis=1)  # 端数（相続人数未満の円）は先頭の相続人へ
+        amounts[:, receivers] += shares
+        return amounts
@@ -0,0 +1,357 @@
+"""
+Excel ブック（相続税計算アプリの形式）からの一括取り込み
+
+openpyxl の読み取り専用モードで行を先頭から逐次読み込み、次のいずれかの形式のシートを案件に変換する。
+
+- 計算シートの形式（1シート1件）: `Excel/20250626相続税計算アプリ.xlsx` の「相続税計算(分割額簡易版)」と同じ配置。
+  B6〜B13 の見出しの右（C列）に課税対象総額・家族構成、17〜26行目の C〜G 列に実際の資産の分割額
+- 一覧の形式（1行1件）: 1行目が見出し（課税対象総額・配偶者の有無・子供の数 … と、分割額の列
+  「配偶者」「子供1」「父・母1」「兄弟姉妹1」「法定相続人以外1」または相続人ID）
+
+案件は chunk_size 件ずつ計算して返すため、5万件のブックでもメモリ使用量は chunk_size に比例する量に収まる。
+読み込めない行・検証に通らない行は計算せず、理由とともに ImportReport に記録する。
+openpyxl は任意の依存で、取り込みを行うときに初めて読み込む。
+"""
+import re
+from dataclasses import dataclass, field, fields
+from datetime import date, datetime
+from itertools import chain, islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from models.inheritance import (
+    DivisionInput, DivisionResult, FamilyStructure, TaxCalculationResult, ValidationError
+)
+from models.tax_schedule import schedule_for
+from services.heir_cache import HeirCache
+from services.tax_calculator import InheritanceTaxCalculator
+
+DEFAULT_CHUNK_SIZE = 1000
+
+# ImportReport に詳細を残すスキップ行の上限（件数はすべて数える）
+MAX_REPORTED_SKIPS = 1000
+
+# 入力項目の見出し（計算シートの B 列・一覧の見出し行）→ 項目名。項目名そのものも見出しに使える
+INPUT_LABELS = {
+    'ID': 'id',
+    '課税対象総額': 'taxable_amount',
+    '配偶者の有無': 'spouse_exists',
+    '子供の数': 'children_count',
+    '父母の数': 'parents_alive',
+    '兄弟姉妹の数': 'siblings_count',
+    '子供の内の養子の数': 'adopted_children_count',
+    '養子の内孫養子の数': 'grandchild_adopted_count',
+    '法定相続人以外': 'non_heirs_count',
+    '相続開始日': 'inheritance_date',
+}
+COUNT_FIELDS = tuple(f.name for f in fields(FamilyStructure) if f.name != 'spouse_exists')
+INPUT_FIELDS = frozenset(('id', 'taxable_amount', 'spouse_exists', 'inheritance_date') + COUNT_FIELDS)
+
+# 分割額の列の見出し → 相続人IDの接頭辞（計算シートの C〜G 列もこの順）
+HEIR_LABELS = {
+    '配偶者': 'spouse',
+    '子供': 'child',
+    '父・母': 'parent',
+    '兄弟姉妹': 'sibling',
+    '法定相続人以外': 'non_heir',
+}
+_HEIR_COLUMN = re.compile(r'(子供|父・母|兄弟姉妹|法定相続人以外|child|parent|sibling|half_sibling|non_heir)_?(\d+)')
+
+# 計算シートの配置（行番号は1始まり、列は0始まり）
+TEMPLATE_HEADER_ROW = 6
+TEMPLATE_INPUT_ROWS = range(6, 14)
+TEMPLATE_DIVISION_ROWS = range(17, 27)  # 17行目が1人目
+TEMPLATE_LABEL_COLUMN = 1  # B
+TEMPLATE_VALUE_COLUMN = 2  # C
+TEMPLATE_DIVISION_COLUMNS = {2: 'spouse', 3: 'child', 4: 'parent', 5: 'sibling', 6: 'non_heir'}  # C〜G
+
+_SPOUSE_VALUES = {'有': True, 'あり': True, '無': False, 'なし': False}
+
+
+@dataclass
+class ImportedCase:
+    """ブックから読み込んだ1件分の入力"""
+    sheet: str
+    row: int  # 一覧の形式はその行、計算シートの形式は課税対象総額の行
+    case_id: Optional[str]
+    taxable_amount: int
+    family_structure: FamilyStructure
+    amounts: Optional[Dict[str, int]] = None  # 実際の分割額（相続人ID → 金額）。なければ法定相続分のみ計算
+    inheritance_date: Optional[date] = None
+
+
+@dataclass
+class SkippedRow:
+    """計算せずに読み飛ばした行"""
+    sheet: str
+    row: int
+    case_id: Optional[str]
+    errors: List[ValidationError]
+
+
+@dataclass
+class CaseResult:
+    """1件分の計算結果"""
+    case: ImportedCase
+    tax_result: TaxCalculationResult
+    division_result: Optional[DivisionResult] = None
+
+
+@dataclass
+class ImportReport:
+    """取り込みの集計（計算した件数と読み飛ばした行）"""
+    cases_count: int = 0
+    skipped_count: int = 0
+    skipped: List[SkippedRow] = field(default_factory=list)  # 先頭 MAX_REPORTED_SKIPS 件の詳細
+    ignored_sheets: List[str] = field(default_factory=list)  # どちらの形式でもないシート
+
+    def add_skipped(self, skipped: SkippedRow) -> None:
+        self.skipped_count += 1
+        if len(self.skipped) < MAX_REPORTED_SKIPS:
+            self.skipped.append(skipped)
+
+
+def _is_blank(value) -> bool:
+    return value is None or (isinstance(value, str) and not value.strip())
+
+
+def _parse_integer(value) -> Optional[int]:
+    """セルの値を整数に変換（変換できなければ None）。"1,000" のような文字列も受け付ける"""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value
+    if isinstance(value, float):
+        return int(value) if value.is_integer() else None
+    if isinstance(value, str):
+        text = value.strip().replace(',', '').removesuffix('円')
+        if re.fullmatch(r'-?\d+', text):
+            return int(text)
+    return None
+
+
+def _parse_spouse(value) -> Optional[bool]:
+    if _is_blank(value):
+        return False
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str):
+        return _SPOUSE_VALUES.get(value.strip())
+    if isinstance(value, (int, float)) and value in (0, 1):
+        return bool(value)
+    return None
+
+
+def _parse_date(value) -> Optional[date]:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(value.strip())
+
+
+def _parse_case(sheet: str, row: int, values: Dict[str, object]) -> Union[ImportedCase, SkippedRow]:
+    """項目名 → セルの値 の辞書を案件に変換（問題のある項目はすべてエラーとして返す）"""
+    errors: List[ValidationError] = []
+    raw_id = values.get('id')
+    case_id = None if _is_blank(raw_id) else str(int(raw_id) if isinstance(raw_id, float) else raw_id).strip()
+
+    raw_amount = values.get('taxable_amount')
+    taxable_amount = _parse_integer(raw_amount)
+    if _is_blank(raw_amount):
+        errors.append(ValidationError('taxable_amount', 'MISSING', '課税対象総額が入力されていません'))
+    elif taxable_amount is None:
+        errors.append(ValidationError('taxable_amount', 'INVALID_TYPE', '課税対象総額は整数である必要があります'))
+    elif taxable_amount <= 0:
+        errors.append(ValidationError('taxable_amount', 'INVALID_VALUE', '課税価格の合計額は正の値である必要があります'))
+
+    spouse_exists = _parse_spouse(values.get('spouse_exists'))
+    if spouse_exists is None:
+        errors.append(ValidationError('spouse_exists', 'INVALID_VALUE', '配偶者の有無は「有」か「無」で入力してください'))
+
+    counts = {}
+    for name in COUNT_FIELDS:
+        raw = values.get(name)
+        counts[name] = 0 if _is_blank(raw) else _parse_integer(raw)
+        if counts[name] is None:
+            errors.append(ValidationError(name, 'INVALID_TYPE', '人数は整数である必要があります'))
+
+    amounts: Dict[str, int] = {}
+    for key, raw in values.items():
+        if not key.startswith('amounts.') or _is_blank(raw):
+            continue
+        amount = _parse_integer(raw)
+        if amount is None or amount < 0:
+            errors.append(ValidationError(key, 'INVALID_VALUE', '分割額は0以上の整数である必要があります'))
+        else:
+            amounts[key[len('amounts.'):]] = amount
+
+    inheritance_date = None
+    if not _is_blank(values.get('inheritance_date')):
+        try:
+            inheritance_date = _parse_date(values['inheritance_date'])
+        except (AttributeError, ValueError):
+            errors.append(ValidationError('inheritance_date', 'INVALID_VALUE',
+                                          '相続開始日は日付（YYYY-MM-DD）で入力してください'))
+        else:
+            try:
+                schedule_for(inheritance_date)  # 適用できる速算表がない場合は ValueError
+            except ValueError as e:
+                errors.append(ValidationError('inheritance_date', 'INVALID_VALUE', str(e)))
+
+    if errors:
+        return SkippedRow(sheet, row, case_id, errors)
+    return ImportedCase(
+        sheet=sheet,
+        row=row,
+        case_id=case_id,
+        taxable_amount=taxable_amount,
+        family_structure=FamilyStructure(spouse_exists=spouse_exists, **counts),
+        amounts=amounts if any(amounts.values()) else None,
+        inheritance_date=inheritance_date,
+    )
+
+
+def _column_key(header) -> Optional[str]:
+    """一覧の見出し → 項目名（分割額の列は 'amounts.<相続人ID>'。対象外の列は None）"""
+    if not isinstance(header, str):
+        return None
+    header = header.strip()
+    if header in INPUT_LABELS:
+        return INPUT_LABELS[header]
+    if header in INPUT_FIELDS:
+        return header
+    if header in ('配偶者', 'spouse'):
+        return 'amounts.spouse'
+    match = _HEIR_COLUMN.fullmatch(header)
+    if match:
+        prefix, number = match.groups()
+        return f'amounts.{HEIR_LABELS.get(prefix, prefix)}_{int(number)}'
+    return None
+
+
+def _cell(row: Tuple, index: int):
+    return row[index] if index < len(row) else None
+
+
+def _read_template_sheet(sheet: str, rows: Iterable[Tuple]) -> Union[ImportedCase, SkippedRow]:
+    """計算シートの形式（rows は6行目から）を1件の案件に変換"""
+    values: Dict[str, object] = {'id': sheet}
+    for row_number, row in zip(range(TEMPLATE_HEADER_ROW, TEMPLATE_DIVISION_ROWS.stop), rows):
+        if row_number in TEMPLATE_INPUT_ROWS:
+            key = INPUT_LABELS.get(_cell(row, TEMPLATE_LABEL_COLUMN))
+            if key is not None:
+                values[key] = _cell(row, TEMPLATE_VALUE_COLUMN)
+        elif row_number in TEMPLATE_DIVISION_ROWS:
+            number = row_number - TEMPLATE_DIVISION_ROWS.start + 1
+            for column, prefix in TEMPLATE_DIVISION_COLUMNS.items():
+                if prefix == 'spouse':
+                    if number == 1:
+                        values['amounts.spouse'] = _cell(row, column)
+                else:
+                    values[f'amounts.{prefix}_{number}'] = _cell(row, column)
+    return _parse_case(sheet, TEMPLATE_HEADER_ROW, values)
+
+
+def _read_table_sheet(sheet: str, header: Tuple, rows: Iterable[Tuple]) -> Iterator[Union[ImportedCase, SkippedRow]]:
+    """一覧の形式（rows は2行目から）を1行1件の案件に変換。空行は読み飛ばす"""
+    columns = [(index, key) for index, key in enumerate(map(_column_key, header)) if key is not None]
+    for row_number, row in enumerate(rows, start=2):
+        values = {key: _cell(row, index) for index, key in columns}
+        if all(_is_blank(value) for value in values.values()):
+            continue
+        yield _parse_case(sheet, row_number, values)
+
+
+def read_workbook(source, report: Optional[ImportReport] = None) -> Iterator[Union[ImportedCase, SkippedRow]]:
+    """ブック（パスまたはファイルオブジェクト）の案件を先頭から逐次返す
+
+    各シートは1回だけ先頭から走査する。1行目に「課税対象総額」の列があれば一覧の形式、
+    B6 が「課税対象総額」なら計算シートの形式として読み、どちらでもないシートは report.ignored_sheets に記録する。
+    """
+    import openpyxl  # 任意の依存
+
+    workbook = openpyxl.load_workbook(source, read_only=True, data_only=True)
+    try:
+        for worksheet in workbook.worksheets:
+            rows = worksheet.iter_rows(values_only=True)
+            head = list(islice(rows, TEMPLATE_HEADER_ROW))
+            if head and 'taxable_amount' in map(_column_key, head[0]):
+                yield from _read_table_sheet(worksheet.title, head[0], chain(head[1:], rows))
+            elif (len(head) == TEMPLATE_HEADER_ROW
+                  and _cell(head[-1], TEMPLATE_LABEL_COLUMN) == '課税対象総額'):
+                yield _read_template_sheet(worksheet.title, chain(head[-1:], rows))
+            elif report is not None:
+                report.ignored_sheets.append(worksheet.title)
+    finally:
+        workbook.close()
+
+
+def _chunks(items: Iterable, size: int) -> Iterator[List]:
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class ExcelCaseImporter:
+    """ブックの案件を chunk_size 件ずつ計算するサービス"""
+
+    def __init__(self, heir_cache: HeirCache = None, calculator: InheritanceTaxCalculator = None,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE):
+        if chunk_size <= 0:
+            raise ValueError("chunk_size は正の値である必要があります")
+        self.heir_cache = heir_cache or HeirCache()
+        self.calculator = calculator or self.heir_cache.calculator
+        self.chunk_size = chunk_size
+
+    def iter_results(self, source, report: Optional[ImportReport] = None) -> Iterator[List[CaseResult]]:
+        """計算結果を chunk_size 件以下ずつ返す（読み飛ばした行は report に記録する）
+
+        ブックの読み込みと計算は返したチャンクを消費するごとに進むため、
+        前のチャンクを保持しなければメモリ使用量は件数によらない。
+        """
+        report = report if report is not None else ImportReport()
+        for chunk in _chunks(read_workbook(source, report), self.chunk_size):
+            results = []
+            for item in chunk:
+                result = self.calculate_case(item) if isinstance(item, ImportedCase) else item
+                if isinstance(result, SkippedRow):
+                    report.add_skipped(result)
+                else:
+                    results.append(result)
+            report.cases_count += len(results)
+            if results:
+                yield results
+
+    def calculate_case(self, case: ImportedCase) -> Union[CaseResult, SkippedRow]:
+        """1件を検証・計算する（家族構成・分割額に問題があれば SkippedRow）"""
+        validation_result = self.calculator.validate_family_structure(case.family_structure)
+        if not validation_result.is_valid:
+            return SkippedRow(case.sheet, case.row, case.case_id, validation_result.errors)
+
+        heirs = list(self.heir_cache.get(case.family_structure).heirs)
+        tax_result = self.calculator.calculate_tax_by_legal_share(case.taxable_amount, heirs, case.inheritance_date)
+        if case.amounts is None:
+            return CaseResult(case, tax_result)
+
+        # 空欄の分割額は0円とし、相続人にいない人の分割額はエラーにする
+        heir_ids = {heir.id for heir in heirs}
+        errors = [
+            ValidationError(f'amounts.{heir_id}', 'UNKNOWN_HEIR', f'{heir_id} は相続人等に含まれません')
+            for heir_id, amount in case.amounts.items() if heir_id not in heir_ids and amount
+        ]
+        division_input = DivisionInput(
+            mode='amount',
+            total_amount=case.taxable_amount,
+            heirs=heirs,
+            total_tax_amount=tax_result.total_tax_amount,
+            amounts={heir.id: case.amounts.get(heir.id, 0) for heir in heirs},
+            inheritance_date=case.inheritance_date,
+        )
+        if not errors:
+            errors = self.calculator.validate_division_input(division_input, heirs).errors
+        if errors:
+            return SkippedRow(case.sheet, case.row, case.case_id, errors)
+        return CaseResult(case, tax_result, self.calculator.calculate_actual_division(division_input))
@@ -0,0 +1,97 @@
+"""
+法定相続人判定結果のキャッシュ
+
+実際のリクエストは少数の家族構成に集中するため、家族構成をキーとして
+法定相続人の判定結果（不変のテンプレート）、基礎控除額、税額曲線をLRUでキャッシュする。
+"""
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date
+from typing import Dict, Optional, Tuple
+
+from models.inheritance import FamilyStructure, Heir
+from models.tax_schedule import CURRENT_TAX_SCHEDULE, schedule_for
+from services.tax_calculator import InheritanceTaxCalculator
+from services.tax_curve import TaxCurve
+
+
+@dataclass(frozen=True)
+class HeirTemplate:
+    """家族構成ごとの法定相続人判定結果（共有されるため不変）"""
+    heirs: Tuple[Heir, ...]
+    deduction_heirs_count: int  # 基礎控除計算用の法定相続人数（養子の制限適用後）
+    basic_deduction: int  # 現行の速算表による基礎控除額
+    tax_curve: TaxCurve  # 現行の速算表による相続税総額の曲線
+
+
+class HeirCache:
+    """家族構成をキーとする法定相続人判定のLRUキャッシュ"""
+
+    def __init__(self, calculator: InheritanceTaxCalculator = None, maxsize: int = 1024):
+        if maxsize <= 0:
+            raise ValueError("maxsize は1以上である必要があります")
+        self.calculator = calculator or InheritanceTaxCalculator()
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[FamilyStructure, HeirTemplate]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, family_structure: FamilyStructure) -> HeirTemplate:
+        """家族構成に対する法定相続人判定結果を取得（なければ判定してキャッシュ）"""
+        with self._lock:
+            template = self._entries.get(family_structure)
+            if template is not None:
+                self._entries.move_to_end(family_structure)
+                self.hits += 1
+                return template
+            self.misses += 1
+
+        template = self._build(family_structure)
+
+        with self._lock:
+            self._entries[family_structure] = template
+            self._entries.move_to_end(family_structure)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return template
+
+    def _build(self, family_structure: FamilyStructure) -> HeirTemplate:
+        heirs = tuple(self.calculator.determine_legal_heirs(family_structure))
+        basic_deduction = self.calculator.calculate_basic_deduction(heirs)
+        return HeirTemplate(
+            heirs=heirs,
+            deduction_heirs_count=self.calculator._count_legal_heirs_for_deduction(heirs),
+            basic_deduction=basic_deduction,
+            tax_curve=TaxCurve(heirs, basic_deduction, CURRENT_TAX_SCHEDULE),
+        )
+
+    def get_tax_curve(self, family_structure: FamilyStructure, inheritance_date: Optional[date] = None) -> TaxCurve:
+        """家族構成に対する税額曲線を取得（現行以外の速算表の曲線はキャッシュしない）"""
+        template = self.get(family_structure)
+        schedule = schedule_for(inheritance_date)
+        if schedule is CURRENT_TAX_SCHEDULE:
+            return template.tax_curve
+        return TaxCurve(template.heirs, schedule.basic_deduction(template.deduction_heirs_count), schedule)
+
+    def stats(self) -> Dict[str, int]:
+        """キャッシュのヒット・ミス・追い出し件数"""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+            }
+
+    def clear(self) -> None:
+        """キャッシュと統計をリセット"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
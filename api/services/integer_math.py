@@ -0,0 +1,29 @@
+"""
+ベクトル化した整数演算
+
+税額の按分・法定相続分の計算を浮動小数点を使わずに行うためのヘルパー。
+"""
+import numpy as np
+
+# int64 の積が桁あふれし得るかの判定に使う上限（浮動小数点の誤差を見込んで 2**62）
+_INT64_PRODUCT_LIMIT = float(2 ** 62)
+
+
+def mul_div_floor(a, b, c) -> np.ndarray:
+    """a * b // c を厳密に計算する（0以上の整数配列）
+
+    int64 で積が桁あふれする要素だけは Python の整数で計算する。
+    """
+    a, b, c = np.broadcast_arrays(
+        np.asarray(a, dtype=np.int64), np.asarray(b, dtype=np.int64), np.asarray(c, dtype=np.int64)
+    )
+    overflow = a.astype(np.float64) * b >= _INT64_PRODUCT_LIMIT
+    if not overflow.any():
+        return a * b // c
+    result = np.empty(a.shape, dtype=np.int64)
+    safe = ~overflow
+    result[safe] = a[safe] * b[safe] // c[safe]
+    result[overflow] = [
+        x * y // z for x, y, z in zip(a[overflow].tolist(), b[overflow].tolist(), c[overflow].tolist())
+    ]
+    return result
@@ -0,0 +1,117 @@
+"""
+目標税額からの課税価格の逆算
+
+「税額がXを超えない最大の課税価格はいくらか」を求める。
+法定相続分ベースでは TaxCurve の区間ごとの線形性を使って区間を二分探索で特定し、
+区間内は線形式で見当をつけてから切り捨て誤差の範囲だけを厳密に探索する。
+実際の分割ベースでは税額が課税価格に対して単調増加であることを使い、
+候補点をまとめてベクトル評価する多分探索で閾値を絞り込む。
+"""
+import math
+from bisect import bisect_right
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Sequence
+
+import numpy as np
+
+from models.inheritance import Heir
+from services.batch_calculator import calculate_division_tax_batch
+from services.tax_curve import TaxCurve
+
+MAX_TAXABLE_AMOUNT = 10 ** 13  # 探索上限（10兆円）
+_POINTS_PER_ROUND = 256  # 多分探索で1回に評価する点の数
+
+
+@dataclass
+class InverseSolution:
+    """逆算の結果"""
+    max_taxable_amount: Optional[int]  # 税額が目標以下となる最大の課税価格（上限なしの場合は None）
+    total_tax_amount: Optional[int]  # その課税価格での税額
+    next_total_tax_amount: Optional[int]  # 1円多い課税価格での税額（目標を超える）
+
+
+def _largest_within(evaluate: Callable[[int], int], target_tax: int, low: int, high: int) -> int:
+    """evaluate(low) <= target_tax < evaluate(high) のとき、evaluate(x) <= target_tax となる最大の x"""
+    while high - low > 1:
+        middle = (low + high) // 2
+        if evaluate(middle) <= target_tax:
+            low = middle
+        else:
+            high = middle
+    return low
+
+
+class InverseTaxSolver:
+    """目標税額から課税価格を逆算するサービス"""
+
+    def solve_legal_share(self, tax_curve: TaxCurve, target_tax: int) -> InverseSolution:
+        """法定相続分による相続税の総額が target_tax 以下となる最大の課税価格"""
+        if target_tax < 0:
+            raise ValueError("目標税額は0以上である必要があります")
+
+        segments = tax_curve.segments()
+        if not segments:
+            return InverseSolution(None, None, None)
+        taxes_at_start = [segment.tax_at_start for segment in segments]
+        k = bisect_right(taxes_at_start, target_tax) - 1
+        segment = segments[k]
+        if segment.marginal_rate <= 0:
+            return InverseSolution(None, None, None)
+
+        # 区間内の線形式による見当
+        estimate = segment.start_amount + int((target_tax - segment.tax_at_start) / segment.marginal_rate)
+        segment_end = segments[k + 1].start_amount if k + 1 < len(segments) else MAX_TAXABLE_AMOUNT
+
+        # 切り捨て誤差（相続人ごとに1円未満×2回）の分だけ幅を取って厳密に探索
+        width = math.ceil(2 * (len(tax_curve.shares) + sum(tax_curve.counts)) / segment.marginal_rate) + 2
+        low = max(segment.start_amount, estimate - width)
+        high = min(segment_end, estimate + width)
+        while low > segment.start_amount and tax_curve.total_tax(low) > target_tax:
+            low = max(segment.start_amount, low - width)
+        while high < segment_end and tax_curve.total_tax(high) <= target_tax:
+            low, high = high, min(segment_end, high + width)
+
+        amount = _largest_within(tax_curve.total_tax, target_tax, low, high)
+        return InverseSolution(amount, tax_curve.total_tax(amount), tax_curve.total_tax(amount + 1))
+
+    def solve_division(
+        self,
+        tax_curve: TaxCurve,
+        heirs: Sequence[Heir],
+        percentages: Dict[str, float],
+        target_tax: int,
+        rounding_method: str = 'round',
+    ) -> InverseSolution:
+        """実際の分割（取得割合を固定）による税額の合計が target_tax 以下となる最大の課税価格"""
+        if target_tax < 0:
+            raise ValueError("目標税額は0以上である必要があります")
+        ratios = np.array([percentages.get(heir.id, 0) / 100 for heir in heirs], dtype=np.float64)
+
+        def evaluate_many(taxable_amounts: np.ndarray) -> np.ndarray:
+            amounts = taxable_amounts[:, None] * ratios[None, :]
+            if rounding_method == 'round':
+                amounts = np.round(amounts)
+            elif rounding_method == 'floor':
+                amounts = np.floor(amounts)
+            else:
+                amounts = np.ceil(amounts)
+            total_taxes = tax_curve.total_tax_many(taxable_amounts)
+            final_taxes = calculate_division_tax_batch(
+                heirs, taxable_amounts, total_taxes, amounts.astype(np.int64)
+            )
+            return final_taxes.sum(axis=1)
+
+        low, high = 0, MAX_TAXABLE_AMOUNT
+        if evaluate_many(np.array([high], dtype=np.int64))[0] <= target_tax:
+            return InverseSolution(None, None, None)
+
+        # 多分探索: 区間内の点をまとめて評価し、閾値を含む小区間に絞り込む
+        while high - low > 1:
+            points = np.unique(np.linspace(low, high, num=_POINTS_PER_ROUND + 2).astype(np.int64))
+            within = evaluate_many(points) <= target_tax
+            last_within = int(np.flatnonzero(within).max()) if within.any() else 0
+            low = int(points[last_within])
+            high = int(points[min(last_within + 1, len(points) - 1)])
+
+        taxes = evaluate_many(np.array([low, low + 1], dtype=np.int64))
+        return InverseSolution(low, int(taxes[0]), int(taxes[1]))
@@ -0,0 +1,416 @@
+"""
+大量の一括計算を非同期に実行するジョブキュー
+
+同期の HTTP リクエストでは時間切れになる件数の一括計算を、ジョブとして登録して
+ワーカースレッドで実行する。ジョブの状態・入力・結果は SQLite（標準ライブラリの sqlite3）に保存し、
+外部のサービスは使わない。
+
+- 入力は1行1件で保存し、ワーカーは chunk_size 行ずつ計算して、結果の保存と進捗の更新を
+  1つのトランザクションで行う。ワーカーが途中で止まっても、計算済みの行はやり直さない
+- 実行中のジョブはチャンクごとにハートビートを更新する。ハートビートが stale_after 秒以上
+  途絶えたジョブは、次にジョブを取りに来たワーカーが待機中に戻して続きから実行する
+- 受信中のジョブも入力を書き込むたびに（受信が遅くても一定時間ごとに）ハートビートを更新し、
+  途絶えたもの（受信の途中でサーバーが止まったもの）はワーカーが失敗にする
+- 完了したジョブは保存期間（retention）を過ぎるとワーカーが結果ごと削除する
+- 同じデータベースを複数のプロセス（Web サーバーと `python api/cli.py worker`）で共有できる
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+JOB_RECEIVING = 'receiving'
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_SUCCEEDED = 'succeeded'
+JOB_FAILED = 'failed'
+
+DEFAULT_CHUNK_SIZE = 500
+
+# 入力を保存するときに1つのトランザクションで書き込む行数
+_INSERT_BATCH_SIZE = 1000
+
+# 受信中のジョブの入力を、_INSERT_BATCH_SIZE 行に満たなくても書き込んでハートビートを更新する間隔（秒）
+_RECEIVING_HEARTBEAT_INTERVAL = 10.0
+
+# ハートビートがこの秒数途絶えた実行中のジョブは、ワーカーが止まったものとして待機中に戻す（受信中のジョブは失敗にする）
+DEFAULT_STALE_AFTER = 60.0
+
+# 完了したジョブ（状態・結果）を保存しておく秒数と、期限切れのジョブを削除する間隔（秒）
+DEFAULT_RETENTION = 7 * 24 * 60 * 60
+DEFAULT_SWEEP_INTERVAL = 600.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    options TEXT NOT NULL,
+    total INTEGER NOT NULL DEFAULT 0,
+    processed INTEGER NOT NULL DEFAULT 0,
+    failed INTEGER NOT NULL DEFAULT 0,
+    cursor INTEGER NOT NULL DEFAULT 0,
+    claim TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    heartbeat_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at);
+CREATE TABLE IF NOT EXISTS job_inputs (
+    job_id TEXT NOT NULL,
+    line INTEGER NOT NULL,
+    payload TEXT NOT NULL,
+    PRIMARY KEY (job_id, line)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS job_results (
+    job_id TEXT NOT NULL,
+    line INTEGER NOT NULL,
+    payload BLOB NOT NULL,
+    PRIMARY KEY (job_id, line)
+) WITHOUT ROWID;
+"""
+
+_JOB_COLUMNS = ('id, status, options, total, processed, failed, cursor, claim, error, '
+                'created_at, started_at, finished_at')
+
+
+@dataclass
+class Job:
+    """ジョブの状態"""
+    id: str
+    status: str
+    options: Dict = field(default_factory=dict)
+    total: int = 0  # 入力の件数
+    processed: int = 0  # 計算済みの件数
+    failed: int = 0  # 計算済みのうちエラーになった件数
+    cursor: int = 0  # 計算済みの最後の行番号
+    claim: Optional[str] = None  # 実行中のワーカーの識別子
+    error: Optional[str] = None  # ジョブ全体が失敗した理由
+    created_at: float = 0.0
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+    @property
+    def progress(self) -> float:
+        if not self.total:
+            return 1.0 if self.is_finished else 0.0
+        return self.processed / self.total
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in (JOB_SUCCEEDED, JOB_FAILED)
+
+
+def _job_from_row(row) -> Job:
+    values = list(row)
+    values[2] = json.loads(values[2])
+    return Job(*values)
+
+
+class JobStore:
+    """ジョブの SQLite への保存（スレッドごとに接続を持つ）"""
+
+    def __init__(self, path: str, clock: Callable[[], float] = time.time):
+        self.path = path
+        self.clock = clock
+        self._local = threading.local()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._connection().executescript(_SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30.0, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+        return connection
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """書き込みのトランザクション（開始時に書き込みロックを取る）"""
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            yield connection
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+
+    def close(self) -> None:
+        """このスレッドの接続を閉じる"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+    def submit(self, lines: Iterable[Tuple[int, str]], options: Optional[Dict] = None) -> Job:
+        """(行番号, 入力) の列をジョブとして登録する
+
+        入力は受信中（receiving）のジョブに _INSERT_BATCH_SIZE 行ずつ（受信が遅いときは
+        _RECEIVING_HEARTBEAT_INTERVAL 秒ごとに）書き込み、すべて書き終えてから待機中にする。
+        受信の途中で例外が起きたジョブは失敗にする。受信が止まったものとして失敗にされたジョブは
+        続きを書き込まず、RuntimeError を送出する。
+        """
+        job_id = uuid.uuid4().hex
+        now = self.clock()
+        with self._transaction() as connection:
+            connection.execute(
+                'INSERT INTO jobs (id, status, options, created_at, heartbeat_at) VALUES (?, ?, ?, ?, ?)',
+                (job_id, JOB_RECEIVING, json.dumps(options or {}), now, now)
+            )
+        total = 0
+        try:
+            batch = []
+            written_at = now
+            for line, payload in lines:
+                batch.append((job_id, line, payload))
+                if len(batch) >= _INSERT_BATCH_SIZE or self.clock() - written_at >= _RECEIVING_HEARTBEAT_INTERVAL:
+                    self._insert_inputs(job_id, batch)
+                    total += len(batch)
+                    batch = []
+                    written_at = self.clock()
+            if batch:
+                self._insert_inputs(job_id, batch)
+                total += len(batch)
+            with self._transaction() as connection:
+                self._touch_receiving(connection, job_id)
+                connection.execute('UPDATE jobs SET status = ?, total = ? WHERE id = ?', (JOB_QUEUED, total, job_id))
+        except Exception as e:
+            with self._transaction() as connection:
+                connection.execute('UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ? AND status = ?',
+                                   (JOB_FAILED, f'入力を受信できませんでした: {e}', self.clock(), job_id, JOB_RECEIVING))
+                connection.execute('DELETE FROM job_inputs WHERE job_id = ?', (job_id,))
+            raise
+        return self.get(job_id)
+
+    def _insert_inputs(self, job_id: str, batch: List[Tuple[str, int, str]]) -> None:
+        with self._transaction() as connection:
+            self._touch_receiving(connection, job_id)
+            connection.executemany('INSERT INTO job_inputs (job_id, line, payload) VALUES (?, ?, ?)', batch)
+
+    def _touch_receiving(self, connection: sqlite3.Connection, job_id: str) -> None:
+        """受信中のジョブのハートビートを更新する（受信中でなくなっていれば RuntimeError）"""
+        updated = connection.execute(
+            'UPDATE jobs SET heartbeat_at = ? WHERE id = ? AND status = ?', (self.clock(), job_id, JOB_RECEIVING)
+        ).rowcount
+        if not updated:
+            raise RuntimeError('受信が止まったものとしてジョブが失敗にされました')
+
+    def get(self, job_id: str) -> Optional[Job]:
+        row = self._connection().execute(f'SELECT {_JOB_COLUMNS} FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return _job_from_row(row) if row else None
+
+    def claim(self, stale_after: float = DEFAULT_STALE_AFTER) -> Optional[Job]:
+        """待機中のジョブを1件取り出して実行中にする
+
+        先に、止まったワーカーのジョブを待機中に戻し、受信の途中で止まったジョブを失敗にする。
+        """
+        now = self.clock()
+        claim = uuid.uuid4().hex
+        with self._transaction() as connection:
+            connection.execute(
+                'UPDATE jobs SET status = ?, claim = NULL WHERE status = ? AND heartbeat_at <= ?',
+                (JOB_QUEUED, JOB_RUNNING, now - stale_after)
+            )
+            abandoned = [row[0] for row in connection.execute(
+                'SELECT id FROM jobs WHERE status = ? AND COALESCE(heartbeat_at, created_at) <= ?',
+                (JOB_RECEIVING, now - stale_after)
+            )]
+            for job_id in abandoned:
+                connection.execute('UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ?',
+                                   (JOB_FAILED, '入力の受信が途中で止まりました', now, job_id))
+                connection.execute('DELETE FROM job_inputs WHERE job_id = ?', (job_id,))
+            row = connection.execute(
+                'SELECT id FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1', (JOB_QUEUED,)
+            ).fetchone()
+            if row is None:
+                return None
+            connection.execute(
+                'UPDATE jobs SET status = ?, claim = ?, started_at = COALESCE(started_at, ?), heartbeat_at = ? '
+                'WHERE id = ?',
+                (JOB_RUNNING, claim, now, now, row[0])
+            )
+        return self.get(row[0])
+
+    def pending_inputs(self, job: Job, limit: int) -> List[Tuple[int, str]]:
+        """未計算の入力を行番号順に最大 limit 件"""
+        return self._connection().execute(
+            'SELECT line, payload FROM job_inputs WHERE job_id = ? AND line > ? ORDER BY line LIMIT ?',
+            (job.id, job.cursor, limit)
+        ).fetchall()
+
+    def save_chunk(self, job: Job, results: List[Tuple[int, bool, bytes]]) -> bool:
+        """(行番号, 成功したか, 結果) の列を保存し、進捗を進める
+
+        ジョブが別のワーカーに取り直されていれば何も保存せず False を返す。
+        """
+        cursor = results[-1][0]
+        failed = sum(1 for _, success, _ in results if not success)
+        with self._transaction() as connection:
+            updated = connection.execute(
+                'UPDATE jobs SET processed = processed + ?, failed = failed + ?, cursor = ?, heartbeat_at = ? '
+                'WHERE id = ? AND claim = ? AND status = ?',
+                (len(results), failed, cursor, self.clock(), job.id, job.claim, JOB_RUNNING)
+            ).rowcount
+            if not updated:
+                return False
+            connection.executemany(
+                'INSERT OR REPLACE INTO job_results (job_id, line, payload) VALUES (?, ?, ?)',
+                ((job.id, line, payload) for line, _, payload in results)
+            )
+            connection.execute('DELETE FROM job_inputs WHERE job_id = ? AND line <= ?', (job.id, cursor))
+        job.processed += len(results)
+        job.failed += failed
+        job.cursor = cursor
+        return True
+
+    def finish(self, job: Job, error: Optional[str] = None) -> None:
+        """ジョブを完了（error があれば失敗）にする"""
+        with self._transaction() as connection:
+            connection.execute(
+                'UPDATE jobs SET status = ?, error = ?, claim = NULL, finished_at = ? WHERE id = ? AND claim = ?',
+                (JOB_FAILED if error else JOB_SUCCEEDED, error, self.clock(), job.id, job.claim)
+            )
+            if error:
+                connection.execute('DELETE FROM job_inputs WHERE job_id = ?', (job.id,))
+
+    def release(self, job: Job) -> None:
+        """実行中のジョブを待機中に戻す（ワーカーを止めるとき）"""
+        with self._transaction() as connection:
+            connection.execute(
+                'UPDATE jobs SET status = ?, claim = NULL WHERE id = ? AND claim = ?',
+                (JOB_QUEUED, job.id, job.claim)
+            )
+
+    def delete(self, job_id: str) -> bool:
+        """ジョブを入力・結果ごと削除する（ジョブがなければ False）
+
+        実行中のジョブを削除すると、ワーカーは次のチャンクの保存に失敗してそのジョブをやめる。
+        """
+        with self._transaction() as connection:
+            deleted = connection.execute('DELETE FROM jobs WHERE id = ?', (job_id,)).rowcount
+            connection.execute('DELETE FROM job_inputs WHERE job_id = ?', (job_id,))
+            connection.execute('DELETE FROM job_results WHERE job_id = ?', (job_id,))
+        return bool(deleted)
+
+    def purge_finished(self, retention: float = DEFAULT_RETENTION) -> int:
+        """完了してから retention 秒以上たったジョブを結果ごと削除し、削除した件数を返す"""
+        expired = ('SELECT id FROM jobs WHERE status IN (?, ?) AND finished_at <= ?',
+                   (JOB_SUCCEEDED, JOB_FAILED, self.clock() - retention))
+        with self._transaction() as connection:
+            job_ids = [row[0] for row in connection.execute(*expired)]
+            for table in ('job_inputs', 'job_results'):
+                connection.executemany(f'DELETE FROM {table} WHERE job_id = ?', ((job_id,) for job_id in job_ids))
+            connection.executemany('DELETE FROM jobs WHERE id = ?', ((job_id,) for job_id in job_ids))
+        return len(job_ids)
+
+    def results(self, job_id: str, after: int = 0, limit: int = 100) -> List[Tuple[int, bytes]]:
+        """行番号 after より後の結果を行番号順に最大 limit 件（行番号をカーソルとするページング）"""
+        return self._connection().execute(
+            'SELECT line, payload FROM job_results WHERE job_id = ? AND line > ? ORDER BY line LIMIT ?',
+            (job_id, after, limit)
+        ).fetchall()
+
+
+# 1行の入力を計算する関数: (入力, 行番号, ジョブのオプション) → (成功したか, 保存する結果)
+LineProcessor = Callable[[str, int, Dict], Tuple[bool, bytes]]
+
+
+class JobQueue:
+    """ジョブを実行するワーカースレッドのプール"""
+
+    def __init__(self, store: JobStore, process_line: LineProcessor, workers: int = 2,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE, stale_after: float = DEFAULT_STALE_AFTER,
+                 poll_interval: float = 1.0, retention: float = DEFAULT_RETENTION,
+                 sweep_interval: float = DEFAULT_SWEEP_INTERVAL):
+        self.store = store
+        self.process_line = process_line
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.stale_after = stale_after
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self.sweep_interval = sweep_interval
+        self._next_sweep = 0.0
+        self._sweep_lock = threading.Lock()
+        self._threads: List[threading.Thread] = []
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        """ワーカースレッドを起動する（起動済みなら何もしない）"""
+        with self._lock:
+            if self._threads:
+                return
+            self._stop.clear()
+            self._threads = [
+                threading.Thread(target=self._run, name=f'job-worker-{i}', daemon=True)
+                for i in range(self.workers)
+            ]
+            for thread in self._threads:
+                thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """実行中のチャンクを終えたところでワーカーを止める（途中のジョブは待機中に戻す）"""
+        with self._lock:
+            threads, self._threads = self._threads, []
+        self._stop.set()
+        self._wake.set()
+        for thread in threads:
+            thread.join(timeout)
+
+    def submit(self, lines: Iterable[Tuple[int, str]], options: Optional[Dict] = None) -> Job:
+        """ジョブを登録してワーカーを起こす"""
+        job = self.store.submit(lines, options)
+        self._wake.set()
+        return job
+
+    def _run(self) -> None:
+        try:
+            while not self._stop.is_set():
+                self._sweep()
+                job = self.store.claim(self.stale_after)
+                if job is None:
+                    self._wake.wait(self.poll_interval)
+                    self._wake.clear()
+                    continue
+                self._wake.set()  # 待機中のジョブが残っていれば他のワーカーも取りに行く
+                self.execute(job)
+        finally:
+            self.store.close()
+
+    def _sweep(self) -> None:
+        """保存期間を過ぎた完了ジョブを削除する（sweep_interval 秒に1回。いずれか1つのワーカーが行う）"""
+        now = time.monotonic()
+        with self._sweep_lock:
+            if now < self._next_sweep:
+                return
+            self._next_sweep = now + self.sweep_interval
+        self.store.purge_finished(self.retention)
+
+    def execute(self, job: Job) -> None:
+        """取り出したジョブを chunk_size 行ずつ最後まで（またはワーカーを止めるまで）実行する"""
+        try:
+            while True:
+                if self._stop.is_set():
+                    self.store.release(job)
+                    return
+                inputs = self.store.pending_inputs(job, self.chunk_size)
+                if not inputs:
+                    self.store.finish(job)
+                    return
+                results = [(line, *self.process_line(payload, line, job.options)) for line, payload in inputs]
+                if not self.store.save_chunk(job, results):
+                    return  # 別のワーカーが取り直した
+        except Exception as e:
+            self.store.finish(job, error=str(e))
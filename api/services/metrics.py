@@ -0,0 +1,250 @@
+"""
+リクエスト処理時間の計測とメトリクス
+
+API のハンドラと InheritanceTaxCalculator の主要メソッドの処理時間を、フェーズ
+（parse: JSON解析、validate: 入力検証、heirs: 法定相続人判定、tax: 税額計算、serialize: レスポンス作成）
+ごとに計測する。計測結果はリクエストごとに Server-Timing ヘッダとして返し、
+エンドポイント別・相続人数別のヒストグラムとして Prometheus のテキスト形式で公開する。
+
+計測は環境変数 INHERITANCE_METRICS=1 で有効になる。無効のときは現在のリクエストの
+計測対象（コンテキスト変数）が None であることを確認するだけで、時刻の取得も集計も行わない。
+"""
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from functools import wraps
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# 処理時間のヒストグラムの区切り（秒）
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# 相続人数のラベル（系列数が増えすぎないよう6人以上はまとめる）
+_HEIRS_COUNT_LABELS = (
+    (5, None),
+    (10, '6-10'),
+    (20, '11-20'),
+    (50, '21-50'),
+)
+
+
+def heirs_count_label(count: int) -> str:
+    """相続人数をヒストグラムのラベルに変換"""
+    for upper, label in _HEIRS_COUNT_LABELS:
+        if count <= upper:
+            return label or str(count)
+    return '51+'
+
+
+def _escape_label_value(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    return ','.join(f'{name}="{_escape_label_value(value)}"' for name, value in zip(names, values))
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """ラベルごとのヒストグラム（Prometheus の histogram 型）"""
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str],
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        # ラベルの値 -> [区間ごとの件数（最後は上限超過）, 合計値]
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, label_values: Tuple[str, ...], value: float) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def count(self, label_values: Tuple[str, ...]) -> int:
+        """指定したラベルの観測件数"""
+        with self._lock:
+            series = self._series.get(label_values)
+            return sum(series[0]) if series else 0
+
+    def render(self) -> List[str]:
+        """Prometheus のテキスト形式の行"""
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = sorted((labels, list(counts), total) for labels, (counts, total) in self._series.items())
+        for label_values, counts, total in series:
+            labels = _format_labels(self.label_names, label_values)
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += count
+                le = bound if isinstance(bound, str) else _format_value(bound)
+                lines.append(f'{self.name}_bucket{{{labels},le="{le}"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{labels}}} {_format_value(total)}')
+            lines.append(f'{self.name}_count{{{labels}}} {cumulative}')
+        return lines
+
+    def clear(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+
+def counter_lines(name: str, help_text: str, value: int) -> List[str]:
+    """ラベルのないカウンタの行（収集関数から使う）"""
+    return [f'# HELP {name} {help_text}', f'# TYPE {name} counter', f'{name} {value}']
+
+
+def gauge_lines(name: str, help_text: str, value: int) -> List[str]:
+    """ラベルのないゲージの行（収集関数から使う）"""
+    return [f'# HELP {name} {help_text}', f'# TYPE {name} gauge', f'{name} {value}']
+
+
+class RequestTimings:
+    """1リクエスト分のフェーズごとの処理時間"""
+
+    __slots__ = ('start', 'phases', 'heirs_count', 'active')
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.phases: Dict[str, float] = {}  # フェーズ名 -> 秒（同じフェーズは合算）
+        self.heirs_count: Optional[int] = None
+        self.active = set()  # 計測中のフェーズ（入れ子になった同じフェーズは二重に数えない）
+
+    def server_timing(self, total: float) -> str:
+        """Server-Timing ヘッダの値（ミリ秒）"""
+        entries = [f'{name};dur={seconds * 1000:.3f}' for name, seconds in self.phases.items()]
+        entries.append(f'total;dur={total * 1000:.3f}')
+        return ', '.join(entries)
+
+
+_current_timings: ContextVar[Optional[RequestTimings]] = ContextVar('inheritance_request_timings', default=None)
+
+
+class _Phase:
+    __slots__ = ('timings', 'name', 'start')
+
+    def __init__(self, timings: RequestTimings, name: str):
+        self.timings = timings
+        self.name = name
+
+    def __enter__(self):
+        self.timings.active.add(self.name)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        elapsed = time.perf_counter() - self.start
+        phases = self.timings.phases
+        phases[self.name] = phases.get(self.name, 0.0) + elapsed
+        self.timings.active.discard(self.name)
+        return False
+
+
+class _NullPhase:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_PHASE = _NullPhase()
+
+
+def phase(name: str):
+    """with 文の範囲の処理時間を現在のリクエストのフェーズとして記録する"""
+    timings = _current_timings.get()
+    if timings is None or name in timings.active:
+        return _NULL_PHASE
+    return _Phase(timings, name)
+
+
+def timed(phase_name: str) -> Callable:
+    """関数の処理時間を現在のリクエストのフェーズとして記録するデコレータ"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            timings = _current_timings.get()
+            if timings is None or phase_name in timings.active:
+                return func(*args, **kwargs)
+            with _Phase(timings, phase_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def record_heirs_count(count: int) -> None:
+    """現在のリクエストの相続人数を記録する（相続人数別のヒストグラムに使う）"""
+    timings = _current_timings.get()
+    if timings is not None:
+        timings.heirs_count = count
+
+
+class Metrics:
+    """リクエストの計測とヒストグラムの集計"""
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.request_duration = Histogram(
+            'inheritance_request_duration_seconds', 'Request latency by endpoint', ('endpoint', 'status'))
+        self.request_duration_by_heirs = Histogram(
+            'inheritance_request_duration_by_heirs_seconds', 'Request latency by endpoint and heir count',
+            ('endpoint', 'heirs'))
+        self.phase_duration = Histogram(
+            'inheritance_phase_duration_seconds', 'Time spent per request phase', ('endpoint', 'phase'))
+        self._collectors: List[Callable[[], List[str]]] = []
+
+    def add_collector(self, collector: Callable[[], List[str]]) -> None:
+        """/metrics の出力に行を追加する収集関数を登録（キャッシュの統計など）"""
+        self._collectors.append(collector)
+
+    def start_request(self) -> Optional[RequestTimings]:
+        """リクエストの計測を開始（無効のときは None）"""
+        if not self.enabled:
+            return None
+        timings = RequestTimings()
+        _current_timings.set(timings)
+        return timings
+
+    def finish_request(self, endpoint: str, status: int) -> Optional[str]:
+        """リクエストの計測を終了してヒストグラムに集計し、Server-Timing ヘッダの値を返す"""
+        timings = _current_timings.get()
+        if timings is None:
+            return None
+        _current_timings.set(None)
+        total = time.perf_counter() - timings.start
+
+        self.request_duration.observe((endpoint, str(status)), total)
+        if timings.heirs_count is not None:
+            self.request_duration_by_heirs.observe((endpoint, heirs_count_label(timings.heirs_count)), total)
+        for name, seconds in timings.phases.items():
+            self.phase_duration.observe((endpoint, name), seconds)
+        return timings.server_timing(total)
+
+    def render(self) -> str:
+        """Prometheus のテキスト形式（text/plain; version=0.0.4）"""
+        lines = []
+        for histogram in (self.request_duration, self.request_duration_by_heirs, self.phase_duration):
+            lines.extend(histogram.render())
+        for collector in self._collectors:
+            lines.extend(collector())
+        return '\n'.join(lines) + '\n'
+
+    def clear(self) -> None:
+        """集計結果をリセット"""
+        for histogram in (self.request_duration, self.request_duration_by_heirs, self.phase_duration):
+            histogram.clear()
+
+
+metrics = Metrics(enabled=os.environ.get('INHERITANCE_METRICS') == '1')
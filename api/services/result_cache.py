@@ -0,0 +1,110 @@
+"""
+計算結果のキャッシュ（内容アドレス方式）
+
+相続税額計算・実際の分割による税額配分計算の結果は入力だけで決まるため、
+正規化した入力のハッシュをキーとして、シリアライズ済みのレスポンスをキャッシュする。
+キーはそのまま ETag として使い、If-None-Match が一致すれば計算せずに 304 を返せる。
+件数の上限（LRU）と有効期限（TTL）で古い結果を追い出す。
+"""
+import dataclasses
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+from enum import Enum
+from typing import Callable, Dict, Optional, Tuple
+
+# 計算ロジック・レスポンス形式を変えたら更新する（古いキャッシュ・ETag を無効にするため）
+RESULT_CACHE_VERSION = 1
+
+
+def _canonical_default(value):
+    if dataclasses.is_dataclass(value):
+        return {field.name: getattr(value, field.name) for field in dataclasses.fields(value)}
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f"正規化できない値です: {value!r}")
+
+
+def request_key(kind: str, normalized_input: Dict) -> str:
+    """正規化した入力のハッシュ（キャッシュのキー・ETag）"""
+    canonical = json.dumps(
+        [RESULT_CACHE_VERSION, kind, normalized_input],
+        sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=_canonical_default
+    )
+    return hashlib.blake2b(canonical.encode('utf-8'), digest_size=16).hexdigest()
+
+
+class ResultCache:
+    """キーからシリアライズ済みのレスポンスを引く、件数上限・有効期限つきのLRUキャッシュ"""
+
+    def __init__(self, maxsize: int = 4096, ttl: float = 600.0, clock: Callable[[], float] = time.monotonic):
+        if maxsize <= 0:
+            raise ValueError("maxsize は1以上である必要があります")
+        if ttl <= 0:
+            raise ValueError("ttl は正の値である必要があります")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()  # キー -> (有効期限, 本文)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.not_modified = 0
+
+    def get(self, key: str) -> Optional[bytes]:
+        """キャッシュ済みのレスポンスを取得（ないか期限切れなら None）"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, body = entry
+                if expires_at > self._clock():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return body
+                del self._entries[key]
+                self.expirations += 1
+            self.misses += 1
+            return None
+
+    def put(self, key: str, body: bytes) -> None:
+        with self._lock:
+            self._entries[key] = (self._clock() + self.ttl, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def record_not_modified(self) -> None:
+        """If-None-Match が一致して 304 を返した件数"""
+        with self._lock:
+            self.not_modified += 1
+
+    def stats(self) -> Dict[str, int]:
+        """キャッシュのヒット・ミス・追い出し・期限切れ・304の件数"""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'not_modified': self.not_modified,
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+            }
+
+    def clear(self) -> None:
+        """キャッシュと統計をリセット"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+            self.expirations = 0
+            self.not_modified = 0
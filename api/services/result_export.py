@@ -0,0 +1,160 @@
+"""
+計算結果の表形式（CSV / XLSX）への書き出し
+
+1件ごとに「合計」の行（TaxCalculationResult・DivisionResult の合計額）と、相続人ごとの行
+（法定相続分による税額明細 LegalShareTaxDetail と実際の分割による税額明細 DivisionTaxDetail）を書き出す。
+行は受け取った計算結果から逐次作るため、一括計算のジェネレーターと組み合わせれば
+10万件の書き出しでも結果全体をメモリに載せない。
+
+- CSV は1行ごとにそのまま書き出す（Excel で開けるよう BOM 付きの UTF-8）
+- XLSX は openpyxl の書き込み専用モードで、行を一時ファイルに書き出しながら作る。
+  ZIP 形式のため最後まで書き終えてからでないと送り出せず、HTTP では完成したファイルを分割して返す
+"""
+import csv
+import io
+import tempfile
+from dataclasses import dataclass
+from typing import IO, Iterable, Iterator, List, Optional
+
+from models.inheritance import DivisionResult, TaxCalculationResult
+
+EXPORT_FORMATS = ('csv', 'xlsx')
+
+MIMETYPES = {
+    'csv': 'text/csv',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+EXPORT_HEADER = (
+    'ID', '区分',
+    '課税価格の合計額', '基礎控除額', '課税遺産総額', '相続税の総額',
+    '相続人ID', '相続人', '続柄', '法定相続分', '2割加算',
+    '法定相続分に応じる取得金額', '2割加算前の税額', '2割加算額', '2割加算後の税額',
+    '取得金額', '配分税額', '加算減算額', '最終納税額',
+    'エラー',
+)
+
+ROW_KIND_TOTAL = '合計'
+ROW_KIND_HEIR = '相続人'
+ROW_KIND_ERROR = 'エラー'
+
+# CSV をまとめて送り出す単位（行数）
+_CSV_FLUSH_ROWS = 256
+
+# XLSX の一時ファイルから送り出す単位
+_XLSX_CHUNK_SIZE = 64 * 1024
+
+
+@dataclass
+class ExportRecord:
+    """書き出す1件分の計算結果（計算できなかった件は error に理由を入れる）"""
+    case_id: Optional[str]
+    taxable_amount: int = 0
+    tax_result: Optional[TaxCalculationResult] = None
+    division_result: Optional[DivisionResult] = None
+    error: Optional[str] = None
+
+    @classmethod
+    def from_case_result(cls, result) -> 'ExportRecord':
+        """Excel ブックからの取り込み結果（services.excel_import.CaseResult）から作成"""
+        case = result.case
+        return cls(case.case_id, case.taxable_amount, result.tax_result, result.division_result)
+
+
+def record_rows(record: ExportRecord) -> Iterator[List]:
+    """1件分の行（合計の行と相続人ごとの行、またはエラーの行）"""
+    blank = [None] * len(EXPORT_HEADER)
+    if record.error is not None or record.tax_result is None:
+        yield [record.case_id, ROW_KIND_ERROR] + blank[2:-1] + [record.error]
+        return
+
+    tax_result = record.tax_result
+    division_result = record.division_result
+    division_details = {detail.heir_id: detail for detail in division_result.heir_details} if division_result else {}
+
+    total = [record.case_id, ROW_KIND_TOTAL,
+             record.taxable_amount, tax_result.basic_deduction, tax_result.taxable_inheritance,
+             tax_result.total_tax_amount] + blank[6:]
+    if division_result is not None:
+        total[-5:-1] = [
+            sum(detail.inheritance_amount for detail in division_result.heir_details),
+            sum(detail.tax_amount for detail in division_result.heir_details),
+            sum(detail.surcharge_deduction_amount for detail in division_result.heir_details),
+            sum(detail.final_tax_amount for detail in division_result.heir_details),
+        ]
+    yield total
+
+    for heir, detail in zip(tax_result.legal_heirs, tax_result.heir_tax_details):
+        row = [record.case_id, ROW_KIND_HEIR, None, None, None, None,
+               heir.id, heir.name, heir.relationship.value, str(heir.legal_share),
+               '有' if heir.two_fold_addition else '無',
+               detail.legal_share_amount, detail.tax_before_addition, detail.two_fold_addition,
+               detail.tax_after_addition]
+        division_detail = division_details.get(heir.id)
+        if division_detail is not None:
+            row += [division_detail.inheritance_amount, division_detail.tax_amount,
+                    division_detail.surcharge_deduction_amount, division_detail.final_tax_amount]
+        else:
+            row += [None] * 4
+        yield row + [None]
+
+
+def export_rows(records: Iterable[ExportRecord]) -> Iterator[List]:
+    """見出しの行に続けて、各件の行を逐次返す"""
+    yield list(EXPORT_HEADER)
+    for record in records:
+        yield from record_rows(record)
+
+
+def write_csv(rows: Iterable[List], stream: IO[str]) -> None:
+    """行を CSV としてテキストストリームに書き出す"""
+    writer = csv.writer(stream, lineterminator='\r\n')
+    for row in rows:
+        writer.writerow(row)
+
+
+def iter_csv(rows: Iterable[List]) -> Iterator[bytes]:
+    """行を CSV（BOM 付き UTF-8）のバイト列として逐次返す"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\r\n')
+    yield '\ufeff'.encode('utf-8')
+    for count, row in enumerate(rows, start=1):
+        writer.writerow(row)
+        if count % _CSV_FLUSH_ROWS == 0:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def write_xlsx(rows: Iterable[List], target, sheet_title: str = '計算結果') -> None:
+    """行を XLSX として書き出す（target はパスまたはファイルオブジェクト）"""
+    import openpyxl  # 任意の依存
+
+    workbook = openpyxl.Workbook(write_only=True)
+    worksheet = workbook.create_sheet(sheet_title)
+    for row in rows:
+        worksheet.append(row)
+    workbook.save(target)
+
+
+def iter_xlsx(rows: Iterable[List]) -> Iterator[bytes]:
+    """行を XLSX に書き出し、完成したファイルをバイト列として分割して返す"""
+    with tempfile.TemporaryFile() as file:
+        write_xlsx(rows, file)
+        file.seek(0)
+        while True:
+            chunk = file.read(_XLSX_CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+
+
+def write_export(rows: Iterable[List], target: str, export_format: str) -> None:
+    """行を export_format（csv / xlsx）でファイル target に書き出す"""
+    if export_format == 'xlsx':
+        write_xlsx(rows, target)
+    else:
+        with open(target, 'w', encoding='utf-8-sig', newline='') as stream:
+            write_csv(rows, stream)
@@ -0,0 +1,153 @@
+"""
+二次相続を考慮した配偶者の取得割合のシミュレーション
+
+配偶者の取得割合を格子状に変えながら、
+一次相続の税額（実際の分割による）と、配偶者が取得した財産（納税後）に
+配偶者固有の財産と運用による増減を加えた財産を子供等が相続する二次相続の税額を求め、
+その合計の曲線を返す。格子はベクトル化して一括評価し、チャンクごとにプロセスプールで並列化する。
+"""
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, replace
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from models.inheritance import FamilyStructure, Heir, HeirType
+from services.batch_calculator import calculate_division_tax_batch
+from services.heir_cache import HeirCache
+from services.tax_curve import TaxCurve
+
+MAX_SECOND_ESTATE = 10 ** 15  # 二次相続の課税価格の上限（税額の整数計算が int64 に収まる範囲）
+
+
+@dataclass
+class SecondaryInheritanceResult:
+    """二次相続シミュレーションの結果（各配列は格子点ごと）"""
+    spouse_shares: np.ndarray  # 配偶者の取得割合（0〜1）
+    spouse_amounts: np.ndarray  # 配偶者の取得金額
+    first_taxes: np.ndarray  # 一次相続の納税額の合計
+    second_estates: np.ndarray  # 二次相続の課税価格
+    second_taxes: np.ndarray  # 二次相続の納税額の合計
+    combined_taxes: np.ndarray  # 一次・二次の合計
+
+    @property
+    def best_index(self) -> int:
+        """合計税額が最小となる格子点（同額なら配偶者の取得割合が小さい方）"""
+        return int(np.argmin(self.combined_taxes))
+
+
+def _first_division_amounts(heirs: Sequence[Heir], total_amount: int, spouse_amounts: np.ndarray) -> np.ndarray:
+    """配偶者の取得金額ごとに、残りを配偶者以外の法定相続人へ法定相続分の比で配分する"""
+    spouse_index = next(i for i, heir in enumerate(heirs) if heir.heir_type == HeirType.SPOUSE)
+    weights = np.array([
+        heir.inheritance_share if i != spouse_index else 0.0 for i, heir in enumerate(heirs)
+    ], dtype=np.float64)
+    weights /= weights.sum()
+    others = np.flatnonzero(weights)
+
+    remainders = total_amount - spouse_amounts
+    amounts = np.zeros((len(spouse_amounts), len(heirs)), dtype=np.int64)
+    amounts[:, spouse_index] = spouse_amounts
+    amounts[:, others] = np.floor(remainders[:, None] * weights[others][None, :]).astype(np.int64)
+    amounts[:, others[0]] += remainders - amounts[:, others].sum(axis=1)  # 端数は先頭の相続人へ
+    return amounts
+
+
+def _evaluate_grid_chunk(first_heirs: Tuple[Heir, ...], first_curve: TaxCurve,
+                         second_heirs: Tuple[Heir, ...], second_curve: TaxCurve,
+                         taxable_amount: int, spouse_own_assets: int, growth_factor: float,
+                         spouse_shares: np.ndarray) -> Tuple[np.ndarray, ...]:
+    """格子点のチャンクを評価する（プロセスプールから呼び出すためモジュール関数）"""
+    spouse_index = next(i for i, heir in enumerate(first_heirs) if heir.heir_type == HeirType.SPOUSE)
+
+    # 一次相続
+    spouse_amounts = np.round(spouse_shares * taxable_amount).astype(np.int64)
+    first_amounts = _first_division_amounts(first_heirs, taxable_amount, spouse_amounts)
+    first_total_tax = first_curve.total_tax(taxable_amount)
+    first_final = calculate_division_tax_batch(first_heirs, taxable_amount, first_total_tax, first_amounts)
+
+    # 二次相続（配偶者の納税後の取得財産と固有財産を運用した結果を、法定相続分どおりに分割）
+    spouse_net = spouse_amounts - first_final[:, spouse_index]
+    second_estates = np.floor((spouse_net + spouse_own_assets) * growth_factor).astype(np.int64)
+    second_estates = np.maximum(0, second_estates)
+    second_total_taxes = second_curve.total_tax_many(second_estates)
+    ratios = np.array([heir.inheritance_share for heir in second_heirs], dtype=np.float64)
+    second_amounts = np.round(second_estates[:, None] * ratios[None, :]).astype(np.int64)
+    second_final = calculate_division_tax_batch(second_heirs, second_estates, second_total_taxes, second_amounts)
+
+    return spouse_amounts, first_final.sum(axis=1), second_estates, second_final.sum(axis=1)
+
+
+class SecondaryInheritanceSimulator:
+    """二次相続シミュレーションサービス"""
+
+    def __init__(self, heir_cache: HeirCache = None, chunk_size: int = 256):
+        self.heir_cache = heir_cache or HeirCache()
+        self.chunk_size = chunk_size
+
+    def simulate(
+        self,
+        family_structure: FamilyStructure,
+        taxable_amount: int,
+        spouse_shares: Optional[Sequence[float]] = None,
+        grid_points: int = 101,
+        spouse_own_assets: int = 0,
+        annual_growth_rate: float = 0.0,
+        years: float = 0.0,
+        workers: int = 1,
+    ) -> SecondaryInheritanceResult:
+        """配偶者の取得割合ごとの一次・二次相続の税額を求める
+
+        spouse_shares を省略した場合は 0〜1 を grid_points 等分した格子を使う。
+        二次相続の相続人は、一次相続の家族構成から配偶者と法定相続人以外を除いたもの。
+        """
+        if not family_structure.spouse_exists:
+            raise ValueError("二次相続のシミュレーションには配偶者が必要です")
+        if taxable_amount <= 0:
+            raise ValueError("課税価格の合計額は正の値である必要があります")
+
+        second_structure = replace(family_structure, spouse_exists=False, non_heirs_count=0)
+        first = self.heir_cache.get(family_structure)
+        second = self.heir_cache.get(second_structure)
+        if not any(heir.heir_type != HeirType.SPOUSE for heir in first.heirs if heir.inheritance_share > 0):
+            raise ValueError("配偶者以外の法定相続人がいません")
+
+        if spouse_shares is None:
+            shares = np.linspace(0.0, 1.0, num=max(2, grid_points))
+        else:
+            shares = np.asarray(spouse_shares, dtype=np.float64)
+            if ((shares < 0) | (shares > 1)).any():
+                raise ValueError("配偶者の取得割合は0〜1である必要があります")
+        try:
+            growth_factor = (1.0 + annual_growth_rate) ** years
+        except OverflowError:
+            growth_factor = float('inf')
+        # 二次相続の課税価格は (配偶者の取得金額 - 納税額 + 固有財産) × 増減の倍率 で、
+        # 配偶者の取得金額は課税価格の合計額以下のため、この上限を超えなければ int64 への変換であふれない
+        max_second_estate = (taxable_amount + spouse_own_assets) * growth_factor
+        if not np.isfinite(growth_factor) or not max_second_estate <= MAX_SECOND_ESTATE:
+            raise ValueError(f"二次相続の課税価格が上限（{MAX_SECOND_ESTATE:,}円）を超えます。"
+                             "年間増減率・年数を見直してください")
+
+        common = (first.heirs, first.tax_curve, second.heirs, second.tax_curve,
+                  taxable_amount, spouse_own_assets, growth_factor)
+        chunks = [shares[i:i + self.chunk_size] for i in range(0, len(shares), self.chunk_size)]
+        if workers > 1 and len(chunks) > 1:
+            with ProcessPoolExecutor(max_workers=min(workers, len(chunks))) as executor:
+                results: List = list(executor.map(
+                    _evaluate_grid_chunk, *zip(*[common + (chunk,) for chunk in chunks])
+                ))
+        else:
+            results = [_evaluate_grid_chunk(*common, chunk) for chunk in chunks]
+
+        spouse_amounts, first_taxes, second_estates, second_taxes = (
+            np.concatenate([r[i] for r in results]) for i in range(4)
+        )
+        return SecondaryInheritanceResult(
+            spouse_shares=shares,
+            spouse_amounts=spouse_amounts,
+            first_taxes=first_taxes,
+            second_estates=second_estates,
+            second_taxes=second_taxes,
+            combined_taxes=first_taxes + second_taxes,
+        )
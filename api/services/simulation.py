@@ -0,0 +1,221 @@
+"""
+財産評価の不確実性を考慮した相続税のモンテカルロ・シミュレーション
+
+財産ごとの評価額を指定した確率分布から抽出して課税価格を作り、
+法定相続分による相続税の総額（TaxCurve）と実際の分割による税額
+（calculate_division_tax_batch）をベクトル化して一括評価する。
+大量の標本はチャンクに分割し、ProcessPoolExecutor で並列に評価する。
+"""
+import math
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from models.inheritance import Heir
+from services.batch_calculator import calculate_division_tax_batch
+from services.tax_curve import TaxCurve
+
+DISTRIBUTIONS = ('fixed', 'normal', 'lognormal', 'uniform', 'triangular')
+DEFAULT_PERCENTILES = (5, 25, 50, 75, 95)
+MAX_TAXABLE_AMOUNT = 10 ** 15  # 標本の課税価格の上限（税額の整数計算が int64 に収まる範囲）
+
+# 分布ごとに必要なパラメータ
+DISTRIBUTION_PARAMS = {
+    'fixed': ('value',),
+    'normal': ('mean', 'std'),
+    'lognormal': ('mean', 'std'),
+    'uniform': ('low', 'high'),
+    'triangular': ('low', 'mode', 'high'),
+}
+
+
+@dataclass(frozen=True)
+class AssetDistribution:
+    """財産1件の評価額の確率分布
+
+    fixed: value / normal: mean, std / lognormal: mean, std（評価額そのものの平均・標準偏差）
+    uniform: low, high / triangular: low, mode, high
+    """
+    name: str
+    distribution: str
+    params: Tuple[Tuple[str, float], ...]
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "AssetDistribution":
+        distribution = data.get('distribution', 'fixed')
+        if distribution not in DISTRIBUTIONS:
+            raise ValueError(f"未対応の分布です: {distribution}")
+        params = tuple(sorted(
+            (key, float(value)) for key, value in data.items()
+            if key not in ('name', 'distribution')
+        ))
+        asset = cls(name=data.get('name', ''), distribution=distribution, params=params)
+        asset.validate()
+        return asset
+
+    def validate(self) -> None:
+        """分布のパラメータを確認する（不足・不正な値があれば ValueError）"""
+        p = dict(self.params)
+        missing = [key for key in DISTRIBUTION_PARAMS[self.distribution] if key not in p]
+        if missing:
+            raise ValueError(f"{self.distribution} 分布には {', '.join(missing)} が必要です")
+        if not all(math.isfinite(value) for value in p.values()):
+            raise ValueError("分布のパラメータは有限の数値である必要があります")
+        if p.get('std', 0) < 0:
+            raise ValueError("標準偏差は0以上である必要があります")
+        if self.distribution == 'lognormal' and p['mean'] <= 0:
+            raise ValueError("lognormal 分布の平均は正の値である必要があります")
+        if self.distribution == 'uniform' and p['low'] > p['high']:
+            raise ValueError("uniform 分布は low <= high である必要があります")
+        if self.distribution == 'triangular' and not p['low'] <= p['mode'] <= p['high']:
+            raise ValueError("triangular 分布は low <= mode <= high である必要があります")
+
+    def sample(self, rng: np.random.Generator, size: int) -> np.ndarray:
+        p = dict(self.params)
+        if self.distribution == 'fixed':
+            return np.full(size, p['value'])
+        if self.distribution == 'normal':
+            return rng.normal(p['mean'], p['std'], size)
+        if self.distribution == 'lognormal':
+            # 評価額の平均・標準偏差から対数正規分布のパラメータを求める
+            variance = np.log1p((p['std'] / p['mean']) ** 2)
+            return rng.lognormal(np.log(p['mean']) - variance / 2, np.sqrt(variance), size)
+        if self.distribution == 'uniform':
+            return rng.uniform(p['low'], p['high'], size)
+        return rng.triangular(p['low'], p['mode'], p['high'], size)
+
+
+@dataclass(frozen=True)
+class DivisionPolicy:
+    """分割方針（各相続人の取得割合）"""
+    ratios: Tuple[float, ...]  # heirs と同じ並びの取得割合（合計1）
+    rounding_method: str = 'round'
+
+    @classmethod
+    def legal_share(cls, heirs: Sequence[Heir]) -> "DivisionPolicy":
+        """法定相続分どおりに分割する方針"""
+        return cls(ratios=tuple(heir.inheritance_share for heir in heirs))
+
+    @classmethod
+    def from_percentages(cls, heirs: Sequence[Heir], percentages: Dict[str, float],
+                         rounding_method: str = 'round') -> "DivisionPolicy":
+        """相続人IDごとの取得割合（%）から作成（合計が100%でない・相続人等にないIDがある場合は ValueError）"""
+        heir_ids = {heir.id for heir in heirs}
+        unknown = [heir_id for heir_id in percentages if heir_id not in heir_ids]
+        if unknown:
+            raise ValueError(f"相続人等に含まれないIDがあります: {', '.join(unknown)}")
+        if round(sum(percentages.values()), 5) != 100.0:
+            raise ValueError("取得割合の合計が100%になりません")
+        return cls(
+            ratios=tuple(percentages.get(heir.id, 0) / 100 for heir in heirs),
+            rounding_method=rounding_method,
+        )
+
+
+@dataclass
+class SimulationResult:
+    """シミュレーション結果"""
+    sample_count: int
+    taxable_amounts: np.ndarray  # 標本ごとの課税価格
+    legal_share_taxes: np.ndarray  # 標本ごとの相続税の総額（法定相続分）
+    final_taxes: np.ndarray  # 標本ごとの実際の分割による納税額の合計
+
+    def summary(self, percentiles: Sequence[float] = DEFAULT_PERCENTILES) -> Dict:
+        """平均・パーセンタイル・納税が生じる確率"""
+        def describe(values: np.ndarray) -> Dict:
+            return {
+                'mean': float(values.mean()),
+                'std': float(values.std()),
+                'min': int(values.min()),
+                'max': int(values.max()),
+                'percentiles': {
+                    str(p): float(v) for p, v in zip(percentiles, np.percentile(values, percentiles))
+                },
+            }
+        return {
+            'sample_count': self.sample_count,
+            'taxable_amount': describe(self.taxable_amounts),
+            'legal_share_tax': describe(self.legal_share_taxes),
+            'final_tax': describe(self.final_taxes),
+            'probability_of_tax': float((self.final_taxes > 0).mean()),
+        }
+
+
+def _simulate_chunk(assets: Tuple[AssetDistribution, ...], heirs: Tuple[Heir, ...], tax_curve: TaxCurve,
+                    policy: DivisionPolicy, size: int,
+                    seed: np.random.SeedSequence) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """1チャンク分の標本を抽出して評価する（プロセスプールから呼び出すためモジュール関数）"""
+    rng = np.random.default_rng(seed)
+    values = np.zeros(size, dtype=np.float64)
+    for asset in assets:
+        values += asset.sample(rng, size)
+    # 非有限値・上限を超える値は int64 への変換であふれるため、変換前に除く
+    if not (np.isfinite(values).all() and (values <= MAX_TAXABLE_AMOUNT).all()):
+        raise ValueError(f"課税価格の標本が有限でないか、上限（{MAX_TAXABLE_AMOUNT:,}円）を超えます")
+    taxable_amounts = np.maximum(0, np.floor(values)).astype(np.int64)
+
+    legal_share_taxes = tax_curve.total_tax_many(taxable_amounts)
+
+    ratios = np.array(policy.ratios, dtype=np.float64)
+    amounts = taxable_amounts[:, None] * ratios[None, :]
+    if policy.rounding_method == 'round':
+        amounts = np.round(amounts)
+    elif policy.rounding_method == 'floor':
+        amounts = np.floor(amounts)
+    else:
+        amounts = np.ceil(amounts)
+    final_taxes = calculate_division_tax_batch(
+        heirs, taxable_amounts, legal_share_taxes, amounts.astype(np.int64)
+    ).sum(axis=1)
+    return taxable_amounts, legal_share_taxes, final_taxes
+
+
+class MonteCarloSimulator:
+    """相続税のモンテカルロ・シミュレーションサービス"""
+
+    def __init__(self, chunk_size: int = 100_000):
+        self.chunk_size = chunk_size
+
+    def simulate(
+        self,
+        assets: Sequence[AssetDistribution],
+        heirs: Sequence[Heir],
+        tax_curve: TaxCurve,
+        policy: Optional[DivisionPolicy] = None,
+        sample_count: int = 10_000,
+        seed: Optional[int] = None,
+        workers: int = 1,
+    ) -> SimulationResult:
+        """標本を抽出して税額の分布を求める
+
+        乱数はチャンクごとに SeedSequence から派生させるため、
+        seed を指定すれば workers の数によらず同じ結果になる。
+        """
+        if sample_count <= 0:
+            raise ValueError("標本数は1以上である必要があります")
+        if not assets:
+            raise ValueError("財産が指定されていません")
+        assets = tuple(assets)
+        heirs = tuple(heirs)
+        policy = policy or DivisionPolicy.legal_share(heirs)
+
+        sizes = [self.chunk_size] * (sample_count // self.chunk_size)
+        if sample_count % self.chunk_size:
+            sizes.append(sample_count % self.chunk_size)
+        seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+        tasks = [(assets, heirs, tax_curve, policy, size, s) for size, s in zip(sizes, seeds)]
+
+        if workers > 1 and len(tasks) > 1:
+            with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as executor:
+                chunks: List = list(executor.map(_simulate_chunk, *zip(*tasks)))
+        else:
+            chunks = [_simulate_chunk(*task) for task in tasks]
+
+        return SimulationResult(
+            sample_count=sample_count,
+            taxable_amounts=np.concatenate([c[0] for c in chunks]),
+            legal_share_taxes=np.concatenate([c[1] for c in chunks]),
+            final_taxes=np.concatenate([c[2] for c in chunks]),
+        )
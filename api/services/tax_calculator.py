@@ -2,18 +2,25 @@
 相続税計算のビジネスロジック
 """
 import math
-from typing import Dict, List, Tuple
+from datetime import date
+from fractions import Fraction
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Tuple, Union
 from models.inheritance import (
     Heir, HeirType, RelationshipType, FamilyStructure, TaxCalculationInput,
-    TaxCalculationResult, HeirTaxDetail, DivisionInput, DivisionResult,
-    ValidationError, ValidationResult, TAX_TABLE, BASIC_DEDUCTION_BASE,
-    BASIC_DEDUCTION_PER_HEIR, TWO_FOLD_ADDITION_EXEMPT
+    TaxCalculationResult, LegalShareTaxDetail, DivisionTaxDetail, DivisionInput, DivisionResult,
+    ValidationError, ValidationResult, TWO_FOLD_ADDITION_EXEMPT
 )
+from models.tax_schedule import TaxSchedule, schedule_for
+from services.metrics import timed
+
+if TYPE_CHECKING:  # HeirTable は NumPy を使うため、一括計算で使うときだけ読み込む
+    from models.heir_table import HeirTable
 
 
 class InheritanceTaxCalculator:
     """相続税計算サービス"""
     
+    @timed('heirs')
     def determine_legal_heirs(self, family_structure: FamilyStructure) -> List[Heir]:
         """法定相続人を判定する"""
         heirs = []
@@ -22,34 +29,35 @@ class InheritanceTaxCalculator:
         has_parents = family_structure.parents_alive > 0
         has_siblings = family_structure.siblings_count > 0 or family_structure.half_siblings_count > 0
 
-        spouse_share = 0.0
-        others_share = 1.0
+        # 法定相続分は有理数で求める（浮動小数点の誤差による1円単位のずれを避けるため）
+        spouse_share = Fraction(0)
+        others_share = Fraction(1)
 
         if family_structure.spouse_exists:
             if has_children:
-                spouse_share = 1/2
+                spouse_share = Fraction(1, 2)
             elif has_parents:
-                spouse_share = 2/3
+                spouse_share = Fraction(2, 3)
             elif has_siblings:
-                spouse_share = 3/4
+                spouse_share = Fraction(3, 4)
             else:
-                spouse_share = 1.0
+                spouse_share = Fraction(1)
             
-            others_share = 1.0 - spouse_share
+            others_share = 1 - spouse_share
             
             heirs.append(Heir(
                 id="spouse",
                 name="配偶者",
                 heir_type=HeirType.SPOUSE,
                 relationship=RelationshipType.SPOUSE,
-                inheritance_share=spouse_share,
-                two_fold_addition=False
+                two_fold_addition=False,
+                **self._share_fields(spouse_share)
             ))
 
         # 第1順位: 子供（直系卑属）
         if has_children:
             total_children = family_structure.children_count
-            individual_share = others_share / total_children if total_children > 0 else 0
+            individual_share = others_share / total_children
             
             adopted_indices = list(range(family_structure.adopted_children_count))
             grandchild_adopted_indices = list(range(family_structure.grandchild_adopted_count))
@@ -73,9 +81,9 @@ class InheritanceTaxCalculator:
                     name=name,
                     heir_type=HeirType.CHILD,
                     relationship=relationship,
-                    inheritance_share=individual_share,
                     two_fold_addition=is_grandchild_adopted,
-                    is_adopted=is_adopted
+                    is_adopted=is_adopted,
+                    **self._share_fields(individual_share)
                 ))
         
         # 第2順位: 直系尊属（子供がいない場合）
@@ -88,14 +96,14 @@ class InheritanceTaxCalculator:
                     name=f"親{i+1}",
                     heir_type=HeirType.PARENT,
                     relationship=RelationshipType.PARENT,
-                    inheritance_share=individual_share,
-                    two_fold_addition=False #親は２割加算の対象外
+                    two_fold_addition=False, #親は２割加算の対象外
+                    **self._share_fields(individual_share)
                 ))
         
         # 第3順位: 兄弟姉妹（子供も直系尊属もいない場合）
         elif has_siblings:
-            total_units = family_structure.siblings_count + family_structure.half_siblings_count / 2
-            full_sibling_share = others_share / total_units if total_units > 0 else 0
+            total_units = family_structure.siblings_count + Fraction(family_structure.half_siblings_count, 2)
+            full_sibling_share = others_share / total_units
             half_sibling_share = full_sibling_share / 2
             
             for i in range(family_structure.siblings_count):
@@ -104,8 +112,8 @@ class InheritanceTaxCalculator:
                     name=f"兄弟姉妹{i+1}",
                     heir_type=HeirType.SIBLING,
                     relationship=RelationshipType.SIBLING,
-                    inheritance_share=full_sibling_share,
-                    two_fold_addition=True
+                    two_fold_addition=True,
+                    **self._share_fields(full_sibling_share)
                 ))
             
             for i in range(family_structure.half_siblings_count):
@@ -114,8 +122,8 @@ class InheritanceTaxCalculator:
                     name=f"半血兄弟姉妹{i+1}",
                     heir_type=HeirType.SIBLING,
                     relationship=RelationshipType.HALF_SIBLING,
-                    inheritance_share=half_sibling_share,
-                    two_fold_addition=True
+                    two_fold_addition=True,
+                    **self._share_fields(half_sibling_share)
                 ))
 
         # 法定相続人以外の人を追加（実際の分割計算で使用するため）
@@ -126,20 +134,38 @@ class InheritanceTaxCalculator:
                 name=f"法定相続人以外{i+1}",
                 heir_type=HeirType.OTHER,
                 relationship=RelationshipType.OTHER,
-                inheritance_share=0.0,
-                two_fold_addition=True
+                two_fold_addition=True,
+                **self._share_fields(Fraction(0))
             ))
         
         return heirs
+
+    @staticmethod
+    def _share_fields(share: Fraction) -> Dict:
+        """法定相続分（有理数）を Heir の引数に変換"""
+        return {
+            'inheritance_share': float(share),
+            'share_numerator': share.numerator,
+            'share_denominator': share.denominator,
+        }
+
+    def determine_legal_heirs_table(self, family_structures: Sequence[FamilyStructure]) -> "HeirTable":
+        """多数の家族構成の法定相続人をまとめて判定する（列指向のテーブル）"""
+        from models.heir_table import HeirTable
+        return HeirTable.from_family_structures(family_structures)
     
-    def calculate_basic_deduction(self, heirs: List[Heir]) -> int:
-        """基礎控除額を計算する"""
+    def calculate_basic_deduction(self, heirs: Union[List[Heir], "HeirTable"],
+                                  inheritance_date: Optional[date] = None):
+        """基礎控除額を計算する（HeirTable を渡した場合は案件ごとの配列）"""
         # 養子の制限を適用した法定相続人数を計算
         legal_heirs_count = self._count_legal_heirs_for_deduction(heirs)
-        return BASIC_DEDUCTION_BASE + (BASIC_DEDUCTION_PER_HEIR * legal_heirs_count)
+        return schedule_for(inheritance_date).basic_deduction(legal_heirs_count)
     
-    def _count_legal_heirs_for_deduction(self, heirs: List[Heir]) -> int:
-        """基礎控除計算用の法定相続人数を計算（養子の制限を適用）"""
+    def _count_legal_heirs_for_deduction(self, heirs: Union[List[Heir], "HeirTable"]):
+        """基礎控除計算用の法定相続人数を計算（養子の制限を適用。HeirTable を渡した場合は案件ごとの配列）"""
+        if not isinstance(heirs, (list, tuple)):
+            return heirs.deduction_heirs_counts()
+
         count = 0
         adopted_count = 0
         has_biological_children = False
@@ -166,10 +192,14 @@ class InheritanceTaxCalculator:
         
         return count
     
-    def calculate_tax_by_legal_share(self, taxable_amount: int, heirs: List[Heir]) -> TaxCalculationResult:
+    @timed('tax')
+    def calculate_tax_by_legal_share(self, taxable_amount: int, heirs: List[Heir],
+                                     inheritance_date: Optional[date] = None) -> TaxCalculationResult:
         """法定相続分による相続税計算"""
+        schedule = schedule_for(inheritance_date)
+
         # 基礎控除額の計算
-        basic_deduction = self.calculate_basic_deduction(heirs)
+        basic_deduction = schedule.basic_deduction(self._count_legal_heirs_for_deduction(heirs))
         
         # 課税遺産総額の計算
         taxable_estate = max(0, taxable_amount - basic_deduction)
@@ -178,11 +208,11 @@ class InheritanceTaxCalculator:
             # 相続税がかからない場合
             heir_details = []
             for heir in heirs:
-                heir_details.append(HeirTaxDetail(
+                heir_details.append(LegalShareTaxDetail(
                     heir_id=heir.id,
                     name=heir.name,
                     relationship=heir.relationship.value,
-                    legal_share_amount=int(taxable_amount * heir.inheritance_share),
+                    legal_share_amount=taxable_amount * heir.share_numerator // heir.share_denominator,
                     tax_before_addition=0,
                     two_fold_addition=0,
                     tax_after_addition=0
@@ -202,18 +232,18 @@ class InheritanceTaxCalculator:
         total_tax = 0
         
         for heir in heirs:
-            # 法定相続分に応じた課税遺産額
-            heir_taxable_amount = int(taxable_estate * heir.inheritance_share)
+            # 法定相続分に応じた課税遺産額（整数演算で1円未満切り捨て）
+            heir_taxable_amount = taxable_estate * heir.share_numerator // heir.share_denominator
             
             # 相続税額の計算（2割加算前）
-            tax_before_addition = self._calculate_tax_from_table(heir_taxable_amount)
+            tax_before_addition = self._calculate_tax_from_table(heir_taxable_amount, schedule)
             total_tax += tax_before_addition
             
-            heir_details.append(HeirTaxDetail(
+            heir_details.append(LegalShareTaxDetail(
                 heir_id=heir.id,
                 name=heir.name,
                 relationship=heir.relationship.value,
-                legal_share_amount=int(taxable_amount * heir.inheritance_share),
+                legal_share_amount=taxable_amount * heir.share_numerator // heir.share_denominator,
                 tax_before_addition=tax_before_addition,
                 two_fold_addition=0, # この段階では計算しない
                 tax_after_addition=tax_before_addition # 加算がないので同額
@@ -228,11 +258,12 @@ class InheritanceTaxCalculator:
             heir_tax_details=heir_details
         )
     
+    @timed('tax')
     def calculate_actual_division(self, division_input: DivisionInput) -> DivisionResult:
         """実際の分割による相続税計算"""
         heirs = division_input.heirs
-        total_tax_by_legal_share = division_input.total_tax_amount
-        total_taxable_amount = division_input.total_amount
+        total_tax_by_legal_share = int(division_input.total_tax_amount)
+        total_taxable_amount = int(division_input.total_amount)
 
         # 実際の取得金額を取得
         if division_input.mode == 'amount':
@@ -244,38 +275,40 @@ class InheritanceTaxCalculator:
                 division_input.rounding_method
             )
 
-        total_actual_amount = sum(actual_amounts.values())
+        total_actual_amount = int(sum(actual_amounts.values()))
         if total_actual_amount == 0: # ゼロ除算を回避
             total_actual_amount = 1
 
+        # 按分・軽減額はすべて整数演算で求め、最後に1円未満を切り捨てる
         heir_details = []
         calculated_final_tax_total = 0
 
         for heir in heirs:
             actual_amount = actual_amounts.get(heir.id, 0)
-            actual_share = actual_amount / total_actual_amount if total_actual_amount > 0 else 0
             
-            proportional_tax = int(total_tax_by_legal_share * actual_share)
+            proportional_tax = total_tax_by_legal_share * int(actual_amount) // total_actual_amount
             
             adjustment_amount = 0
             
             # 2割加算
             if heir.two_fold_addition:
-                surcharge = int(proportional_tax * 0.2)
+                surcharge = proportional_tax // 5
                 adjustment_amount += surcharge
 
             # 配偶者税額軽減
             if heir.heir_type == HeirType.SPOUSE:
-                spouse_statutory_share = self._calculate_spouse_legal_share(heirs)
-                reduction_asset_limit = max(160_000_000, total_taxable_amount * spouse_statutory_share)
-                reduction_base_amount = min(actual_amount, reduction_asset_limit)
+                numerator, denominator = self._calculate_spouse_legal_share(heirs)
+                # 1円の 1/denominator を単位として比較する
+                reduction_asset_limit = max(160_000_000 * denominator, total_taxable_amount * numerator)
+                reduction_base_amount = min(int(actual_amount) * denominator, reduction_asset_limit)
                 
                 # total_taxable_amount is the base for the overall calculation, not total_actual_amount
                 # It can be different if there are bequests to non-heirs that are not part of the taxable estate. 
                 # For this app, we assume they are the same.
                 base_for_reduction_calc = total_taxable_amount if total_taxable_amount > 0 else 1
 
-                max_reduction = int(total_tax_by_legal_share * (reduction_base_amount / base_for_reduction_calc))
+                max_reduction = (total_tax_by_legal_share * reduction_base_amount
+                                 // (base_for_reduction_calc * denominator))
                 
                 deduction = min(proportional_tax, max_reduction)
                 adjustment_amount -= deduction
@@ -283,10 +316,9 @@ class InheritanceTaxCalculator:
             final_tax = max(0, proportional_tax + adjustment_amount)
             calculated_final_tax_total += final_tax
 
-            heir_details.append(HeirTaxDetail(
+            heir_details.append(DivisionTaxDetail(
                 heir_id=heir.id,
                 heir_name=heir.name,
-                name=heir.name, # legacy
                 relationship=heir.relationship.value,
                 inheritance_amount=actual_amount,
                 tax_amount=proportional_tax, # 配分税額
@@ -294,10 +326,11 @@ class InheritanceTaxCalculator:
                 final_tax_amount=final_tax # 最終納税額
             ))
 
+        basic_deduction = self.calculate_basic_deduction(heirs, division_input.inheritance_date)
         return DivisionResult(
             taxable_amount=total_taxable_amount,
-            basic_deduction=self.calculate_basic_deduction(heirs),
-            taxable_estate=max(0, total_taxable_amount - self.calculate_basic_deduction(heirs)),
+            basic_deduction=basic_deduction,
+            taxable_estate=max(0, total_taxable_amount - basic_deduction),
             total_tax_amount=calculated_final_tax_total,
             heir_details=heir_details
         )
@@ -315,21 +348,18 @@ class InheritanceTaxCalculator:
                 amounts[heir_id] = int(math.ceil(amount))
         return amounts
         
-    def _calculate_spouse_legal_share(self, heirs: List[Heir]) -> float:
-        """配偶者の法定相続分を取得"""
+    def _calculate_spouse_legal_share(self, heirs: List[Heir]) -> Tuple[int, int]:
+        """配偶者の法定相続分を取得（分子, 分母）"""
         for heir in heirs:
             if heir.heir_type == HeirType.SPOUSE:
-                return heir.inheritance_share
-        return 0.0
+                return heir.share_numerator, heir.share_denominator
+        return 0, 1
 
-    def _calculate_tax_from_table(self, amount: int) -> int:
+    def _calculate_tax_from_table(self, amount: int, schedule: Optional[TaxSchedule] = None) -> int:
         """税額速算表から税額を計算"""
-        for row in TAX_TABLE:
-            if amount <= row["max_amount"]:
-                tax = (amount * row["tax_rate"]) - row["deduction"]
-                return int(tax)
-        return 0
+        return (schedule or schedule_for()).tax_for(amount)
 
+    @timed('validate')
     def validate_division_input(self, division_input: DivisionInput, heirs: List[Heir]) -> ValidationResult:
         """分割入力データのバリデーション"""
         errors: List[ValidationError] = []
@@ -359,6 +389,7 @@ class InheritanceTaxCalculator:
 
         return ValidationResult(is_valid=len(errors) == 0, errors=errors)
 
+    @timed('validate')
     def validate_family_structure(self, family_structure: FamilyStructure) -> ValidationResult:
         """家族構成入力のバリデーション"""
         errors: List[ValidationError] = []
@@ -0,0 +1,121 @@
+"""
+家族構成ごとの相続税総額の区分線形曲線
+
+法定相続人が決まれば、法定相続分による相続税の総額は課税価格の区分線形関数になる。
+その折れ点は「基礎控除額 + 速算表の区分上限 ÷ 各相続人の法定相続分」であり、
+これを事前に求めておけば任意の課税価格に対する税額を二分探索で求められる。
+
+各区間内では calculate_tax_by_legal_share と同じ整数演算による切り捨てを行うため、結果は完全に一致する。
+"""
+import math
+from bisect import bisect_right
+from dataclasses import dataclass
+from fractions import Fraction
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from models.inheritance import Heir
+from models.tax_schedule import TaxSchedule, schedule_for
+
+
+@dataclass(frozen=True)
+class TaxCurveSegment:
+    """税額曲線の1区間（start_amount 以上、次の区間の開始額未満）"""
+    start_amount: int  # 区間の開始額（課税価格の合計額）
+    tax_at_start: int  # 開始額での相続税の総額
+    marginal_rate: float  # 課税価格1円あたりの税額の増分（切り捨て前）
+
+
+class TaxCurve:
+    """法定相続分による相続税総額の区分線形曲線"""
+
+    def __init__(self, heirs: Sequence[Heir], basic_deduction: int, schedule: Optional[TaxSchedule] = None):
+        self.schedule = schedule or schedule_for()
+        self.basic_deduction = basic_deduction
+
+        # 同じ法定相続分の相続人はまとめて計算する（法定相続分0の人は税額に影響しない）
+        counts: Dict[Fraction, int] = {}
+        for heir in heirs:
+            if heir.share_numerator > 0:
+                counts[heir.legal_share] = counts.get(heir.legal_share, 0) + 1
+        self.shares: Tuple[Fraction, ...] = tuple(counts)
+        self.counts: Tuple[int, ...] = tuple(counts.values())
+
+        # 課税遺産総額ベースの折れ点（各相続人の取得金額が区分上限を超える最小額）
+        estate_breaks = {0}
+        for share in self.shares:
+            for upper_bound in self.schedule.upper_bounds:
+                estate_breaks.add(self._first_estate_exceeding(upper_bound, share))
+        self.estate_breakpoints: Tuple[int, ...] = tuple(sorted(estate_breaks))
+
+        # 区間ごと・相続分ごとの税率と控除額
+        self._rates: List[Tuple[int, ...]] = []
+        self._deductions: List[Tuple[int, ...]] = []
+        for estate in self.estate_breakpoints:
+            brackets = [self.schedule.bracket_index(self._share_of(estate, share)) for share in self.shares]
+            self._rates.append(tuple(self.schedule.rate_percents[b] for b in brackets))
+            self._deductions.append(tuple(self.schedule.deductions[b] for b in brackets))
+
+    @staticmethod
+    def _share_of(estate: int, share: Fraction) -> int:
+        """法定相続分に応じた取得金額（1円未満切り捨て）"""
+        return estate * share.numerator // share.denominator
+
+    @staticmethod
+    def _first_estate_exceeding(upper_bound: int, share: Fraction) -> int:
+        """estate * share の切り捨てが upper_bound を超える最小の課税遺産総額"""
+        return math.ceil((upper_bound + 1) / share)
+
+    def _tax_for_estate(self, estate: int, segment: int) -> int:
+        rates = self._rates[segment]
+        deductions = self._deductions[segment]
+        total = 0
+        for share, count, rate, deduction in zip(self.shares, self.counts, rates, deductions):
+            total += count * (self._share_of(estate, share) * rate // 100 - deduction)
+        return total
+
+    def total_tax(self, taxable_amount: int) -> int:
+        """課税価格の合計額に対する相続税の総額（O(log k)）"""
+        estate = taxable_amount - self.basic_deduction
+        if estate <= 0:
+            return 0
+        segment = bisect_right(self.estate_breakpoints, estate) - 1
+        return self._tax_for_estate(estate, segment)
+
+    def total_tax_many(self, taxable_amounts):
+        """課税価格の配列に対する相続税の総額（total_tax のベクトル版）
+
+        NumPy は一括計算・シミュレーションでのみ使うため、ここで読み込む。
+        """
+        import numpy as np
+        from services.integer_math import mul_div_floor
+
+        estates = np.maximum(0, np.asarray(taxable_amounts, dtype=np.int64) - self.basic_deduction)
+        segments = np.searchsorted(np.array(self.estate_breakpoints, dtype=np.int64), estates, side="right") - 1
+        rates = np.array(self._rates, dtype=np.int64).reshape(len(self.estate_breakpoints), len(self.shares))
+        deductions = np.array(self._deductions, dtype=np.int64).reshape(rates.shape)
+
+        total = np.zeros(estates.shape, dtype=np.int64)
+        for j, (share, count) in enumerate(zip(self.shares, self.counts)):
+            heir_taxable = mul_div_floor(estates, share.numerator, share.denominator)
+            total += count * (heir_taxable * rates[segments, j] // 100 - deductions[segments, j])
+        return total
+
+    @property
+    def breakpoints(self) -> List[int]:
+        """折れ点（課税価格の合計額ベース）。先頭は基礎控除額"""
+        return [self.basic_deduction + estate for estate in self.estate_breakpoints]
+
+    def segments(self) -> List[TaxCurveSegment]:
+        """グラフ描画用の区間一覧"""
+        result = []
+        for i, estate in enumerate(self.estate_breakpoints):
+            marginal_rate = sum(
+                count * float(share) * rate / 100
+                for share, count, rate in zip(self.shares, self.counts, self._rates[i])
+            )
+            result.append(TaxCurveSegment(
+                start_amount=self.basic_deduction + estate,
+                tax_at_start=self._tax_for_estate(estate, i),
+                marginal_rate=marginal_rate,
+            ))
+        return result
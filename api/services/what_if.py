@@ -0,0 +1,217 @@
+"""
+基本ケースに対する what-if 分析
+
+「養子がもう1人いたら」「財産が1割多かったら」「配偶者が60%取得したら」のような、
+基本ケースを少しずつ変えた多数の変化形の税額をまとめて求める。
+法定相続人・基礎控除額・税額曲線は家族構成ごとに1回だけ求めて変化形の間で共有し、
+相続税の総額は税額曲線から O(log k) で求めるため、変化形ごとに
+determine_legal_heirs・calculate_tax_by_legal_share をやり直さない。
+"""
+from dataclasses import dataclass, field, fields, replace
+from datetime import date
+from fractions import Fraction
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from models.inheritance import (
+    DivisionInput, DivisionResult, FamilyStructure, Heir, HeirType, ValidationError
+)
+from services.heir_cache import HeirCache
+from services.tax_calculator import InheritanceTaxCalculator
+from services.tax_curve import TaxCurve
+
+# 家族構成の人数のフィールド（増減を指定できるもの）
+FAMILY_COUNT_FIELDS = tuple(f.name for f in fields(FamilyStructure) if f.name != 'spouse_exists')
+
+
+@dataclass(frozen=True)
+class Perturbation:
+    """基本ケースに対する変更（省略した項目は基本ケースのまま）"""
+    label: Optional[str] = None
+    family_structure_delta: Optional[Dict] = None  # 人数の増減（{'adopted_children_count': 1} など）と spouse_exists
+    taxable_amount: Optional[int] = None  # 課税価格の合計額（置き換え）
+    taxable_amount_change_rate: Optional[float] = None  # 課税価格の増減率（0.1 で1割増）
+    spouse_percentage: Optional[float] = None  # 配偶者の取得割合（%）。残りは他の相続人で按分
+    division: Optional[Dict] = None  # 分割の指定（置き換え。mode・amounts・percentages・rounding_method）
+
+
+@dataclass
+class WhatIfOutcome:
+    """1つのケース（基本ケースまたは変化形）の計算結果"""
+    label: Optional[str]
+    family_structure: FamilyStructure
+    taxable_amount: int
+    errors: List[ValidationError] = field(default_factory=list)
+    heirs: Tuple[Heir, ...] = ()
+    basic_deduction: int = 0
+    total_tax_amount: int = 0  # 法定相続分による相続税の総額
+    division_result: Optional[DivisionResult] = None
+
+    @property
+    def is_valid(self) -> bool:
+        return not self.errors
+
+    @property
+    def taxable_estate(self) -> int:
+        return max(0, self.taxable_amount - self.basic_deduction)
+
+
+def _allocate(total: int, heirs: Sequence[Heir], weights: Dict[str, Fraction]) -> Dict[str, int]:
+    """total を重みの比で各相続人に配分（1円未満切り捨て、端数は重みのある先頭の相続人へ）"""
+    weight_sum = sum(weights.values())
+    amounts = {heir.id: int(total * weights.get(heir.id, 0) // weight_sum) for heir in heirs}
+    first = next(heir.id for heir in heirs if weights.get(heir.id, 0) > 0)
+    amounts[first] += total - sum(amounts.values())
+    return amounts
+
+
+class WhatIfAnalyzer:
+    """what-if 分析サービス"""
+
+    def __init__(self, heir_cache: HeirCache = None, calculator: InheritanceTaxCalculator = None):
+        self.heir_cache = heir_cache or HeirCache()
+        self.calculator = calculator or self.heir_cache.calculator
+
+    def analyze(
+        self,
+        family_structure: FamilyStructure,
+        taxable_amount: int,
+        perturbations: Sequence[Perturbation],
+        division: Optional[Dict] = None,
+        inheritance_date: Optional[date] = None,
+    ) -> Tuple[WhatIfOutcome, List[WhatIfOutcome]]:
+        """基本ケースと各変化形の結果を返す
+
+        変化形の入力の誤り（人数が負になる、分割の指定が相続人と合わないなど）は
+        その変化形の errors として返し、他の変化形の計算は続ける。
+        分割の指定を省略した変化形は基本ケースの分割を使い、課税価格が変わる場合は
+        金額指定の分割を同じ比で按分し直す。
+        """
+        curves: Dict[FamilyStructure, Tuple[Tuple[Heir, ...], TaxCurve]] = {}
+
+        def heirs_and_curve(family: FamilyStructure) -> Tuple[Tuple[Heir, ...], TaxCurve]:
+            entry = curves.get(family)
+            if entry is None:
+                entry = curves[family] = (self.heir_cache.get(family).heirs,
+                                          self.heir_cache.get_tax_curve(family, inheritance_date))
+            return entry
+
+        def evaluate(label, family, amount, division_spec) -> WhatIfOutcome:
+            outcome = WhatIfOutcome(label=label, family_structure=family, taxable_amount=amount)
+            heirs, tax_curve = heirs_and_curve(family)
+            outcome.heirs = heirs
+            outcome.basic_deduction = tax_curve.basic_deduction
+            outcome.total_tax_amount = tax_curve.total_tax(amount)
+            if division_spec is None:
+                return outcome
+
+            division_input = DivisionInput(
+                total_amount=amount, heirs=list(heirs), total_tax_amount=outcome.total_tax_amount,
+                inheritance_date=inheritance_date, **division_spec
+            )
+            validation_result = self.calculator.validate_division_input(division_input, heirs)
+            if not validation_result.is_valid:
+                outcome.errors = validation_result.errors
+                return outcome
+            outcome.division_result = self.calculator.calculate_actual_division(division_input)
+            return outcome
+
+        base = evaluate(None, family_structure, taxable_amount, division)
+        variants = []
+        for perturbation in perturbations:
+            errors: List[ValidationError] = []
+            family = self._perturbed_family(family_structure, perturbation.family_structure_delta, errors)
+            amount = self._perturbed_amount(taxable_amount, perturbation, errors)
+            if errors:
+                variants.append(WhatIfOutcome(perturbation.label, family or family_structure,
+                                              amount or taxable_amount, errors))
+                continue
+
+            division_spec = perturbation.division
+            if division_spec is None:
+                heirs, _ = heirs_and_curve(family)
+                if perturbation.spouse_percentage is not None:
+                    division_spec = self._spouse_division(heirs, amount, perturbation.spouse_percentage,
+                                                          division, errors)
+                else:
+                    division_spec = self._rescaled_division(division, taxable_amount, amount, heirs)
+            if errors:
+                variants.append(WhatIfOutcome(perturbation.label, family, amount, errors))
+                continue
+            variants.append(evaluate(perturbation.label, family, amount, division_spec))
+        return base, variants
+
+    def _perturbed_family(self, family_structure: FamilyStructure, delta: Optional[Dict],
+                          errors: List[ValidationError]) -> Optional[FamilyStructure]:
+        if not delta:
+            return family_structure
+        changes = {}
+        if delta.get('spouse_exists') is not None:
+            changes['spouse_exists'] = delta['spouse_exists']
+        for name in FAMILY_COUNT_FIELDS:
+            if delta.get(name):
+                changes[name] = getattr(family_structure, name) + delta[name]
+        family = replace(family_structure, **changes)
+        validation_result = self.calculator.validate_family_structure(family)
+        if not validation_result.is_valid:
+            errors.extend(validation_result.errors)
+            return None
+        return family
+
+    @staticmethod
+    def _perturbed_amount(taxable_amount: int, perturbation: Perturbation,
+                          errors: List[ValidationError]) -> Optional[int]:
+        amount = taxable_amount
+        if perturbation.taxable_amount is not None:
+            amount = perturbation.taxable_amount
+        if perturbation.taxable_amount_change_rate is not None:
+            amount = int(round(amount * (1 + perturbation.taxable_amount_change_rate)))
+        if amount <= 0:
+            errors.append(ValidationError("taxable_amount", "INVALID_VALUE",
+                                          "課税価格の合計額は正の値である必要があります"))
+            return None
+        return amount
+
+    @staticmethod
+    def _division_weights(division: Optional[Dict]) -> Dict[str, Fraction]:
+        """基本ケースの分割の各相続人の比（分割の指定がなければ空）"""
+        if division is None:
+            return {}
+        if division['mode'] == 'amount':
+            return {heir_id: Fraction(amount) for heir_id, amount in (division['amounts'] or {}).items()}
+        return {heir_id: Fraction(percentage) for heir_id, percentage in (division['percentages'] or {}).items()}
+
+    def _rescaled_division(self, division: Optional[Dict], base_amount: int, amount: int,
+                           heirs: Sequence[Heir]) -> Optional[Dict]:
+        """基本ケースの分割を課税価格 amount に合わせる（割合指定はそのまま、金額指定は同じ比で按分）"""
+        if division is None or division['mode'] != 'amount' or amount == base_amount:
+            return division
+        weights = self._division_weights(division)
+        if not all(heir.id in weights for heir in heirs) or not any(weights[heir.id] > 0 for heir in heirs):
+            return division  # 相続人と合わない分割はそのまま検証してエラーにする
+        return dict(division, amounts=_allocate(amount, heirs, weights))
+
+    def _spouse_division(self, heirs: Sequence[Heir], amount: int, spouse_percentage: float,
+                         division: Optional[Dict], errors: List[ValidationError]) -> Optional[Dict]:
+        """配偶者の取得割合を spouse_percentage とし、残りを他の相続人で按分した分割
+
+        他の相続人の比は基本ケースの分割（全員分あれば）、なければ法定相続分を使う。
+        """
+        spouse = next((heir for heir in heirs if heir.heir_type == HeirType.SPOUSE), None)
+        others = [heir for heir in heirs if heir is not spouse]
+        if spouse is None or not others:
+            errors.append(ValidationError("spouse_percentage", "INVALID_VALUE",
+                                          "配偶者と配偶者以外の相続人がいる場合のみ指定できます"))
+            return None
+
+        spouse_amount = int(round(amount * spouse_percentage / 100))
+        weights = self._division_weights(division)
+        if not all(heir.id in weights for heir in others) or not any(weights[heir.id] > 0 for heir in others):
+            weights = {heir.id: heir.legal_share for heir in others}
+        weights = {heir.id: weights[heir.id] for heir in others}
+        if not any(weight > 0 for weight in weights.values()):
+            weights = {heir.id: Fraction(1) for heir in others}
+
+        amounts = _allocate(amount - spouse_amount, others, weights)
+        amounts[spouse.id] = spouse_amount
+        return {'mode': 'amount', 'amounts': amounts, 'percentages': None,
+                'rounding_method': (division or {}).get('rounding_method', 'round')}
@@ -0,0 +1,171 @@
+"""
+同時接続数のベンチマーク（WSGI の app.run と ASGI のサーバーの比較）
+
+本文の送信が遅いモバイル回線のクライアントを多数同時に接続させ、
+サーバー1プロセスあたりの完了件数・失敗件数・応答時間・スレッド数・メモリ使用量を計測して、
+結果をJSONに書き出す。
+
+    pip install uvicorn
+    python benchmarks/concurrency.py --connections 500 --slow 1.0 --output concurrency.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+API_DIR = os.path.join(ROOT, 'api')
+
+PAYLOAD = json.dumps({
+    "taxable_amount": 300_000_000,
+    "family_structure": {"spouse_exists": True, "children_count": 3, "adopted_children_count": 1}
+}).encode('utf-8')
+
+SERVERS = {
+    # 現在の起動方法（main.py の app.run と同じスレッド方式の開発サーバー）
+    'wsgi': "from main import app; app.run(host='127.0.0.1', port={port}, threaded=True)",
+    'asgi': "import uvicorn; uvicorn.run('asgi:app', host='127.0.0.1', port={port}, log_level='warning')",
+}
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(kind: str, port: int) -> subprocess.Popen:
+    process = subprocess.Popen(
+        [sys.executable, '-c', SERVERS[kind].format(port=port)], cwd=API_DIR,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(f'http://127.0.0.1:{port}/api/health', timeout=1).read()
+            return process
+        except OSError:
+            if process.poll() is not None:
+                raise RuntimeError(f"{kind} サーバーが起動できません")
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError(f"{kind} サーバーが起動しません")
+
+
+class ProcessSampler(threading.Thread):
+    """サーバープロセスのスレッド数とメモリ使用量の最大値を記録する（Linux の /proc を使用）"""
+
+    def __init__(self, pid: int):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.max_threads = 0
+        self.max_rss_kb = 0
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(0.05):
+            try:
+                with open(f'/proc/{self.pid}/status') as f:
+                    status = dict(line.split(':', 1) for line in f if ':' in line)
+            except OSError:
+                return
+            self.max_threads = max(self.max_threads, int(status['Threads']))
+            self.max_rss_kb = max(self.max_rss_kb, int(status['VmRSS'].split()[0]))
+
+
+async def slow_request(port: int, slow: float, timeout: float) -> Dict:
+    """ヘッダを送ってから slow 秒後に本文を送る POST /api/calculation/tax-amount"""
+    start = time.perf_counter()
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection('127.0.0.1', port), timeout)
+        writer.write(
+            b'POST /api/calculation/tax-amount HTTP/1.1\r\n'
+            b'Host: 127.0.0.1\r\nContent-Type: application/json\r\nConnection: close\r\n'
+            + f'Content-Length: {len(PAYLOAD)}\r\n\r\n'.encode('ascii')
+        )
+        await writer.drain()
+        await asyncio.sleep(slow)
+        writer.write(PAYLOAD)
+        await writer.drain()
+        response = await asyncio.wait_for(reader.read(), timeout)
+        writer.close()
+        status = int(response.split(b' ', 2)[1]) if response else 0
+    except (OSError, asyncio.TimeoutError, IndexError, ValueError):
+        status = 0
+    return {'status': status, 'latency': time.perf_counter() - start}
+
+
+async def run_clients(port: int, connections: int, slow: float, timeout: float) -> List[Dict]:
+    return await asyncio.gather(*(slow_request(port, slow, timeout) for _ in range(connections)))
+
+
+def run(kind: str, connections: int, slow: float, timeout: float) -> Dict:
+    port = free_port()
+    process = start_server(kind, port)
+    sampler = ProcessSampler(process.pid)
+    sampler.start()
+    try:
+        start = time.perf_counter()
+        results = asyncio.run(run_clients(port, connections, slow, timeout))
+        elapsed = time.perf_counter() - start
+    finally:
+        sampler.stopped.set()
+        process.terminate()
+        process.wait()
+
+    latencies = sorted(r['latency'] for r in results if r['status'] == 200)
+    succeeded = len(latencies)
+    return {
+        "server": kind,
+        "connections": connections,
+        "slow_seconds": slow,
+        "succeeded": succeeded,
+        "failed": connections - succeeded,
+        "elapsed_s": round(elapsed, 3),
+        "requests_per_s": round(succeeded / elapsed, 1),
+        "latency_median_s": round(statistics.median(latencies), 3) if latencies else None,
+        "latency_p99_s": round(latencies[int(0.99 * (succeeded - 1))], 3) if latencies else None,
+        "max_threads": sampler.max_threads,
+        "max_rss_mb": round(sampler.max_rss_kb / 1024, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="同時接続数のベンチマーク（WSGI と ASGI の比較）")
+    parser.add_argument('--server', choices=['wsgi', 'asgi', 'both'], default='both')
+    parser.add_argument('--connections', type=int, default=500, help='同時接続数')
+    parser.add_argument('--slow', type=float, default=1.0, help='ヘッダ送信から本文送信までの待ち時間（秒）')
+    parser.add_argument('--timeout', type=float, default=30.0, help='1リクエストのタイムアウト（秒）')
+    parser.add_argument('--output', help='結果を書き出すJSONファイル')
+    args = parser.parse_args()
+
+    results = []
+    for kind in (['wsgi', 'asgi'] if args.server == 'both' else [args.server]):
+        result = run(kind, args.connections, args.slow, args.timeout)
+        results.append(result)
+        print(f"{kind:<5} 成功 {result['succeeded']:>5} 失敗 {result['failed']:>5} "
+              f"{result['requests_per_s']:>8.1f} req/s  中央値 {result['latency_median_s']}s "
+              f"p99 {result['latency_p99_s']}s  スレッド {result['max_threads']:>4}  RSS {result['max_rss_mb']}MB")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({
+                "created_at": datetime.now(timezone.utc).isoformat(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "results": results,
+            }, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
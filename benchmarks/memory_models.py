@@ -0,0 +1,122 @@
+"""
+モデルのメモリ使用量ベンチマーク
+
+一括計算で大量に生成される Heir と税額詳細について、
+以前の __dict__ を持つ dataclass（HeirTaxDetail は法定相続分・実際の分割で共用）と、
+現在の slots 付き・不変の dataclass のメモリ使用量を tracemalloc で比較する。
+
+    python benchmarks/memory_models.py --count 100000
+"""
+import argparse
+import json
+import os
+import sys
+import tracemalloc
+from dataclasses import dataclass
+from typing import Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'api'))
+
+from models.inheritance import (  # noqa: E402
+    DivisionTaxDetail, Heir, HeirType, LegalShareTaxDetail, RelationshipType
+)
+
+
+@dataclass(frozen=True)
+class LegacyHeir:
+    """以前の Heir（__dict__ あり）"""
+    id: str
+    name: str
+    heir_type: HeirType
+    relationship: RelationshipType
+    inheritance_share: float
+    two_fold_addition: bool = False
+    is_adopted: bool = False
+
+
+@dataclass
+class LegacyHeirTaxDetail:
+    """以前の HeirTaxDetail（法定相続分・実際の分割で共用、__dict__ あり）"""
+    heir_id: str
+    name: str
+    relationship: str
+    legal_share_amount: Optional[int] = None
+    tax_before_addition: Optional[int] = None
+    two_fold_addition: Optional[int] = None
+    tax_after_addition: Optional[int] = None
+    heir_name: Optional[str] = None
+    inheritance_amount: Optional[int] = None
+    tax_amount: Optional[int] = None
+    surcharge_deduction_amount: Optional[int] = None
+    final_tax_amount: Optional[int] = None
+
+
+def _heir_fields(i, legacy):
+    return dict(id=f"child_{i}", name=f"子供{i}", heir_type=HeirType.CHILD,
+                relationship=RelationshipType.CHILD, inheritance_share=0.25)
+
+
+def _legal_share_detail_fields(i, legacy):
+    return dict(heir_id=f"child_{i}", name=f"子供{i}", relationship="子供", legal_share_amount=i * 1000,
+                tax_before_addition=i * 100, two_fold_addition=0, tax_after_addition=i * 100)
+
+
+def _division_detail_fields(i, legacy):
+    fields = dict(heir_id=f"child_{i}", heir_name=f"子供{i}", relationship="子供", inheritance_amount=i * 1000,
+                  tax_amount=i * 100, surcharge_deduction_amount=-i, final_tax_amount=i * 99)
+    if legacy:
+        fields['name'] = fields['heir_name']
+    return fields
+
+
+CASES = (
+    ('heir', _heir_fields, LegacyHeir, Heir),
+    ('legal_share_detail', _legal_share_detail_fields, LegacyHeirTaxDetail, LegalShareTaxDetail),
+    ('division_detail', _division_detail_fields, LegacyHeirTaxDetail, DivisionTaxDetail),
+)
+
+
+def measure(fields, cls, count):
+    """count 個のインスタンスを生成したときの確保メモリ（バイト）"""
+    # 文字列・整数は両方式で共通のため、先に生成してインスタンス本体のみを計測する
+    values = [fields(i, cls.__name__.startswith('Legacy')) for i in range(count)]
+    tracemalloc.start()
+    objects = [cls(**kwargs) for kwargs in values]
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del objects
+    return allocated
+
+
+def run(count):
+    results = []
+    for name, fields, legacy_cls, current_cls in CASES:
+        legacy = measure(fields, legacy_cls, count)
+        current = measure(fields, current_cls, count)
+        results.append({
+            'model': name,
+            'count': count,
+            'legacy_bytes': legacy,
+            'current_bytes': current,
+            'reduction': round(1 - current / legacy, 3),
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--count', type=int, default=100_000, help='生成するインスタンス数')
+    parser.add_argument('--output', help='結果を書き出すJSONファイル')
+    args = parser.parse_args()
+
+    results = run(args.count)
+    for r in results:
+        print(f"{r['model']:<20} legacy {r['legacy_bytes'] / 2**20:8.1f} MiB"
+              f"  current {r['current_bytes'] / 2**20:8.1f} MiB  (-{r['reduction']:.0%})")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
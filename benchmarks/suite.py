@@ -0,0 +1,218 @@
+"""
+計算エンジンとAPIのベンチマーク
+
+test_division_scenarios.py のシナリオ（ユーザーストーリーの事例）と、
+兄弟姉妹・法定相続人以外が多い大規模な家族構成を入力として、
+InheritanceTaxCalculator の各メソッド、リクエストの解析・検証（routes.schema）、
+POST エンドポイント（Flask のテストクライアント経由）の処理時間を計測し、結果をJSONに書き出す
+（full は3つのエンドポイントを1回にまとめたもの）。
+
+    python benchmarks/suite.py --output results.json
+    python benchmarks/suite.py --compare results.json   # 前回の結果との比較
+    python benchmarks/suite.py --filter endpoint
+    python benchmarks/suite.py --filter request
+"""
+import argparse
+import ast
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'api'))
+
+from main import create_app  # noqa: E402
+from models.inheritance import DivisionInput, FamilyStructure  # noqa: E402
+from routes.schema import ACTUAL_DIVISION_REQUEST, TAX_AMOUNT_REQUEST  # noqa: E402
+from services.tax_calculator import InheritanceTaxCalculator  # noqa: E402
+
+EMPTY_FAMILY = {
+    "spouse_exists": False, "children_count": 0, "adopted_children_count": 0,
+    "grandchild_adopted_count": 0, "parents_alive": 0, "grandparents_alive": 0,
+    "siblings_count": 0, "half_siblings_count": 0, "non_heirs_count": 0
+}
+
+# 大規模な家族構成（逐次計算の相続人数に比例する部分を見るため）
+SCALED_FAMILIES = [
+    {"name": "Scaled: 兄弟姉妹40人・半血20人", "taxable_amount": 3_000_000_000,
+     "family_structure": {"spouse_exists": True, "siblings_count": 40, "half_siblings_count": 20}},
+    {"name": "Scaled: 子供30人（養子10人）・法定相続人以外50人", "taxable_amount": 5_000_000_000,
+     "family_structure": {"spouse_exists": True, "children_count": 30, "adopted_children_count": 10,
+                          "grandchild_adopted_count": 3, "non_heirs_count": 50}},
+    {"name": "Scaled: 兄弟姉妹200人・法定相続人以外200人", "taxable_amount": 20_000_000_000,
+     "family_structure": {"siblings_count": 150, "half_siblings_count": 50, "non_heirs_count": 200}},
+]
+
+
+def load_scenarios() -> List[Dict]:
+    """test_division_scenarios.py の scenarios を（モジュールを実行せずに）読み込む"""
+    with open(os.path.join(ROOT, 'test_division_scenarios.py'), encoding='utf-8') as f:
+        tree = ast.parse(f.read())
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(getattr(t, 'id', None) == 'scenarios' for t in node.targets):
+            return ast.literal_eval(node.value)
+    raise RuntimeError("test_division_scenarios.py に scenarios が見つかりません")
+
+
+def build_cases(calculator: InheritanceTaxCalculator) -> List[Dict]:
+    """ベンチマークの入力（家族構成・課税価格・分割）"""
+    cases = []
+    for scenario in load_scenarios() + SCALED_FAMILIES:
+        family = dict(EMPTY_FAMILY, **scenario["family_structure"])
+        family_structure = FamilyStructure(**family)
+        heirs = calculator.determine_legal_heirs(family_structure)
+        taxable_amount = scenario["taxable_amount"]
+        if "divisions" in scenario:
+            amounts = {d["id"]: d["amount"] for d in scenario["divisions"]}
+        else:
+            # 均等に分割（端数は先頭の相続人へ）
+            amounts = {heir.id: taxable_amount // len(heirs) for heir in heirs}
+            amounts[heirs[0].id] += taxable_amount - sum(amounts.values())
+        total_tax = calculator.calculate_tax_by_legal_share(taxable_amount, heirs).total_tax_amount
+        cases.append({
+            "name": scenario["name"],
+            "family": family,
+            "family_structure": family_structure,
+            "heirs": heirs,
+            "taxable_amount": taxable_amount,
+            "amounts": amounts,
+            "total_tax": total_tax,
+        })
+    return cases
+
+
+def measure(func: Callable[[], object], min_time: float, repeat: int) -> Dict:
+    """func を繰り返し実行し、1回あたりの時間（マイクロ秒）の統計を返す"""
+    # 1サンプルが min_time 秒程度になるよう、1サンプルあたりの実行回数を決める
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        loops *= 2 if elapsed == 0 else max(2, int(min_time / elapsed) + 1)
+
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        samples.append((time.perf_counter() - start) / loops * 1e6)
+    samples.sort()
+    return {
+        "loops": loops,
+        "repeat": repeat,
+        "min_us": round(samples[0], 3),
+        "median_us": round(statistics.median(samples), 3),
+        "mean_us": round(statistics.fmean(samples), 3),
+        "max_us": round(samples[-1], 3),
+    }
+
+
+def benchmarks(calculator: InheritanceTaxCalculator, client, case: Dict) -> Dict[str, Callable[[], object]]:
+    """1つの入力に対するベンチマーク対象の関数"""
+    heir_payload = [
+        {"id": h.id, "name": h.name, "type": h.heir_type.value, "relationship": h.relationship.value,
+         "inheritance_share": h.inheritance_share, "two_fold_addition": h.two_fold_addition,
+         "is_adopted": h.is_adopted}
+        for h in case["heirs"]
+    ]
+    division_input = DivisionInput(
+        mode='amount', total_amount=case["taxable_amount"], heirs=case["heirs"],
+        total_tax_amount=case["total_tax"], amounts=case["amounts"]
+    )
+
+    tax_amount_payload = {"taxable_amount": case["taxable_amount"], "family_structure": case["family"]}
+    division_payload = {
+        "mode": "amount", "total_amount": case["taxable_amount"], "total_tax_amount": case["total_tax"],
+        "heirs": heir_payload, "amounts": case["amounts"]
+    }
+
+    def post(path, payload):
+        def call():
+            response = client.post(path, json=payload)
+            assert response.status_code == 200, response.get_data(as_text=True)
+        return call
+
+    return {
+        "calculator.determine_legal_heirs": lambda: calculator.determine_legal_heirs(case["family_structure"]),
+        "calculator.calculate_tax_by_legal_share": lambda: calculator.calculate_tax_by_legal_share(
+            case["taxable_amount"], case["heirs"]),
+        "calculator.calculate_actual_division": lambda: calculator.calculate_actual_division(division_input),
+        "request.tax-amount": lambda: TAX_AMOUNT_REQUEST.parse(tax_amount_payload),
+        "request.actual-division": lambda: ACTUAL_DIVISION_REQUEST.parse(division_payload),
+        "endpoint.heirs": post('/api/calculation/heirs', {"family_structure": case["family"]}),
+        "endpoint.tax-amount": post('/api/calculation/tax-amount', tax_amount_payload),
+        "endpoint.actual-division": post('/api/calculation/actual-division', division_payload),
+        "endpoint.full": post('/api/calculation/full', {
+            "taxable_amount": case["taxable_amount"], "family_structure": case["family"],
+            "division": {"mode": "amount", "amounts": case["amounts"]}}),
+    }
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(name_filter: Optional[str], min_time: float, repeat: int) -> Dict:
+    calculator = InheritanceTaxCalculator()
+    client = create_app().test_client()
+    results = []
+    for case in build_cases(calculator):
+        for name, func in benchmarks(calculator, client, case).items():
+            if name_filter and name_filter not in name:
+                continue
+            stats = measure(func, min_time, repeat)
+            results.append(dict(benchmark=name, scenario=case["name"], heirs=len(case["heirs"]), **stats))
+            print(f"{name:<45} {case['name'][:32]:<32} {stats['median_us']:>12.1f} us")
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "git_revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+
+
+def compare(current: Dict, previous_path: str) -> None:
+    """前回の結果との中央値の比較（1未満なら速くなった）"""
+    with open(previous_path, encoding='utf-8') as f:
+        previous = {(r["benchmark"], r["scenario"]): r for r in json.load(f)["results"]}
+    print(f"\n前回 ({previous_path}) との比較（今回 / 前回）")
+    for r in current["results"]:
+        before = previous.get((r["benchmark"], r["scenario"]))
+        if before:
+            print(f"{r['benchmark']:<45} {r['scenario'][:32]:<32} {r['median_us'] / before['median_us']:>6.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="計算エンジンとAPIのベンチマーク")
+    parser.add_argument('--output', help='結果を書き出すJSONファイル')
+    parser.add_argument('--compare', help='比較する前回の結果（JSON）')
+    parser.add_argument('--filter', help='名前にこの文字列を含むベンチマークのみ実行')
+    parser.add_argument('--min-time', type=float, default=0.05, help='1サンプルあたりの最低計測時間（秒）')
+    parser.add_argument('--repeat', type=int, default=5, help='サンプル数')
+    args = parser.parse_args()
+
+    results = run(args.filter, args.min_time, args.repeat)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
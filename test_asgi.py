@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+ASGI エントリポイントのテスト（ASGI サーバーを使わず、receive / send を直接渡して呼び出す）
+"""
+import asyncio
+import json
+import os
+import sys
+import threading
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'api'))
+
+from asgi import AsgiAdapter
+from main import app as flask_app
+
+FAMILY_STRUCTURE = {"spouse_exists": True, "children_count": 2}
+
+
+def call(asgi_app, method, path, body=b'', headers=(), body_chunks=None, query_string=b''):
+    """ASGI アプリケーションを呼び出し、（ステータス, ヘッダ, 本文, 本文の送信回数）を返す"""
+    chunks = body_chunks if body_chunks is not None else [body]
+    messages = [
+        {'type': 'http.request', 'body': chunk, 'more_body': i < len(chunks) - 1}
+        for i, chunk in enumerate(chunks)
+    ]
+    sent = []
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        'type': 'http', 'http_version': '1.1', 'method': method, 'scheme': 'http',
+        'path': path, 'root_path': '', 'query_string': query_string,
+        'headers': [(name.encode('latin-1'), value.encode('latin-1')) for name, value in headers],
+        'server': ('testserver', 80), 'client': ('127.0.0.1', 50000),
+    }
+    asyncio.run(asgi_app(scope, receive, send))
+    start = sent[0]
+    body_messages = sent[1:]
+    return (start['status'], dict(start['headers']), b''.join(m['body'] for m in body_messages),
+            len(body_messages))
+
+
+def post_json(asgi_app, path, payload, query_string=b''):
+    body = json.dumps(payload).encode('utf-8')
+    return call(asgi_app, 'POST', path, body, headers=[
+        ('content-type', 'application/json'), ('content-length', str(len(body)))
+    ], query_string=query_string)
+
+
+class TestAsgiAdapter(unittest.TestCase):
+    def setUp(self):
+        self.asgi_app = AsgiAdapter(flask_app.wsgi_app)
+        self.client = flask_app.test_client()
+
+    def test_tax_amount_matches_wsgi(self):
+        payload = {"taxable_amount": 100_000_000, "family_structure": FAMILY_STRUCTURE}
+        status, headers, body, _ = post_json(self.asgi_app, '/api/calculation/tax-amount', payload)
+        self.assertEqual(200, status)
+        self.assertEqual(b'application/json', headers[b'content-type'])
+        expected = self.client.post('/api/calculation/tax-amount', json=payload).get_json()
+        self.assertEqual(expected, json.loads(body))
+
+    def test_query_string_is_passed(self):
+        payload = {"family_structure": FAMILY_STRUCTURE}
+        _, _, body, _ = post_json(self.asgi_app, '/api/calculation/heirs', payload, query_string=b'format=compact')
+        self.assertNotIn('basic_deduction_formatted', json.loads(body)['result'])
+
+    def test_request_body_in_chunks(self):
+        body = json.dumps({"family_structure": FAMILY_STRUCTURE}).encode('utf-8')
+        status, _, response_body, _ = call(
+            self.asgi_app, 'POST', '/api/calculation/heirs',
+            headers=[('content-type', 'application/json')],
+            body_chunks=[body[:10], body[10:25], body[25:]]
+        )
+        self.assertEqual(200, status)
+        self.assertEqual(3, json.loads(response_body)['result']['total_heirs_count'])
+
+    def test_batch_runs_in_executor_and_streams(self):
+        lines = [json.dumps({"id": i, "taxable_amount": 100_000_000 + i, "family_structure": FAMILY_STRUCTURE})
+                 for i in range(5)]
+        threads = []
+        original_start = self.asgi_app._start
+
+        def recording_start(environ):
+            threads.append(threading.current_thread().name)
+            return original_start(environ)
+
+        self.asgi_app._start = recording_start
+        body = ('\n'.join(lines) + '\n').encode('utf-8')
+        status, headers, response_body, _ = call(
+            self.asgi_app, 'POST', '/api/calculation/batch',
+            headers=[('content-type', 'application/x-ndjson')],
+            body_chunks=[body[:7], body[7:100], body[100:]]
+        )
+        self.assertEqual(200, status)
+        self.assertEqual(b'application/x-ndjson', headers[b'content-type'])
+        results = [json.loads(line) for line in response_body.splitlines()]
+        self.assertEqual(list(range(5)), [r['id'] for r in results])
+        self.assertTrue(all(r['success'] for r in results))
+        self.assertTrue(threads[0].startswith('asgi-offload'))
+
+    def test_streamed_response_in_several_chunks(self):
+        # レスポンス本文をチャンクごとに別のスレッドで取り出しても、リクエストのコンテキストを引き継ぐ（stream_with_context）
+        lines = [json.dumps({"id": i, "taxable_amount": 100_000_000 + i, "family_structure": FAMILY_STRUCTURE})
+                 for i in range(3000)]
+        status, _, response_body, body_messages = call(
+            self.asgi_app, 'POST', '/api/calculation/batch', ('\n'.join(lines) + '\n').encode('utf-8'),
+            headers=[('content-type', 'application/x-ndjson')]
+        )
+        self.assertEqual(200, status)
+        self.assertGreater(body_messages, 3)
+        results = [json.loads(line) for line in response_body.splitlines()]
+        self.assertEqual(list(range(3000)), [r['id'] for r in results])
+        self.assertTrue(all(r['success'] for r in results))
+
+    def test_light_routes_run_on_event_loop(self):
+        threads = []
+        original_start = self.asgi_app._start
+
+        def recording_start(environ):
+            threads.append(threading.current_thread().name)
+            return original_start(environ)
+
+        self.asgi_app._start = recording_start
+        status, _, _, _ = post_json(self.asgi_app, '/api/calculation/heirs', {"family_structure": FAMILY_STRUCTURE})
+        self.assertEqual(200, status)
+        status, _, _, _ = call(self.asgi_app, 'GET', '/api/health')
+        self.assertEqual(200, status)
+        self.assertEqual([threading.current_thread().name] * 2, threads)
+
+    def test_offloaded_paths_are_matched_by_prefix(self):
+        self.assertTrue(self.asgi_app._offloads('/api/calculation/batch/export'))
+        self.assertTrue(self.asgi_app._offloads('/api/jobs/abc/results'))
+        self.assertTrue(self.asgi_app._offloads('/api/simulation/monte-carlo'))
+        self.assertFalse(self.asgi_app._offloads('/api/calculation/batch-other'))
+        self.assertFalse(self.asgi_app._offloads('/api/calculation/full'))
+
+    def test_offloaded_request_limit(self):
+        asgi_app = AsgiAdapter(flask_app.wsgi_app, max_offloaded_requests=0)
+        status, headers, _, _ = call(asgi_app, 'POST', '/api/calculation/batch', b'',
+                                     headers=[('content-type', 'application/x-ndjson')])
+        self.assertEqual(503, status)
+        self.assertEqual(b'1', headers[b'retry-after'])
+
+    def test_inline_body_size_limit(self):
+        asgi_app = AsgiAdapter(flask_app.wsgi_app, max_inline_body_size=16)
+        status, _, _, _ = post_json(asgi_app, '/api/calculation/heirs', {"family_structure": FAMILY_STRUCTURE})
+        self.assertEqual(413, status)
+
+    def test_lifespan(self):
+        messages = [{'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'}]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message['type'])
+
+        asyncio.run(self.asgi_app({'type': 'lifespan'}, receive, send))
+        self.assertEqual(['lifespan.startup.complete', 'lifespan.shutdown.complete'], sent)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+一括計算エンジンのテスト
+逐次計算 (calculate_tax_by_legal_share) と結果が完全に一致することを検証
+"""
+import os
+import random
+import sys
+import unittest
+from fractions import Fraction
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'api'))
+
+from models.inheritance import DivisionInput, FamilyStructure, Heir, HeirType, RelationshipType
+from services.tax_calculator import InheritanceTaxCalculator
+from services.batch_calculator import BatchTaxCalculator, calculate_division_tax_batch
+from services.integer_math import mul_div_floor
+
+
+def make_family(**overrides):
+    fs_data = {
+        "spouse_exists": False, "children_count": 0, "adopted_children_count": 0,
+        "grandchild_adopted_count": 0, "parents_alive": 0, "grandparents_alive": 0,
+        "siblings_count": 0, "half_siblings_count": 0, "non_heirs_count": 0
+    }
+    fs_data.update(overrides)
+    return FamilyStructure(**fs_data)
+
+
+FAMILIES = [
+    make_family(spouse_exists=True, children_count=2),
+    make_family(spouse_exists=True, children_count=3, adopted_children_count=2, grandchild_adopted_count=1),
+    make_family(spouse_exists=True, parents_alive=1),
+    make_family(parents_alive=2, non_heirs_count=1),
+    make_family(spouse_exists=True, siblings_count=1, half_siblings_count=2),
+    make_family(siblings_count=2, half_siblings_count=1),
+    make_family(spouse_exists=True),
+]
+
+
+class TestBatchTaxCalculator(unittest.TestCase):
+    def setUp(self):
+        self.calculator = InheritanceTaxCalculator()
+        self.batch = BatchTaxCalculator(self.calculator)
+
+    def test_matches_scalar_path(self):
+        rng = random.Random(20250626)
+        amounts = [rng.randrange(1, 3_000_000_000) for _ in range(500)]
+        amounts += [30_000_000, 48_000_000, 330_000_000, 10_000_001]
+        families = [rng.choice(FAMILIES) for _ in amounts]
+
+        result = self.batch.calculate_tax_by_legal_share(amounts, families)
+
+        for i, (amount, fs) in enumerate(zip(amounts, families)):
+            heirs = self.calculator.determine_legal_heirs(fs)
+            expected = self.calculator.calculate_tax_by_legal_share(amount, heirs)
+            self.assertEqual(expected.basic_deduction, result.basic_deduction[i])
+            self.assertEqual(expected.taxable_inheritance, result.taxable_inheritance[i])
+            self.assertEqual(expected.total_tax_amount, result.total_tax_amount[i])
+            self.assertEqual(len(heirs), result.heir_counts[i])
+            self.assertEqual(
+                [d.tax_before_addition for d in expected.heir_tax_details],
+                list(result.heir_tax_amounts[i, :len(heirs)]),
+            )
+
+    def test_single_family_structure_for_all_cases(self):
+        result = self.batch.calculate_tax_by_legal_share([100_000_000, 200_000_000], FAMILIES[0])
+        self.assertEqual([6_300_000, 27_000_000], list(result.total_tax_amount))
+
+    def test_length_mismatch(self):
+        with self.assertRaises(ValueError):
+            self.batch.calculate_tax_by_legal_share([100_000_000], FAMILIES[:2])
+
+
+class TestExactShares(unittest.TestCase):
+    def setUp(self):
+        self.calculator = InheritanceTaxCalculator()
+
+    def test_shares_are_exact_fractions(self):
+        heirs = self.calculator.determine_legal_heirs(make_family(spouse_exists=True, parents_alive=1))
+        self.assertEqual([Fraction(2, 3), Fraction(1, 3)], [heir.legal_share for heir in heirs])
+        self.assertEqual(1 / 3, heirs[1].inheritance_share)
+
+    def test_share_recovered_from_float(self):
+        heir = Heir("parent_1", "親1", HeirType.PARENT, RelationshipType.PARENT, 1.0 - 2 / 3)
+        self.assertEqual((1, 3), (heir.share_numerator, heir.share_denominator))
+
+    def test_proportional_tax_is_exact(self):
+        # 浮動小数点では 1,310,730 × 0.7 が 917,510 に切り捨てられていた
+        heirs = self.calculator.determine_legal_heirs(make_family(children_count=2))
+        division = DivisionInput(
+            mode='amount', total_amount=100_000_000, heirs=heirs, total_tax_amount=1_310_730,
+            amounts={"child_1": 70_000_000, "child_2": 30_000_000}
+        )
+        result = self.calculator.calculate_actual_division(division)
+        self.assertEqual([917_511, 393_219], [d.final_tax_amount for d in result.heir_details])
+
+        batch = calculate_division_tax_batch(heirs, 100_000_000, 1_310_730, [[70_000_000, 30_000_000]])
+        self.assertEqual([917_511, 393_219], list(batch[0]))
+
+    def test_mul_div_floor_handles_int64_overflow(self):
+        a = np.array([10 ** 13, 7], dtype=np.int64)
+        b = np.array([5 * 10 ** 12, 3], dtype=np.int64)
+        c = np.array([3 * 10 ** 13, 2], dtype=np.int64)
+        self.assertEqual([10 ** 13 * 5 * 10 ** 12 // (3 * 10 ** 13), 10], list(mul_div_floor(a, b, c)))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+分割最適化と分割計算の一括評価のテスト
+"""
+import os
+import random
+import sys
+import unittest
+from datetime import date
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'api'))
+
+from models.inheritance import DivisionInput, FamilyStructure
+from services.tax_calculator import InheritanceTaxCalculator
+from services.batch_calculator import calculate_division_tax_batch
+from services.division_optimizer import DivisionConstraints, DivisionOptimizer
+
+
+def make_family(**overrides):
+    fs_data = {
+        "spouse_exists": False, "children_count": 0, "adopted_children_count": 0,
+        "grandchild_adopted_count": 0, "parents_alive": 0, "grandparents_alive": 0,
+        "siblings_count": 0, "half_siblings_count": 0, "non_heirs_count": 0
+    }
+    fs_data.update(overrides)
+    return FamilyStructure(**fs_data)
+
+
+FAMILIES = [
+    make_family(spouse_exists=True, children_count=2),
+    make_family(spouse_exists=True, children_count=2, adopted_children_count=1, grandchild_adopted_count=1),
+    make_family(spouse_exists=True, siblings_count=2, non_heirs_count=1),
+    make_family(parents_alive=2, non_heirs_count=1),
+]
+
+
+class TestDivisionTaxBatch(unittest.TestCase):
+    def test_matches_calculate_actual_division(self):
+        calculator = InheritanceTaxCalculator()
+        rng = random.Random(5)
+        for fs in FAMILIES:
+            heirs = calculator.determine_legal_heirs(fs)
+            for _ in range(50):
+                total_amount = rng.randrange(50_000_000, 2_000_000_000)
+                total_tax = calculator.calculate_tax_by_legal_share(total_amount, heirs).total_tax_amount
+                cuts = sorted(rng.randrange(0, total_amount + 1) for _ in range(len(heirs) - 1))
+                parts = [b - a for a, b in zip([0] + cuts, cuts + [total_amount])]
+                amounts = {heir.id: part for heir, part in zip(heirs, parts)}
+
+                expected = calculator.calculate_actual_division(DivisionInput(
+                    mode='amount', total_amount=total_amount, heirs=heirs,
+                    total_tax_amount=total_tax, amounts=amounts
+                ))
+                actual = calculate_division_tax_batch(heirs, total_amount, total_tax, np.array([parts]))
+                self.assertEqual([d.final_tax_amount for d in expected.heir_details], list(actual[0]))
+
+
+class TestDivisionOptimizer(unittest.TestCase):
+    def setUp(self):
+        self.calculator = InheritanceTaxCalculator()
+        self.optimizer = DivisionOptimizer(self.calculator)
+
+    def optimize(self, fs, total_amount, constraints=None):
+        heirs = self.calculator.determine_legal_heirs(fs)
+        total_tax = self.calculator.calculate_tax_by_legal_share(total_amount, heirs).total_tax_amount
+        return heirs, total_tax, self.optimizer.optimize(total_amount, heirs, total_tax, constraints)
+
+    def test_not_worse_than_brute_force(self):
+        fs = FAMILIES[1]
+        total_amount = 500_000_000
+        heirs, total_tax, result = self.optimize(fs, total_amount)
+        self.assertEqual(total_amount, sum(result.amounts.values()))
+
+        step = total_amount // 20
+        for spouse in range(0, total_amount + 1, step):
+            rest = total_amount - spouse
+            amounts = {h.id: 0 for h in heirs}
+            amounts["spouse"] = spouse
+            amounts["child_2"] = rest
+            candidate = self.calculator.calculate_actual_division(DivisionInput(
+                mode='amount', total_amount=total_amount, heirs=heirs,
+                total_tax_amount=total_tax, amounts=amounts
+            ))
+            self.assertLessEqual(result.division_result.total_tax_amount, candidate.total_tax_amount)
+
+    def test_surcharge_heirs_receive_only_minimum(self):
+        _, _, result = self.optimize(FAMILIES[1], 400_000_000, DivisionConstraints(min_amounts={"child_1": 30_000_000}))
+        self.assertEqual(30_000_000, result.amounts["child_1"])  # 孫養子（2割加算）
+
+    def test_curve_contains_spouse_reduction_limit(self):
+        _, _, result = self.optimize(FAMILIES[0], 300_000_000)
+        spouse_amounts = [p.spouse_amount for p in result.trade_off_curve]
+        self.assertIn(160_000_000, spouse_amounts)
+        self.assertEqual(sorted(spouse_amounts), spouse_amounts)
+        best = min(p.total_tax_amount for p in result.trade_off_curve)
+        self.assertEqual(best, result.division_result.total_tax_amount)
+
+    def test_fixed_spouse_share(self):
+        _, _, result = self.optimize(FAMILIES[0], 300_000_000, DivisionConstraints(fixed_spouse_percentage=40))
+        self.assertEqual(120_000_000, result.amounts["spouse"])
+        self.assertEqual(1, result.candidates_evaluated)
+
+    def test_infeasible_constraints(self):
+        with self.assertRaises(ValueError):
+            self.optimize(FAMILIES[0], 100_000_000, DivisionConstraints(min_amounts={"child_1": 200_000_000}))
+
+    def test_remainder_is_split_by_integer_shares(self):
+        # 残額 200,000,002 円を子3人（法定相続分 1/6 ずつ）へ。端数の1円は先頭の子へ
+        fs = make_family(spouse_exists=True, children_count=3)
+        _, _, result = self.optimize(fs, 300_000_003, DivisionConstraints(fixed_spouse_amount=100_000_001))
+        self.assertEqual({"spouse": 100_000_001, "child_1": 66_666_668, "child_2": 66_666_667,
+                          "child_3": 66_666_667}, result.amounts)
+
+    def test_inheritance_date_is_passed_to_division(self):
+        heirs = self.calculator.determine_legal_heirs(FAMILIES[0])
+        inheritance_date = date(2014, 6, 1)
+        total_tax = self.calculator.calculate_tax_by_legal_share(
+            300_000_000, heirs, inheritance_date).total_tax_amount
+        result = self.optimizer.optimize(300_000_000, heirs, total_tax, inheritance_date=inheritance_date)
+        self.assertEqual(80_000_000, result.division_result.basic_deduction)
+
+    def test_unknown_heir_in_min_amounts(self):
+        with self.assertRaises(ValueError):
+            self.optimize(FAMILIES[0], 100_000_000, DivisionConstraints(min_amounts={"child_3": 10_000_000}))
+
+    def test_fixed_spouse_without_spouse(self):
+        for constraints in (DivisionConstraints(fixed_spouse_amount=10_000_000),
+                            DivisionConstraints(fixed_spouse_percentage=50)):
+            with self.assertRaises(ValueError):
+                self.optimize(FAMILIES[3], 100_000_000, constraints)
+
+    def test_spouse_only(self):
+        fs = make_family(spouse_exists=True)
+        _, _, result = self.optimize(fs, 300_000_000)
+        self.assertEqual({"spouse": 300_000_000}, result.amounts)
+        self.assertEqual([300_000_000], [p.spouse_amount for p in result.trade_off_curve])
+        with self.assertRaises(ValueError):
+            self.optimize(fs, 300_000_000, DivisionConstraints(fixed_spouse_amount=100_000_000))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
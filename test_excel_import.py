@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Excel ブックからの一括取り込み（services.excel_import）のテスト
+"""
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'api'))
+
+from models.inheritance import FamilyStructure
+from services.excel_import import ExcelCaseImporter, ImportReport, read_workbook
+
+try:
+    import openpyxl
+except ImportError:  # openpyxl は任意の依存
+    openpyxl = None
+
+SAMPLE_WORKBOOK = os.path.join(os.path.dirname(__file__), 'Excel', '20250626相続税計算アプリ.xlsx')
+
+HEADER = ['ID', '課税対象総額', '配偶者の有無', '子供の数', '父母の数', '兄弟姉妹の数',
+          '子供の内の養子の数', '養子の内孫養子の数', '法定相続人以外', '配偶者', '子供1', '子供2', '備考']
+
+
+@unittest.skipIf(openpyxl is None, "openpyxl がインストールされていません")
+class TestExcelImport(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def write_workbook(self, rows):
+        path = os.path.join(self.directory.name, 'cases.xlsx')
+        workbook = openpyxl.Workbook()
+        for row in rows:
+            workbook.active.append(row)
+        workbook.save(path)
+        return path
+
+    def test_template_sheet(self):
+        report = ImportReport()
+        results = [result for chunk in ExcelCaseImporter().iter_results(SAMPLE_WORKBOOK, report)
+                   for result in chunk]
+        self.assertEqual(1, len(results))
+        self.assertEqual(['Sheet1'], report.ignored_sheets)
+
+        case = results[0].case
+        self.assertEqual(246_000_000, case.taxable_amount)
+        self.assertEqual(FamilyStructure(
+            spouse_exists=True, children_count=3, adopted_children_count=1, grandchild_adopted_count=1,
+            parents_alive=2, grandparents_alive=0, siblings_count=3, half_siblings_count=0, non_heirs_count=1
+        ), case.family_structure)
+        self.assertEqual(100_000_000, case.amounts['non_heir_1'])
+
+        # ブックの数式の計算結果（基礎控除・相続税額総額）と一致する
+        self.assertEqual(54_000_000, results[0].tax_result.basic_deduction)
+        self.assertEqual(35_000_000, results[0].tax_result.total_tax_amount)
+        self.assertEqual(case.taxable_amount, sum(
+            detail.inheritance_amount for detail in results[0].division_result.heir_details))
+
+    def test_rows_and_skipped_rows(self):
+        path = self.write_workbook([
+            HEADER,
+            ['A-1', 100_000_000, '有', 2, 0, 0, 0, 0, 0, 50_000_000, 25_000_000, 25_000_000, 'メモ'],
+            ['A-2', '80,000,000', '無', 1],
+            [],
+            ['A-3', 100_000_000, 'はい', -1, 0, 0, 0, 0, 0, None, 'x'],
+            ['A-4', 100_000_000, '有', 2, 0, 0, 0, 0, 0, 50_000_000, 1, 1],
+            ['A-5', 100_000_000, '無', 0],
+        ])
+        report = ImportReport()
+        results = [result for chunk in ExcelCaseImporter().iter_results(path, report) for result in chunk]
+
+        self.assertEqual(['A-1', 'A-2'], [result.case.case_id for result in results])
+        self.assertIsNotNone(results[0].division_result)
+        self.assertIsNone(results[1].division_result)
+        self.assertEqual(80_000_000, results[1].case.taxable_amount)
+
+        self.assertEqual((2, 3), (report.cases_count, report.skipped_count))
+        self.assertEqual([5, 6, 7], [skipped.row for skipped in report.skipped])
+        self.assertEqual(['spouse_exists', 'amounts.child_1'], [error.field for error in report.skipped[0].errors])
+        self.assertEqual(['INVALID_SUM'], [error.code for error in report.skipped[1].errors])
+        self.assertEqual(['NO_HEIRS'], [error.code for error in report.skipped[2].errors])
+
+    def test_inheritance_date_without_schedule_is_skipped(self):
+        path = self.write_workbook([
+            ['ID', '課税対象総額', '配偶者の有無', '子供の数', '相続開始日'],
+            ['D-1', 100_000_000, '有', 2, '2024-04-01'],
+            ['D-2', 100_000_000, '有', 2, '1990-01-01'],
+            ['D-3', 100_000_000, '有', 2, None],
+        ])
+        report = ImportReport()
+        results = [result for chunk in ExcelCaseImporter().iter_results(path, report) for result in chunk]
+
+        self.assertEqual(['D-1', 'D-3'], [result.case.case_id for result in results])
+        self.assertEqual([3], [skipped.row for skipped in report.skipped])
+        self.assertEqual([('inheritance_date', 'INVALID_VALUE')],
+                         [(error.field, error.code) for error in report.skipped[0].errors])
+
+    def test_chunks(self):
+        rows = [HEADER] + [[f'C-{i}', 10_000_000 * (i + 1), '有', 1] for i in range(5)]
+        path = self.write_workbook(rows)
+        chunks = list(ExcelCaseImporter(chunk_size=2).iter_results(path))
+        self.assertEqual([2, 2, 1], [len(chunk) for chunk in chunks])
+
+    def test_cli_export(self):
+        from cli import main
+        output = os.path.join(self.directory.name, 'results.xlsx')
+        self.assertEqual(0, main(['export', SAMPLE_WORKBOOK, output]))
+        rows = list(openpyxl.load_workbook(output, read_only=True).active.values)
+        self.assertEqual(('合計', 246_000_000), rows[1][1:3])
+        self.assertEqual(['spouse', 'child_1', 'child_2', 'child_3', 'non_heir_1'], [row[6] for row in rows[2:]])
+
+    def test_read_workbook_is_lazy(self):
+        path = self.write_workbook([HEADER] + [[i, 10_000_000, '無', 1] for i in range(3)])
+        cases = read_workbook(path)
+        self.assertEqual('0', next(cases).case_id)
+        cases.close()
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+法定相続人判定キャッシュのテスト
+"""
+import dataclasses
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'api'))
+
+from models.inheritance import FamilyStructure
+from services.tax_calculator import InheritanceTaxCalculator
+from services.heir_cache import HeirCache
+
+
+def make_family(**overrides):
+    fs_data = {
+        "spouse_exists": False, "children_count": 0, "adopted_children_count": 0,
+        "grandchild_adopted_count": 0, "parents_alive": 0, "grandparents_alive": 0,
+        "siblings_count": 0, "half_siblings_count": 0, "non_heirs_count": 0
+    }
+    fs_data.update(overrides)
+    return FamilyStructure(**fs_data)
+
+
+class TestHeirCache(unittest.TestCase):
+    def setUp(self):
+        self.calculator = InheritanceTaxCalculator()
+        self.cache = HeirCache(self.calculator, maxsize=2)
+
+    def test_family_structure_is_hashable(self):
+        self.assertEqual(hash(make_family(children_count=2)), hash(make_family(children_count=2)))
+        self.assertEqual(1, len({make_family(children_count=2), make_family(children_count=2)}))
+
+    def test_template_matches_calculator(self):
+        fs = make_family(spouse_exists=True, children_count=3, adopted_children_count=2)
+        template = self.cache.get(fs)
+        heirs = self.calculator.determine_legal_heirs(fs)
+        self.assertEqual(tuple(heirs), template.heirs)
+        self.assertEqual(self.calculator.calculate_basic_deduction(heirs), template.basic_deduction)
+
+    def test_templates_are_immutable(self):
+        template = self.cache.get(make_family(children_count=1))
+        with self.assertRaises(dataclasses.FrozenInstanceError):
+            template.heirs[0].inheritance_share = 0.5
+        with self.assertRaises(dataclasses.FrozenInstanceError):
+            template.basic_deduction = 0
+
+    def test_counters_and_eviction(self):
+        a, b, c = make_family(children_count=1), make_family(children_count=2), make_family(children_count=3)
+        first = self.cache.get(a)
+        self.assertIs(first, self.cache.get(a))
+        self.cache.get(b)
+        self.cache.get(c)  # a が追い出される
+        self.cache.get(a)
+        self.assertEqual(
+            {'hits': 1, 'misses': 4, 'evictions': 2, 'size': 2, 'maxsize': 2},
+            self.cache.stats()
+        )
+
+        self.cache.clear()
+        self.assertEqual(0, self.cache.stats()['size'])
+        self.assertEqual(0, self.cache.stats()['misses'])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+列指向の法定相続人テーブル（HeirTable）のテスト
+"""
+import itertools
+import os
+import sys
+import unittest
+from fractions import Fraction
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'api'))
+
+from models.heir_table import HeirTable
+from models.inheritance import DivisionInput, FamilyStructure
+from services.batch_calculator import calculate_division_tax_table, calculate_legal_share_tax_table
+from services.tax_calculator import InheritanceTaxCalculator
+
+
+def family_structures():
+    """代表的な家族構成の組み合わせ"""
+    structures = []
+    for spouse, children, adopted, grandchild, parents, siblings, half_siblings, non_heirs in itertools.product(
+        [False, True], [0, 1, 3], [0, 2], [0, 1], [0, 1, 2], [0, 2], [0, 1, 3], [0, 1]
+    ):
+        if adopted > children:
+            continue
+        structures.append(FamilyStructure(
+            spouse_exists=spouse, children_count=children, adopted_children_count=adopted,
+            grandchild_adopted_count=grandchild, parents_alive=parents, grandparents_alive=0,
+            siblings_count=siblings, half_siblings_count=half_siblings, non_heirs_count=non_heirs
+        ))
+    return structures
+
+
+class TestHeirTable(unittest.TestCase):
+    def setUp(self):
+        self.calculator = InheritanceTaxCalculator()
+        self.structures = family_structures()
+        self.table = self.calculator.determine_legal_heirs_table(self.structures)
+
+    def test_matches_determine_legal_heirs(self):
+        self.assertEqual(len(self.structures), len(self.table))
+        for i, fs in enumerate(self.structures):
+            with self.subTest(family_structure=fs):
+                self.assertEqual(self.calculator.determine_legal_heirs(fs), self.table.to_heirs(i))
+
+    def test_shares_are_exact_fractions(self):
+        table = self.calculator.determine_legal_heirs_table([FamilyStructure(
+            spouse_exists=True, children_count=0, adopted_children_count=0, grandchild_adopted_count=0,
+            parents_alive=0, grandparents_alive=0, siblings_count=2, half_siblings_count=1
+        )])
+        shares = [Fraction(int(n), int(d)) for n, d in zip(table.share_numerators, table.share_denominators)]
+        self.assertEqual([Fraction(3, 4), Fraction(1, 10), Fraction(1, 10), Fraction(1, 20)], shares)
+
+        for fs_index in range(len(self.table)):
+            rows = slice(self.table.estate_offsets[fs_index], self.table.estate_offsets[fs_index + 1])
+            total = sum(
+                Fraction(int(n), int(d))
+                for n, d in zip(self.table.share_numerators[rows], self.table.share_denominators[rows])
+            )
+            self.assertIn(total, (0, 1))
+
+    def test_basic_deduction(self):
+        expected = [
+            self.calculator.calculate_basic_deduction(self.calculator.determine_legal_heirs(fs))
+            for fs in self.structures
+        ]
+        self.assertEqual(expected, list(self.calculator.calculate_basic_deduction(self.table)))
+
+    def test_legal_share_and_division_match_scalar(self):
+        rng = np.random.default_rng(0)
+        taxable_amounts = rng.integers(10_000_000, 2_000_000_000, size=len(self.table))
+        total_taxes, _ = calculate_legal_share_tax_table(self.table, taxable_amounts)
+
+        heir_counts = self.table.heir_counts
+        weights = rng.random(int(heir_counts.sum()))
+        amounts = np.zeros(len(weights), dtype=np.int64)
+        for i in range(len(self.table)):
+            rows = slice(self.table.estate_offsets[i], self.table.estate_offsets[i + 1])
+            if heir_counts[i]:
+                amounts[rows] = np.floor(taxable_amounts[i] * weights[rows] / weights[rows].sum())
+        final_taxes = calculate_division_tax_table(self.table, taxable_amounts, total_taxes, amounts)
+
+        for i, fs in enumerate(self.structures):
+            heirs = self.calculator.determine_legal_heirs(fs)
+            rows = slice(self.table.estate_offsets[i], self.table.estate_offsets[i + 1])
+            legal = self.calculator.calculate_tax_by_legal_share(int(taxable_amounts[i]), heirs)
+            self.assertEqual(legal.total_tax_amount, total_taxes[i])
+
+            division = self.calculator.calculate_actual_division(DivisionInput(
+                mode='amount', total_amount=int(taxable_amounts[i]), heirs=heirs,
+                total_tax_amount=legal.total_tax_amount,
+                amounts={heir.id: int(a) for heir, a in zip(heirs, amounts[rows])}
+            ))
+            self.assertEqual([d.final_tax_amount for d in division.heir_details], list(final_taxes[rows]))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
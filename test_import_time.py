@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+コールドスタート時のモジュール読み込みのテスト
+`python -X importtime` で api/main.py を読み込み、重い依存が読み込まれないことと
+アプリ自身のモジュールの読み込み時間が予算内であることを検証
+"""
+import os
+import subprocess
+import sys
+import unittest
+
+API_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'api')
+
+# コールドスタートで読み込んではいけないモジュール（分析系API・ジョブAPIの初回リクエスト時に読み込む）
+FORBIDDEN_MODULES = ('numpy', 'flask_sqlalchemy', 'sqlalchemy', 'routes.analysis', 'models.heir_table',
+                     'routes.jobs', 'sqlite3')
+
+# routes / services / models の読み込み時間の合計の上限（マイクロ秒）
+PROJECT_IMPORT_BUDGET_US = 150_000
+
+
+def import_times():
+    """-X importtime の出力を {モジュール名: (自身の時間, 累積時間)} に変換"""
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import main'],
+        cwd=API_DIR, capture_output=True, text=True, check=True
+    )
+    times = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        times[name.strip()] = (int(self_us), int(cumulative_us))
+    return times
+
+
+class TestImportTime(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.times = import_times()
+
+    def test_heavy_modules_are_not_imported(self):
+        for module in FORBIDDEN_MODULES:
+            self.assertNotIn(module, self.times, f"{module} がコールドスタート時に読み込まれています")
+
+    def test_project_modules_within_budget(self):
+        project_us = sum(
+            self_us for name, (self_us, _) in self.times.items()
+            if name.split('.')[0] in ('main', 'routes', 'services', 'models')
+        )
+        self.assertLess(project_us, PROJECT_IMPORT_BUDGET_US)
+
+    def test_lazy_views_are_registered(self):
+        sys.path.insert(0, API_DIR)
+        from main import create_app
+        rules = {rule.rule for rule in create_app().url_map.iter_rules()}
+        self.assertIn('/api/calculation/optimize-division', rules)
+        self.assertIn('/api/simulation/monte-carlo', rules)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
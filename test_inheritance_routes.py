@@ -0,0 +1,582 @@
+#!/usr/bin/env python3
+"""
+相続税計算APIのルートのテスト（Flaskテストクライアント使用）
+"""
+import csv
+import io
+import json
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'api'))
+
+from main import app
+from models.inheritance import FamilyStructure
+from routes.inheritance import calculator, heir_cache, result_cache
+from routes.serializers import format_currency, format_percentage
+
+FAMILY_STRUCTURE = {
+    "spouse_exists": True,
+    "children_count": 2,
+    "adopted_children_count": 0,
+    "grandchild_adopted_count": 0,
+    "parents_alive": 0,
+    "grandparents_alive": 0,
+    "siblings_count": 0,
+    "half_siblings_count": 0,
+    "non_heirs_count": 0
+}
+
+
+class TestBatchEndpoint(unittest.TestCase):
+    def setUp(self):
+        self.client = app.test_client()
+
+    def post_lines(self, lines):
+        body = "\n".join(lines) + "\n"
+        response = self.client.post(
+            '/api/calculation/batch', data=body.encode('utf-8'),
+            content_type='application/x-ndjson'
+        )
+        self.assertEqual(200, response.status_code)
+        self.assertEqual('application/x-ndjson', response.mimetype)
+        return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+    def test_results_match_tax_amount_endpoint(self):
+        payload = {"taxable_amount": 100_000_000, "family_structure": FAMILY_STRUCTURE}
+        single = self.client.post('/api/calculation/tax-amount', json=payload).get_json()
+
+        results = self.post_lines([json.dumps(dict(payload, id="case-1"))])
+
+        self.assertEqual(1, len(results))
+        self.assertEqual("case-1", results[0]["id"])
+        self.assertTrue(results[0]["success"])
+        self.assertEqual(single["result"], results[0]["result"])
+
+    def test_errors_are_reported_inline(self):
+        results = self.post_lines([
+            json.dumps({"taxable_amount": 100_000_000, "family_structure": FAMILY_STRUCTURE}),
+            "",
+            "{not json",
+            json.dumps({"taxable_amount": 100_000_000, "family_structure": {"children_count": -1}}),
+            json.dumps({"taxable_amount": 0, "family_structure": FAMILY_STRUCTURE}),
+        ])
+
+        self.assertEqual([1, 3, 4, 5], [r["line"] for r in results])
+        self.assertTrue(results[0]["success"])
+        self.assertEqual("INVALID_JSON", results[1]["error"]["code"])
+        self.assertEqual("VALIDATION_ERROR", results[2]["error"]["code"])
+        self.assertEqual("children_count", results[2]["error"]["details"][0]["field"])
+        self.assertEqual("VALIDATION_ERROR", results[3]["error"]["code"])
+
+    def test_division_matches_full_endpoint(self):
+        payload = {"taxable_amount": 100_000_000, "family_structure": FAMILY_STRUCTURE,
+                   "division": {"amounts": {"spouse": 60_000_000, "child_1": 20_000_000, "child_2": 20_000_000}}}
+        full = self.client.post('/api/calculation/full', json=payload).get_json()["result"]
+
+        results = self.post_lines([json.dumps(payload)])
+        self.assertEqual(full["actual_division"], results[0]["result"]["actual_division"])
+
+
+class TestBatchExportEndpoint(unittest.TestCase):
+    def setUp(self):
+        self.client = app.test_client()
+
+    def export(self, lines, export_format):
+        return self.client.post(f'/api/calculation/batch/export?format={export_format}',
+                                data=("\n".join(lines) + "\n").encode('utf-8'),
+                                content_type='application/x-ndjson')
+
+    def test_csv(self):
+        payload = {"taxable_amount": 100_000_000, "family_structure": FAMILY_STRUCTURE,
+                   "division": {"amounts": {"spouse": 60_000_000, "child_1": 20_000_000, "child_2": 20_000_000}}}
+        full = self.client.post('/api/calculation/full', json=payload).get_json()["result"]
+        final_tax = sum(detail["final_tax_amount"] for detail in full["actual_division"]["heir_details"])
+
+        response = self.export([json.dumps(dict(payload, id="case-1")), "{not json"], 'csv')
+        self.assertEqual(200, response.status_code)
+        self.assertEqual('text/csv', response.mimetype)
+        self.assertIn('attachment', response.headers['Content-Disposition'])
+
+        rows = list(csv.reader(io.StringIO(response.get_data().decode('utf-8-sig'))))
+        self.assertEqual(['合計', '相続人', '相続人', '相続人', 'エラー'], [row[1] for row in rows[1:]])
+        self.assertEqual(['case-1', '100000000', str(final_tax)], [rows[1][0], rows[1][2], rows[1][18]])
+        self.assertEqual(['spouse', '1/2', '60000000'], [rows[2][6], rows[2][9], rows[2][15]])
+        self.assertTrue(rows[5][-1].startswith('2行目'))
+
+    def test_xlsx(self):
+        try:
+            import openpyxl
+        except ImportError:
+            self.skipTest("openpyxl がインストールされていません")
+        response = self.export([json.dumps({"taxable_amount": 100_000_000, "family_structure": FAMILY_STRUCTURE})],
+                               'xlsx')
+        self.assertEqual(200, response.status_code)
+        rows = list(openpyxl.load_workbook(io.BytesIO(response.get_data())).active.values)
+        self.assertEqual(('合計', 100_000_000), rows[1][1:3])
+        self.assertEqual(5, len(rows))
+
+    def test_invalid_format(self):
+        self.assertEqual(400, self.export([], 'pdf').status_code)
+
+
+class TestHeirCacheSharing(unittest.TestCase):
+    def setUp(self):
+        self.client = app.test_client()
+        heir_cache.clear()
+
+    def test_cache_is_shared_across_endpoints(self):
+        family_structure = dict(FAMILY_STRUCTURE, children_count=5)
+        self.client.post('/api/calculation/heirs', json={"family_structure": family_structure})
+        self.client.post('/api/calculation/tax-amount', json={
+            "taxable_amount": 100_000_000, "family_structure": family_structure
+        })
+        self.client.post('/api/calculation/batch', data=json.dumps({
+            "taxable_amount": 200_000_000, "family_structure": family_structure
+        }).encode('utf-8'), content_type='application/x-ndjson').get_data()
+
+        stats = self.client.get('/api/utilities/heir-cache').get_json()['data']
+        self.assertEqual(1, stats['misses'])
+        self.assertEqual(2, stats['hits'])
+
+
+class TestOptimizeDivisionEndpoint(unittest.TestCase):
+    def setUp(self):
+        self.client = app.test_client()
+
+    def test_returns_optimum_and_curve(self):
+        response = self.client.post('/api/calculation/optimize-division', json={
+            "taxable_amount": 300_000_000,
+            "family_structure": FAMILY_STRUCTURE,
+            "constraints": {"min_amounts": {"child_1": 10_000_000}}
+        })
+        self.assertEqual(200, response.status_code)
+        result = response.get_json()["result"]
+        self.assertEqual(300_000_000, sum(result["amounts"].values()))
+        self.assertGreaterEqual(result["amounts"]["child_1"], 10_000_000)
+        self.assertEqual(
+            min(p["total_tax_amount"] for p in result["trade_off_curve"]),
+            result["total_tax_amount"]
+        )
+
+    def test_infeasible_constraints(self):
+        response = self.client.post('/api/calculation/optimize-division', json={
+            "taxable_amount": 100_000_000,
+            "family_structure": FAMILY_STRUCTURE,
+            "constraints": {"fixed_spouse_amount": 200_000_000}
+        })
+        self.assertEqual(400, response.status_code)
+        self.assertEqual("VALIDATION_ERROR", response.get_json()["error"]["code"])
+
+    def test_unsatisfiable_constraints(self):
+        for family_structure, constraints in (
+            (FAMILY_STRUCTURE, {"min_amounts": {"child_9": 1}}),
+            (dict(FAMILY_STRUCTURE, spouse_exists=False), {"fixed_spouse_percentage": 50}),
+        ):
+            response = self.client.post('/api/calculation/optimize-division', json={
+                "taxable_amount": 100_000_000, "family_structure": family_structure, "constraints": constraints
+            })
+            self.assertEqual(400, response.status_code)
+            self.assertEqual("VALIDATION_ERROR", response.get_json()["error"]["code"])
+
+
+    def test_inheritance_date(self):
+        payload = {"taxable_amount": 300_000_000, "family_structure": FAMILY_STRUCTURE,
+                   "inheritance_date": "2014-06-01"}
+        result = self.client.post('/api/calculation/optimize-division', json=payload).get_json()["result"]
+        expected = self.client.post('/api/calculation/tax-amount', json=payload).get_json()["result"]
+        self.assertEqual(expected["total_tax_amount"], result["total_tax_by_legal_share"])
+        current = self.client.post('/api/calculation/optimize-division', json=dict(
+            payload, inheritance_date=None)).get_json()["result"]
+        self.assertLess(result["total_tax_by_legal_share"], current["total_tax_by_legal_share"])
+
+
+class TestTaxCurveEndpoint(unittest.TestCase):
+    def test_points_match_tax_amount_endpoint(self):
+        client = app.test_client()
+        response = client.post('/api/calculation/tax-curve', json={
+            "family_structure": FAMILY_STRUCTURE, "amounts": [100_000_000, 480_000_000]
+        })
+        self.assertEqual(200, response.status_code)
+        result = response.get_json()["result"]
+        self.assertEqual(48_000_000, result["segments"][0]["start_amount"])
+        for point in result["points"]:
+            single = client.post('/api/calculation/tax-amount', json={
+                "taxable_amount": point["taxable_amount"], "family_structure": FAMILY_STRUCTURE
+            }).get_json()
+            self.assertEqual(single["result"]["total_tax_amount"], point["total_tax_amount"])
+
+
+class TestInverseTaxEndpoint(unittest.TestCase):
+    def test_threshold_brackets_target(self):
+        client = app.test_client()
+        response = client.post('/api/calculation/inverse-tax', json={
+            "family_structure": FAMILY_STRUCTURE, "target_tax_amount": 10_000_000
+        })
+        self.assertEqual(200, response.status_code)
+        result = response.get_json()["result"]
+        self.assertLessEqual(result["total_tax_amount"], 10_000_000)
+        self.assertGreater(result["next_total_tax_amount"], 10_000_000)
+
+    def test_division_requires_full_percentages(self):
+        response = app.test_client().post('/api/calculation/inverse-tax', json={
+            "family_structure": FAMILY_STRUCTURE, "target_tax_amount": 10_000_000,
+            "basis": "division", "percentages": {"spouse": 50}
+        })
+        self.assertEqual(400, response.status_code)
+
+    def test_division_rejects_unknown_heir(self):
+        response = app.test_client().post('/api/calculation/inverse-tax', json={
+            "family_structure": FAMILY_STRUCTURE, "target_tax_amount": 10_000_000,
+            "basis": "division", "percentages": {"spouse": 50, "child_1": 25, "child_9": 25}
+        })
+        self.assertEqual(400, response.status_code)
+        error = response.get_json()["error"]
+        self.assertEqual("VALIDATION_ERROR", error["code"])
+        self.assertIn("child_9", error["message"])
+
+
+class TestMonteCarloEndpoint(unittest.TestCase):
+    def simulate(self, percentages):
+        return app.test_client().post('/api/simulation/monte-carlo', json={
+            "family_structure": FAMILY_STRUCTURE, "sample_count": 10, "seed": 1,
+            "assets": [{"distribution": "fixed", "value": 100_000_000}],
+            "division_policy": {"mode": "percentage", "percentages": percentages}
+        })
+
+    def test_percentages(self):
+        response = self.simulate({"spouse": 50, "child_1": 25, "child_2": 25})
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(3_150_000, response.get_json()["result"]["final_tax"]["mean"])
+
+    def test_percentages_must_sum_to_100(self):
+        response = self.simulate({"spouse": 10, "child_1": 10, "child_2": 10})
+        self.assertEqual(400, response.status_code)
+        self.assertEqual("VALIDATION_ERROR", response.get_json()["error"]["code"])
+
+    def test_unknown_heir_id(self):
+        response = self.simulate({"spouse": 50, "child_1": 25, "child_3": 25})
+        self.assertEqual(400, response.status_code)
+        self.assertIn("child_3", response.get_json()["error"]["message"])
+
+
+class TestSecondaryInheritanceEndpoint(unittest.TestCase):
+    def setUp(self):
+        self.client = app.test_client()
+
+    def test_growth_bounds(self):
+        for data, status in (({"annual_growth_rate": 10, "years": 10}, 400),
+                             ({"annual_growth_rate": 0.5, "years": 101}, 400),
+                             ({"annual_growth_rate": 1, "years": 80}, 400),
+                             ({"annual_growth_rate": 0.02, "years": 10}, 200)):
+            with self.subTest(**data):
+                response = self.client.post('/api/simulation/secondary-inheritance', json=dict(
+                    data, taxable_amount=100_000_000, grid_points=11,
+                    family_structure={"spouse_exists": True, "children_count": 2}))
+                self.assertEqual(status, response.status_code, response.get_json())
+
+
+class TestCompactFormat(unittest.TestCase):
+    def setUp(self):
+        self.client = app.test_client()
+
+    def test_compact_omits_formatted_fields(self):
+        payload = {"taxable_amount": 100_000_000, "family_structure": FAMILY_STRUCTURE}
+        full = self.client.post('/api/calculation/tax-amount', json=payload).get_json()["result"]
+        compact = self.client.post('/api/calculation/tax-amount?format=compact', json=payload).get_json()["result"]
+
+        self.assertEqual("100,000,000", full["taxable_amount_formatted"])
+        self.assertNotIn("taxable_amount_formatted", compact)
+        self.assertNotIn("inheritance_share_formatted", compact["legal_heirs"][0])
+        self.assertNotIn("tax_after_addition_formatted", compact["heir_tax_details"][0])
+
+        def strip(value):
+            if isinstance(value, dict):
+                return {k: strip(v) for k, v in value.items() if not k.endswith("_formatted")}
+            if isinstance(value, list):
+                return [strip(v) for v in value]
+            return value
+        self.assertEqual(strip(full), compact)
+
+    def test_key_order_is_stable(self):
+        response = self.client.post('/api/calculation/heirs', json={"family_structure": FAMILY_STRUCTURE})
+        self.assertEqual(
+            ["id", "name", "type", "relationship", "inheritance_share",
+             "inheritance_share_formatted", "two_fold_addition", "is_adopted"],
+            list(json.loads(response.get_data(as_text=True))["result"]["legal_heirs"][0])
+        )
+
+    def test_batch_lines_are_compact(self):
+        body = json.dumps({"taxable_amount": 100_000_000, "family_structure": FAMILY_STRUCTURE}) + "\n"
+        response = self.client.post('/api/calculation/batch?format=compact', data=body.encode('utf-8'))
+        result = json.loads(response.get_data(as_text=True).splitlines()[0])["result"]
+        self.assertNotIn("total_tax_amount_formatted", result)
+
+
+def legacy_tax_amount_result(taxable_amount, tax_result):
+    """ベースラインのビュー関数（jsonify で返していた辞書）と同じ形の相続税額計算APIの result"""
+    return {
+        'taxable_amount': taxable_amount,
+        'taxable_amount_formatted': format_currency(taxable_amount),
+        'legal_heirs': [
+            {
+                'id': heir.id,
+                'name': heir.name,
+                'type': heir.heir_type.value,
+                'relationship': heir.relationship.value,
+                'inheritance_share': heir.inheritance_share,
+                'inheritance_share_formatted': format_percentage(heir.inheritance_share),
+                'legal_share_amount': detail.legal_share_amount,
+                'legal_share_amount_formatted': format_currency(detail.legal_share_amount),
+                'two_fold_addition': heir.two_fold_addition
+            } for heir, detail in zip(tax_result.legal_heirs, tax_result.heir_tax_details)
+        ],
+        'basic_deduction': tax_result.basic_deduction,
+        'basic_deduction_formatted': format_currency(tax_result.basic_deduction),
+        'taxable_inheritance': tax_result.taxable_inheritance,
+        'taxable_inheritance_formatted': format_currency(tax_result.taxable_inheritance),
+        'total_tax_amount': tax_result.total_tax_amount,
+        'total_tax_amount_formatted': format_currency(tax_result.total_tax_amount),
+        'heir_tax_details': [
+            {
+                'heir_id': detail.heir_id,
+                'heir_name': detail.name,
+                'relationship': detail.relationship,
+                'legal_share_amount': detail.legal_share_amount,
+                'legal_share_amount_formatted': format_currency(detail.legal_share_amount),
+                'tax_before_addition': detail.tax_before_addition,
+                'tax_before_addition_formatted': format_currency(detail.tax_before_addition),
+                'two_fold_addition': detail.two_fold_addition,
+                'two_fold_addition_formatted': format_currency(detail.two_fold_addition),
+                'tax_after_addition': detail.tax_after_addition,
+                'tax_after_addition_formatted': format_currency(detail.tax_after_addition)
+            } for detail in tax_result.heir_tax_details
+        ]
+    }
+
+
+class TestResponseCompatibility(unittest.TestCase):
+    """シリアライザの応答と、ベースラインの jsonify による応答の互換性"""
+
+    def test_same_content_as_jsonify(self):
+        family_structure = dict(FAMILY_STRUCTURE, adopted_children_count=1, grandchild_adopted_count=1,
+                                non_heirs_count=1)
+        payload = {"taxable_amount": 312_345_678, "family_structure": family_structure}
+        response = app.test_client().post('/api/calculation/tax-amount', json=payload)
+
+        heirs = heir_cache.get(FamilyStructure(**family_structure)).heirs
+        tax_result = calculator.calculate_tax_by_legal_share(payload["taxable_amount"], list(heirs))
+        with app.app_context():
+            legacy = app.json.dumps({'success': True, 'result': legacy_tax_amount_result(
+                payload["taxable_amount"], tax_result)})
+        self.assertEqual(json.loads(legacy), json.loads(response.get_data()))
+
+    def test_wire_format(self):
+        # jsonify と異なり、キーは定義順のまま、日本語は UTF-8 のまま（エスケープしない）で返す
+        response = app.test_client().post('/api/calculation/heirs', json={"family_structure": FAMILY_STRUCTURE})
+        body = response.get_data()
+        self.assertTrue(body.startswith(b'{"success":true,"result":{"legal_heirs":[{"id":"spouse",'))
+        self.assertIn('"name":"配偶者"'.encode('utf-8'), body)
+        self.assertNotIn(b'\\u', body)
+
+
+class TestSerializedResponseSnapshots(unittest.TestCase):
+    """ベースライン（jsonify で応答していた実装）で記録した応答と、内容が一致する
+
+    test_fixtures/serialized_responses.json の baseline_body はベースラインの実装に同じリクエストを送って記録したもの。
+    現在の応答はキーの順序と日本語のエスケープがベースラインと異なる（test_wire_format）ため、
+    バイト列ではなく JSON として比べる。?format=compact はベースラインにはないため、
+    ベースラインの応答から _formatted のフィールドを除いたものと比べる。
+    """
+
+    @classmethod
+    def _without_formatted(cls, value):
+        if isinstance(value, dict):
+            return {key: cls._without_formatted(item) for key, item in value.items() if not key.endswith('_formatted')}
+        if isinstance(value, list):
+            return [cls._without_formatted(item) for item in value]
+        return value
+
+    def test_responses_match_baseline(self):
+        with open(os.path.join(os.path.dirname(__file__), 'test_fixtures', 'serialized_responses.json'),
+                  encoding='utf-8') as f:
+            snapshots = json.load(f)
+        client = app.test_client()
+        for snapshot in snapshots:
+            with self.subTest(path=snapshot["path"]):
+                response = client.post(snapshot["path"], json=snapshot["request"])
+                self.assertEqual(snapshot["status"], response.status_code)
+                expected = json.loads(snapshot["baseline_body"])
+                if 'format=compact' in snapshot["path"]:
+                    expected = self._without_formatted(expected)
+                self.assertEqual(expected, json.loads(response.get_data()))
+
+
+class TestTaxTableEndpoint(unittest.TestCase):
+    def setUp(self):
+        self.client = app.test_client()
+
+    def test_standard_json_with_all_versions(self):
+        response = self.client.get('/api/utilities/tax-table')
+        self.assertEqual(200, response.status_code)
+        # float('inf') を含まない標準のJSON
+        data = json.loads(response.get_data(as_text=True), parse_constant=self.fail)['data']
+        self.assertIsNone(data['tax_table'][-1]['max_amount'])
+        self.assertEqual('2015-01-01', data['current_version'])
+        self.assertEqual(['2003-01-01', '2015-01-01'], [s['version'] for s in data['schedules']])
+        self.assertEqual('2014-12-31', data['schedules'][0]['effective_to'])
+        self.assertEqual(0.55, data['schedules'][1]['tax_table'][-1]['tax_rate'])
+
+    def test_conditional_request(self):
+        response = self.client.get('/api/utilities/tax-table')
+        self.assertIn('max-age=86400', response.headers['Cache-Control'])
+        self.assertFalse(response.headers['ETag'].startswith('W/'))
+        not_modified = self.client.get('/api/utilities/tax-table', headers={'If-None-Match': response.headers['ETag']})
+        self.assertEqual(304, not_modified.status_code)
+        self.assertEqual(b'', not_modified.get_data())
+
+    def test_version(self):
+        response = self.client.get('/api/utilities/tax-table?version=2003-01-01')
+        self.assertEqual(200, response.status_code)
+        self.assertIn('immutable', response.headers['Cache-Control'])
+        self.assertEqual(50_000_000, response.get_json()['data']['basic_deduction_base'])
+        self.assertEqual(404, self.client.get('/api/utilities/tax-table?version=1999-01-01').status_code)
+
+
+class TestFullCalculationEndpoint(unittest.TestCase):
+    def setUp(self):
+        self.client = app.test_client()
+
+    def test_matches_three_sequential_calls(self):
+        family = dict(FAMILY_STRUCTURE, non_heirs_count=1)
+        taxable_amount = 300_000_000
+        division = {"mode": "percentage", "rounding_method": "floor",
+                    "percentages": {"spouse": 40, "child_1": 25, "child_2": 25, "non_heir_1": 10}}
+
+        heirs = self.client.post('/api/calculation/heirs', json={"family_structure": family}).get_json()
+        tax = self.client.post('/api/calculation/tax-amount', json={
+            "taxable_amount": taxable_amount, "family_structure": family}).get_json()
+        actual = self.client.post('/api/calculation/actual-division', json=dict(
+            division, total_amount=taxable_amount, heirs=heirs["result"]["legal_heirs"],
+            total_tax_amount=tax["result"]["total_tax_amount"])).get_json()
+
+        response = self.client.post('/api/calculation/full', json={
+            "taxable_amount": taxable_amount, "family_structure": family, "division": division})
+        self.assertEqual(200, response.status_code)
+        result = response.get_json()["result"]
+        self.assertEqual(heirs["result"], result["heirs"])
+        self.assertEqual(tax["result"], result["tax_amount"])
+        self.assertEqual(actual["result"], result["actual_division"])
+
+    def test_without_division(self):
+        result = self.client.post('/api/calculation/full', json={
+            "taxable_amount": 100_000_000, "family_structure": FAMILY_STRUCTURE}).get_json()["result"]
+        self.assertIsNone(result["actual_division"])
+        self.assertEqual(3, result["heirs"]["total_heirs_count"])
+
+    def test_division_validation_error(self):
+        response = self.client.post('/api/calculation/full', json={
+            "taxable_amount": 100_000_000, "family_structure": FAMILY_STRUCTURE,
+            "division": {"mode": "amount", "amounts": {"spouse": 100_000_000}}})
+        self.assertEqual(400, response.status_code)
+        codes = {detail["code"] for detail in response.get_json()["error"]["details"]}
+        self.assertEqual({"MISSING_HEIR"}, codes)
+
+
+
+class TestWhatIfEndpoint(unittest.TestCase):
+    BASE = {
+        "taxable_amount": 300_000_000,
+        "family_structure": FAMILY_STRUCTURE,
+        "division": {"mode": "amount",
+                     "amounts": {"spouse": 150_000_000, "child_1": 100_000_000, "child_2": 50_000_000}},
+    }
+
+    def setUp(self):
+        self.client = app.test_client()
+
+    def full(self, taxable_amount, family_structure, division, inheritance_date=None):
+        return self.client.post('/api/calculation/full', json={
+            "taxable_amount": taxable_amount, "family_structure": family_structure, "division": division,
+            "inheritance_date": inheritance_date
+        }).get_json()["result"]
+
+    def test_variants_match_full_endpoint(self):
+        response = self.client.post('/api/calculation/what-if?format=compact', json=dict(self.BASE, perturbations=[
+            {"label": "財産1割増", "taxable_amount_change_rate": 0.1},
+            {"label": "配偶者60%", "spouse_percentage": 60},
+            {"label": "養子1人追加・配偶者50%",
+             "family_structure_delta": {"children_count": 1, "adopted_children_count": 1}, "spouse_percentage": 50},
+        ]))
+        self.assertEqual(200, response.status_code)
+        result = response.get_json()["result"]
+        base = result["base"]
+        larger, spouse_60, adopted = result["variants"]
+
+        self.assertEqual(330_000_000, larger["taxable_amount"])
+        expected = self.full(330_000_000, FAMILY_STRUCTURE, {
+            "mode": "amount", "amounts": {"spouse": 165_000_000, "child_1": 110_000_000, "child_2": 55_000_000}})
+        self.assertEqual(expected["tax_amount"]["total_tax_amount"], larger["total_tax_amount"])
+        self.assertEqual(expected["actual_division"]["total_tax_amount"], larger["actual_division"]["total_tax_amount"])
+        self.assertEqual(larger["total_tax_amount"] - base["total_tax_amount"], larger["difference"]["total_tax_amount"])
+
+        expected = self.full(300_000_000, FAMILY_STRUCTURE, {
+            "mode": "amount", "amounts": {"spouse": 180_000_000, "child_1": 80_000_000, "child_2": 40_000_000}})
+        self.assertEqual(expected["actual_division"]["total_tax_amount"], spouse_60["actual_division"]["total_tax_amount"])
+
+        family = dict(FAMILY_STRUCTURE, children_count=3, adopted_children_count=1)
+        expected = self.full(300_000_000, family, {
+            "mode": "amount",
+            "amounts": {"spouse": 150_000_000, "child_1": 50_000_000, "child_2": 50_000_000, "child_3": 50_000_000}})
+        self.assertEqual(4, adopted["total_heirs_count"])
+        self.assertEqual(expected["tax_amount"]["total_tax_amount"], adopted["total_tax_amount"])
+        self.assertEqual(expected["actual_division"]["total_tax_amount"], adopted["actual_division"]["total_tax_amount"])
+
+    def test_inheritance_date_applies_to_every_variant(self):
+        result = self.client.post('/api/calculation/what-if', json=dict(
+            self.BASE, inheritance_date="2014-06-01", perturbations=[
+                {"label": "財産1割増", "taxable_amount_change_rate": 0.1},
+                {"label": "配偶者60%", "spouse_percentage": 60},
+            ])).get_json()["result"]
+        larger, spouse_60 = result["variants"]
+        for variant, amount, amounts in (
+            (larger, 330_000_000, {"spouse": 165_000_000, "child_1": 110_000_000, "child_2": 55_000_000}),
+            (spouse_60, 300_000_000, {"spouse": 180_000_000, "child_1": 80_000_000, "child_2": 40_000_000}),
+        ):
+            expected = self.full(amount, FAMILY_STRUCTURE, {"mode": "amount", "amounts": amounts}, "2014-06-01")
+            self.assertEqual(80_000_000, variant["basic_deduction"])
+            self.assertEqual(expected["tax_amount"]["total_tax_amount"], variant["total_tax_amount"])
+            self.assertEqual(expected["actual_division"]["heir_details"], variant["actual_division"]["heir_details"])
+
+    def test_variant_errors_do_not_stop_others(self):
+        result = self.client.post('/api/calculation/what-if', json=dict(self.BASE, perturbations=[
+            {"label": "子供3人減", "family_structure_delta": {"children_count": -3}},
+            {"label": "子供1人追加", "family_structure_delta": {"children_count": 1}},
+            {"label": "課税価格2億円", "taxable_amount": 200_000_000},
+        ])).get_json()["result"]
+        fewer, more, smaller = result["variants"]
+        self.assertFalse(fewer["success"])
+        self.assertFalse(more["success"])
+        self.assertEqual("MISSING_HEIR", more["error"]["details"][0]["code"])
+        self.assertTrue(smaller["success"])
+
+    def test_heirs_are_determined_once_per_family(self):
+        heir_cache.clear()
+        result_cache.clear()
+        self.client.post('/api/calculation/what-if', json=dict(self.BASE, perturbations=[
+            {"taxable_amount_change_rate": rate / 100} for rate in range(-20, 21)
+        ]))
+        self.assertEqual(1, heir_cache.stats()['misses'])
+
+    def test_invalid_requests(self):
+        response = self.client.post('/api/calculation/what-if', json=dict(self.BASE, perturbations=[
+            {"spouse_percentage": 120}]))
+        self.assertEqual(400, response.status_code)
+        self.assertEqual("perturbations[0].spouse_percentage", response.get_json()["error"]["details"][0]["field"])
+
+        response = self.client.post('/api/calculation/what-if', json=dict(self.BASE, perturbations=[{}] * 201))
+        self.assertEqual(400, response.status_code)
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+目標税額からの課税価格逆算のテスト
+"""
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'api'))
+
+from models.inheritance import DivisionInput, FamilyStructure
+from services.tax_calculator import InheritanceTaxCalculator
+from services.heir_cache import HeirCache
+from services.inverse_solver import InverseTaxSolver
+
+
+def make_family(**overrides):
+    fs_data = {
+        "spouse_exists": False, "children_count": 0, "adopted_children_count": 0,
+        "grandchild_adopted_count": 0, "parents_alive": 0, "grandparents_alive": 0,
+        "siblings_count": 0, "half_siblings_count": 0, "non_heirs_count": 0
+    }
+    fs_data.update(overrides)
+    return FamilyStructure(**fs_data)
+
+
+class TestInverseTaxSolver(unittest.TestCase):
+    def setUp(self):
+        self.calculator = InheritanceTaxCalculator()
+        self.cache = HeirCache(self.calculator)
+        self.solver = InverseTaxSolver()
+
+    def legal_tax(self, heirs, amount):
+        return self.calculator.calculate_tax_by_legal_share(amount, heirs).total_tax_amount
+
+    def test_legal_share_threshold_is_exact(self):
+        rng = random.Random(11)
+        for fs in (make_family(spouse_exists=True, children_count=2),
+                   make_family(siblings_count=2, half_siblings_count=1),
+                   make_family(spouse_exists=True, parents_alive=1)):
+            heirs = self.calculator.determine_legal_heirs(fs)
+            curve = self.cache.get_tax_curve(fs)
+            for target in [0, 1, 1_000_000, 6_300_000] + [rng.randrange(0, 500_000_000) for _ in range(30)]:
+                solution = self.solver.solve_legal_share(curve, target)
+                amount = solution.max_taxable_amount
+                self.assertLessEqual(self.legal_tax(heirs, amount), target)
+                self.assertGreater(self.legal_tax(heirs, amount + 1), target)
+                self.assertEqual(self.legal_tax(heirs, amount), solution.total_tax_amount)
+
+    def test_zero_target_is_basic_deduction_or_more(self):
+        fs = make_family(spouse_exists=True, children_count=2)
+        solution = self.solver.solve_legal_share(self.cache.get_tax_curve(fs), 0)
+        self.assertGreaterEqual(solution.max_taxable_amount, 48_000_000)
+
+    def test_division_threshold_is_exact(self):
+        fs = make_family(spouse_exists=True, children_count=2, non_heirs_count=1)
+        heirs = self.calculator.determine_legal_heirs(fs)
+        curve = self.cache.get_tax_curve(fs)
+        percentages = {"spouse": 60, "child_1": 15, "child_2": 15, "non_heir_1": 10}
+
+        def division_tax(amount):
+            amounts = self.calculator._convert_percentage_to_amount(percentages, amount, 'round')
+            return self.calculator.calculate_actual_division(DivisionInput(
+                mode='amount', total_amount=amount, heirs=heirs,
+                total_tax_amount=self.legal_tax(heirs, amount), amounts=amounts
+            )).total_tax_amount
+
+        for target in (5_000_000, 30_000_000, 123_456_789):
+            solution = self.solver.solve_division(curve, heirs, percentages, target)
+            self.assertLessEqual(division_tax(solution.max_taxable_amount), target)
+            self.assertGreater(division_tax(solution.max_taxable_amount + 1), target)
+
+    def test_unbounded_when_spouse_takes_everything(self):
+        fs = make_family(spouse_exists=True)
+        heirs = self.calculator.determine_legal_heirs(fs)
+        solution = self.solver.solve_division(self.cache.get_tax_curve(fs), heirs, {"spouse": 100}, 0)
+        self.assertIsNone(solution.max_taxable_amount)
+
+    def test_negative_target(self):
+        with self.assertRaises(ValueError):
+            self.solver.solve_legal_share(self.cache.get_tax_curve(make_family(children_count=1)), -1)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+一括計算ジョブ（services.job_queue / routes.jobs）のテスト
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+import unittest
+
+# ジョブAPIのデータベースは一時ディレクトリに作る（routes.jobs は初回リクエスト時に読み込まれる）
+_DATABASE_DIRECTORY = tempfile.TemporaryDirectory()
+os.environ['INHERITANCE_JOB_DATABASE'] = os.path.join(_DATABASE_DIRECTORY.name, 'jobs.db')
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'api'))
+
+from main import app
+from services.job_queue import (
+    JOB_FAILED, JOB_QUEUED, JOB_RECEIVING, JOB_RUNNING, JOB_SUCCEEDED, JobQueue, JobStore
+)
+
+FAMILY_STRUCTURE = {"spouse_exists": True, "children_count": 2}
+
+
+def double(payload, line_number, options):
+    """テスト用の1行分の計算（数値を2倍にする。負の値はエラー）"""
+    value = int(payload)
+    if value < 0:
+        return False, json.dumps({"line": line_number, "success": False}).encode()
+    return True, json.dumps({"line": line_number, "value": value * options.get('factor', 2)}).encode()
+
+
+def wait_until_finished(get_status, timeout=10.0):
+    """get_status() が完了（succeeded / failed）を返すまで待つ"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if get_status() in ('succeeded', 'failed'):
+            return
+        time.sleep(0.01)
+    raise AssertionError("ジョブが終わりません")
+
+
+class TestJobQueue(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'jobs.db')
+        self.store = JobStore(self.path)
+        self.addCleanup(self.store.close)
+
+    def start_queue(self, **options):
+        queue = JobQueue(JobStore(self.path), double, poll_interval=0.01, **options)
+        queue.start()
+        self.addCleanup(queue.stop)
+        return queue
+
+    def test_runs_jobs_in_chunks(self):
+        queue = self.start_queue(workers=2, chunk_size=3)
+        job = queue.submit([(i, str(i)) for i in (1, 2, 4, 5, 6, 7, 8)] + [(9, '-1')], {'factor': 3})
+        self.assertEqual(8, job.total)
+
+        wait_until_finished(lambda: self.store.get(job.id).status)
+        job = self.store.get(job.id)
+        self.assertEqual((JOB_SUCCEEDED, 8, 1, 1.0), (job.status, job.processed, job.failed, job.progress))
+        first_page = self.store.results(job.id, limit=5)
+        self.assertEqual([1, 2, 4, 5, 6], [line for line, _ in first_page])
+        self.assertEqual(12, json.loads(first_page[2][1])["value"])
+        self.assertEqual([7, 8, 9], [line for line, _ in self.store.results(job.id, after=6)])
+
+    def test_resumes_after_worker_stops(self):
+        job = self.store.submit([(i, str(i)) for i in range(1, 11)])
+
+        # ワーカーが4行分を保存したところで止まった状態
+        claimed = self.store.claim()
+        self.assertEqual(JOB_RUNNING, claimed.status)
+        self.assertTrue(self.store.save_chunk(claimed, [(i, True, b'{}') for i in range(1, 5)]))
+
+        # 新しいワーカーはハートビートの途絶えたジョブを続きから実行する
+        self.start_queue(workers=1, chunk_size=4, stale_after=0)
+        wait_until_finished(lambda: self.store.get(job.id).status)
+        job = self.store.get(job.id)
+        self.assertEqual((JOB_SUCCEEDED, 10), (job.status, job.processed))
+        results = self.store.results(job.id, limit=100)
+        self.assertEqual(list(range(1, 11)), [line for line, _ in results])
+        self.assertEqual(b'{}', results[3][1])
+        self.assertEqual(10, json.loads(results[4][1])["value"])
+
+        # 古いワーカーの保存は受け付けない
+        self.assertFalse(self.store.save_chunk(claimed, [(5, True, b'{}')]))
+
+    def test_stop_releases_job(self):
+        job = self.store.submit([(1, '1')])
+        queue = JobQueue(JobStore(self.path), double, workers=1)
+        queue._stop.set()
+        queue.execute(self.store.claim())
+        self.assertEqual(JOB_QUEUED, self.store.get(job.id).status)
+
+
+    def test_submit_rejected_after_receiving_job_is_failed(self):
+        now = [1000.0]
+        store = JobStore(self.path, clock=lambda: now[0])
+        self.addCleanup(store.close)
+
+        def lines():
+            yield 1, '1'
+            # 受信が止まっている間に、ワーカーが受信中のジョブを失敗にする
+            now[0] += 60
+            self.assertIsNone(store.claim(stale_after=60))
+            yield 2, '2'
+
+        with self.assertRaises(RuntimeError):
+            store.submit(lines())
+        job_id = store._connection().execute('SELECT id FROM jobs').fetchone()[0]
+        job = store.get(job_id)
+        self.assertEqual((JOB_FAILED, '入力の受信が途中で止まりました'), (job.status, job.error))
+
+    def test_stale_receiving_job_is_failed_by_claim(self):
+        now = [1000.0]
+        store = JobStore(self.path, clock=lambda: now[0])
+        self.addCleanup(store.close)
+        with store._transaction() as connection:
+            connection.execute(
+                'INSERT INTO jobs (id, status, options, created_at, heartbeat_at) VALUES (?, ?, ?, ?, ?)',
+                ('crashed', JOB_RECEIVING, '{}', now[0], now[0])
+            )
+            connection.execute("INSERT INTO job_inputs (job_id, line, payload) VALUES ('crashed', 1, '1')")
+
+        self.assertIsNone(store.claim(stale_after=60))
+        self.assertEqual(JOB_RECEIVING, store.get('crashed').status)
+        now[0] += 60
+        self.assertIsNone(store.claim(stale_after=60))
+        job = store.get('crashed')
+        self.assertEqual(JOB_FAILED, job.status)
+        self.assertIsNotNone(job.error)
+        self.assertEqual(0, store._connection().execute('SELECT COUNT(*) FROM job_inputs').fetchone()[0])
+
+    def test_slow_upload_keeps_heartbeat(self):
+        now = [1000.0]
+        store = JobStore(self.path, clock=lambda: now[0])
+        self.addCleanup(store.close)
+
+        def lines():
+            # 1000行に満たない入力が60秒以上かけて届いても、ワーカーに失敗にされない
+            for line in range(1, 8):
+                yield line, str(line)
+                now[0] += 10
+                self.assertIsNone(store.claim(stale_after=60))
+
+        job = store.submit(lines())
+        self.assertEqual((JOB_QUEUED, 7), (job.status, job.total))
+
+    def test_purge_finished_jobs(self):
+        now = [1000.0]
+        store = JobStore(self.path, clock=lambda: now[0])
+        self.addCleanup(store.close)
+        finished = store.submit([(1, '1')])
+        store.finish(store.claim())
+        queued = store.submit([(1, '2')])
+
+        now[0] += 100
+        self.assertEqual(0, store.purge_finished(retention=101))
+        self.assertEqual(1, store.purge_finished(retention=100))
+        self.assertIsNone(store.get(finished.id))
+        self.assertEqual(JOB_QUEUED, store.get(queued.id).status)
+        self.assertEqual([], store.results(finished.id))
+
+    def test_worker_sweeps_expired_jobs(self):
+        # 完了したジョブは、保存期間（0秒）を過ぎるとワーカーが削除する
+        queue = self.start_queue(retention=0, sweep_interval=0)
+        job = queue.submit([(1, '1')])
+        deadline = time.monotonic() + 10
+        while self.store.get(job.id) is not None:
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.01)
+
+    def test_delete_running_job(self):
+        job = self.store.submit([(1, '1'), (2, '2')])
+        claimed = self.store.claim()
+        self.assertTrue(self.store.delete(job.id))
+        self.assertFalse(self.store.delete(job.id))
+        self.assertFalse(self.store.save_chunk(claimed, [(1, True, b'1')]))
+        self.assertEqual([], self.store.results(job.id))
+
+
+class TestJobEndpoints(unittest.TestCase):
+    def setUp(self):
+        self.client = app.test_client()
+
+    def get_job(self, job_id):
+        response = self.client.get(f'/api/jobs/{job_id}')
+        self.assertEqual(200, response.status_code)
+        return response.get_json()["result"]
+
+    def test_submit_poll_and_page_through_results(self):
+        lines = [json.dumps({"id": i, "taxable_amount": 100_000_000 + i * 1_000_000,
+                             "family_structure": FAMILY_STRUCTURE}) for i in range(5)]
+        lines.insert(2, "{not json")
+        body = ("\n".join(lines) + "\n").encode('utf-8')
+
+        response = self.client.post('/api/jobs', data=body, content_type='application/x-ndjson')
+        self.assertEqual(202, response.status_code)
+        job_id = response.get_json()["result"]["job_id"]
+        self.assertEqual(f'/api/jobs/{job_id}', response.headers['Location'])
+
+        wait_until_finished(lambda: self.get_job(job_id)["status"])
+        job = self.get_job(job_id)
+        self.assertEqual(('succeeded', 6, 1, 1.0), (job["status"], job["processed"], job["failed"], job["progress"]))
+
+        items, after = [], 0
+        while after is not None:
+            page = self.client.get(f'/api/jobs/{job_id}/results?after={after}&limit=4').get_json()["result"]
+            items += page["items"]
+            after = page["next_after"]
+
+        expected = [json.loads(line) for line in self.client.post(
+            '/api/calculation/batch', data=body, content_type='application/x-ndjson').get_data(as_text=True).splitlines()]
+        self.assertEqual(expected, items)
+
+        response = self.client.delete(f'/api/jobs/{job_id}')
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(job_id, response.get_json()["result"]["job_id"])
+        self.assertEqual(404, self.client.get(f'/api/jobs/{job_id}').status_code)
+        self.assertEqual(404, self.client.delete(f'/api/jobs/{job_id}').status_code)
+
+    def test_errors(self):
+        self.assertEqual(404, self.client.get('/api/jobs/unknown').status_code)
+        self.assertEqual(404, self.client.get('/api/jobs/unknown/results').status_code)
+
+        job_id = self.client.post('/api/jobs', data=b'').get_json()["result"]["job_id"]
+        response = self.client.get(f'/api/jobs/{job_id}/results?limit=0&after=x')
+        self.assertEqual(400, response.status_code)
+        self.assertEqual(['after', 'limit'], [detail["field"] for detail in response.get_json()["error"]["details"]])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
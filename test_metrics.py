@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+処理時間の計測（Server-Timing）とメトリクスAPIのテスト
+"""
+import json
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'api'))
+
+from main import app
+from routes.inheritance import result_cache
+from services.metrics import Histogram, heirs_count_label, metrics
+
+FAMILY_STRUCTURE = {"spouse_exists": True, "children_count": 2}
+TAX_AMOUNT_PAYLOAD = {"taxable_amount": 100_000_000, "family_structure": FAMILY_STRUCTURE}
+
+
+class TestHistogram(unittest.TestCase):
+    def test_render_is_cumulative(self):
+        histogram = Histogram('test_seconds', 'Test', ('endpoint',), buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 3.0):
+            histogram.observe(('/a',), value)
+        self.assertEqual([
+            '# HELP test_seconds Test',
+            '# TYPE test_seconds histogram',
+            'test_seconds_bucket{endpoint="/a",le="0.1"} 2',
+            'test_seconds_bucket{endpoint="/a",le="1.0"} 3',
+            'test_seconds_bucket{endpoint="/a",le="+Inf"} 4',
+            'test_seconds_sum{endpoint="/a"} 3.65',
+            'test_seconds_count{endpoint="/a"} 4',
+        ], histogram.render())
+
+    def test_heirs_count_label(self):
+        self.assertEqual('3', heirs_count_label(3))
+        self.assertEqual('6-10', heirs_count_label(6))
+        self.assertEqual('21-50', heirs_count_label(50))
+        self.assertEqual('51+', heirs_count_label(400))
+
+
+class TestRequestTiming(unittest.TestCase):
+    def setUp(self):
+        self.client = app.test_client()
+        self.enabled = metrics.enabled
+        metrics.clear()
+        result_cache.clear()
+
+    def tearDown(self):
+        metrics.enabled = self.enabled
+        metrics.clear()
+
+    def test_server_timing_header(self):
+        metrics.enabled = True
+        response = self.client.post('/api/calculation/tax-amount', json=TAX_AMOUNT_PAYLOAD)
+        self.assertEqual(200, response.status_code)
+        phases = [entry.split(';')[0] for entry in response.headers['Server-Timing'].split(', ')]
+        self.assertEqual(['parse', 'heirs', 'tax', 'serialize', 'total'], phases)
+
+    def test_nested_phases_are_not_double_counted(self):
+        metrics.enabled = True
+        # 法定相続人判定のキャッシュミス時は heirs の中で determine_legal_heirs（heirs）が呼ばれる
+        response = self.client.post('/api/calculation/heirs', json={
+            "family_structure": {"siblings_count": 7, "half_siblings_count": 5}})
+        self.assertEqual(200, response.status_code)
+        phases = [entry.split(';')[0] for entry in response.headers['Server-Timing'].split(', ')]
+        self.assertEqual(1, phases.count('heirs'))
+
+    def test_histograms_per_endpoint_and_heir_count(self):
+        metrics.enabled = True
+        for i in range(3):
+            self.client.post('/api/calculation/tax-amount', json=dict(TAX_AMOUNT_PAYLOAD, taxable_amount=100_000_000 + i))
+        self.assertEqual(3, metrics.request_duration.count(('/api/calculation/tax-amount', '200')))
+        self.assertEqual(3, metrics.request_duration_by_heirs.count(('/api/calculation/tax-amount', '3')))
+        self.assertEqual(3, metrics.phase_duration.count(('/api/calculation/tax-amount', 'tax')))
+
+        response = self.client.get('/api/metrics')
+        self.assertEqual(200, response.status_code)
+        self.assertEqual('text/plain', response.mimetype)
+        body = response.get_data(as_text=True)
+        self.assertIn('# TYPE inheritance_request_duration_seconds histogram', body)
+        self.assertIn('inheritance_request_duration_by_heirs_seconds_count'
+                      '{endpoint="/api/calculation/tax-amount",heirs="3"} 3', body)
+        self.assertIn('# TYPE inheritance_heir_cache_hits_total counter', body)
+        # メトリクスAPI自体は計測しない
+        self.assertNotIn('/api/metrics', body)
+
+    def test_streamed_batch_is_timed_until_the_body_is_sent(self):
+        metrics.enabled = True
+        body = '\n'.join(json.dumps(dict(TAX_AMOUNT_PAYLOAD, taxable_amount=100_000_000 + i)) for i in range(50))
+        response = self.client.post('/api/calculation/batch', data=body, content_type='application/x-ndjson')
+        self.assertNotIn('Server-Timing', response.headers)
+        # 本文を送り終えるまでは集計しない
+        self.assertEqual(0, metrics.request_duration.count(('/api/calculation/batch', '200')))
+        self.assertEqual(50, len(response.get_data().splitlines()))
+        response.close()
+        self.assertEqual(1, metrics.request_duration.count(('/api/calculation/batch', '200')))
+        # 生成中の計算（heirs・tax・serialize のフェーズ）も含まれる
+        self.assertEqual(1, metrics.phase_duration.count(('/api/calculation/batch', 'tax')))
+
+    def test_disabled_records_nothing(self):
+        metrics.enabled = False
+        response = self.client.post('/api/calculation/tax-amount', json=TAX_AMOUNT_PAYLOAD)
+        self.assertEqual(200, response.status_code)
+        self.assertNotIn('Server-Timing', response.headers)
+        self.assertEqual(0, metrics.request_duration.count(('/api/calculation/tax-amount', '200')))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
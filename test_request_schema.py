@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+リクエストの解析・検証（routes.schema）のテスト
+"""
+import os
+import sys
+import unittest
+from datetime import date
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'api'))
+
+from main import app
+from models.inheritance import FamilyStructure, HeirType, RelationshipType
+from routes.schema import ACTUAL_DIVISION_REQUEST, TAX_AMOUNT_REQUEST
+
+FAMILY_STRUCTURE = {"spouse_exists": True, "children_count": 2}
+
+
+class TestRequestSchema(unittest.TestCase):
+    def test_defaults_and_models(self):
+        value, errors = TAX_AMOUNT_REQUEST.parse({
+            "taxable_amount": 100_000_000.0, "family_structure": FAMILY_STRUCTURE,
+            "inheritance_date": "2024-05-01"
+        })
+        self.assertEqual([], errors)
+        self.assertEqual(100_000_000, value["taxable_amount"])
+        self.assertIsInstance(value["taxable_amount"], int)
+        self.assertEqual(FamilyStructure(
+            spouse_exists=True, children_count=2, adopted_children_count=0, grandchild_adopted_count=0,
+            parents_alive=0, grandparents_alive=0, siblings_count=0, half_siblings_count=0
+        ), value["family_structure"])
+        self.assertEqual(date(2024, 5, 1), value["inheritance_date"])
+
+    def test_null_is_missing(self):
+        value, errors = TAX_AMOUNT_REQUEST.parse({
+            "taxable_amount": 1, "family_structure": {"spouse_exists": True, "children_count": None},
+            "inheritance_date": None
+        })
+        self.assertEqual([], errors)
+        self.assertEqual(0, value["family_structure"].children_count)
+        self.assertIsNone(value["inheritance_date"])
+
+    def test_reports_every_error(self):
+        value, errors = TAX_AMOUNT_REQUEST.parse({
+            "taxable_amount": "1億", "inheritance_date": "2024/05/01",
+            "family_structure": {"spouse_exists": 1, "children_count": "2", "parents_alive": -1}
+        })
+        self.assertIsNone(value)
+        self.assertEqual([
+            ("taxable_amount", "INVALID_TYPE"),
+            ("spouse_exists", "INVALID_TYPE"),
+            ("children_count", "INVALID_TYPE"),
+            ("parents_alive", "INVALID_VALUE"),
+            ("inheritance_date", "INVALID_VALUE"),
+        ], [(error.field, error.code) for error in errors])
+
+    def test_heirs_and_nested_paths(self):
+        heir = {"id": "spouse", "name": "配偶者", "type": "spouse", "relationship": "配偶者",
+                "inheritance_share": 0.5}
+        value, errors = ACTUAL_DIVISION_REQUEST.parse({
+            "mode": "amount", "amounts": {"spouse": 1_000}, "heirs": [heir]
+        })
+        self.assertEqual([], errors)
+        parsed = value.heirs[0]
+        self.assertEqual((HeirType.SPOUSE, RelationshipType.SPOUSE), (parsed.heir_type, parsed.relationship))
+        self.assertEqual((1, 2), (parsed.share_numerator, parsed.share_denominator))
+
+        _, errors = ACTUAL_DIVISION_REQUEST.parse({
+            "mode": "shares", "amounts": {"spouse": -1, "child_1": "x"},
+            "heirs": [heir, dict(heir, type="cousin", inheritance_share=None), 3]
+        })
+        self.assertEqual([
+            "mode", "amounts.spouse", "amounts.child_1", "heirs[1].type", "heirs[1].inheritance_share", "heirs[2]"
+        ], [error.field for error in errors])
+
+    def test_non_finite_numbers(self):
+        heir = {"id": "spouse", "name": "配偶者", "type": "spouse", "relationship": "配偶者",
+                "inheritance_share": float("nan")}
+        _, errors = ACTUAL_DIVISION_REQUEST.parse({
+            "mode": "percentage", "percentages": {"spouse": float("inf"), "child_1": float("nan"), "child_2": 50},
+            "heirs": [heir]
+        })
+        self.assertEqual([
+            ("percentages.spouse", "INVALID_TYPE"),
+            ("percentages.child_1", "INVALID_TYPE"),
+            ("heirs[0].inheritance_share", "INVALID_TYPE"),
+        ], [(error.field, error.code) for error in errors])
+
+    def test_not_an_object(self):
+        _, errors = TAX_AMOUNT_REQUEST.parse(None)
+        self.assertEqual(["request"], [error.field for error in errors])
+
+
+class TestRouteValidation(unittest.TestCase):
+    def setUp(self):
+        self.client = app.test_client()
+
+    def test_type_error_is_400(self):
+        response = self.client.post('/api/calculation/heirs', json={
+            "family_structure": {"spouse_exists": True, "children_count": "2", "siblings_count": -1}})
+        self.assertEqual(400, response.status_code)
+        error = response.get_json()["error"]
+        self.assertEqual("VALIDATION_ERROR", error["code"])
+        self.assertEqual(["children_count", "siblings_count"], [detail["field"] for detail in error["details"]])
+
+    def test_single_error_message(self):
+        response = self.client.post('/api/calculation/tax-amount', json={
+            "taxable_amount": 0, "family_structure": FAMILY_STRUCTURE})
+        self.assertEqual(400, response.status_code)
+        self.assertEqual('課税価格の合計額は正の値である必要があります', response.get_json()["error"]["message"])
+
+    def test_invalid_json_body(self):
+        response = self.client.post('/api/calculation/tax-amount', data='{', content_type='application/json')
+        self.assertEqual(400, response.status_code)
+        self.assertEqual("request", response.get_json()["error"]["details"][0]["field"])
+
+    def test_analysis_routes(self):
+        response = self.client.post('/api/simulation/monte-carlo', json={
+            "family_structure": FAMILY_STRUCTURE, "sample_count": 0, "seed": "x"})
+        self.assertEqual(400, response.status_code)
+        self.assertEqual(["sample_count", "seed"],
+                         [detail["field"] for detail in response.get_json()["error"]["details"]])
+
+    def test_monte_carlo_assets(self):
+        response = self.client.post('/api/simulation/monte-carlo', json={
+            "family_structure": FAMILY_STRUCTURE, "sample_count": 10,
+            "assets": ["x", {"distribution": "cauchy"}, {"distribution": "normal", "mean": "1", "std": -1}]})
+        self.assertEqual(400, response.status_code)
+        self.assertEqual(["assets[0]", "assets[1].distribution", "assets[2].mean", "assets[2].std"],
+                         [detail["field"] for detail in response.get_json()["error"]["details"]])
+
+        response = self.client.post('/api/simulation/monte-carlo', json={
+            "family_structure": FAMILY_STRUCTURE, "sample_count": 10, "seed": 1,
+            "assets": [{"name": "預金", "value": 30_000_000}, {"distribution": "uniform", "low": 1, "high": 2}]})
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(30_000_001, response.get_json()["result"]["taxable_amount"]["min"])
+
+    def test_monte_carlo_distribution_params(self):
+        for asset in ({"distribution": "lognormal", "mean": -5, "std": 1},
+                      {"distribution": "lognormal", "mean": 0, "std": 1},
+                      {"distribution": "lognormal", "mean": 1},
+                      {"distribution": "uniform", "low": 2, "high": 1},
+                      {"distribution": "triangular", "low": 1, "mode": 3, "high": 2},
+                      {"distribution": "fixed"},
+                      {"distribution": "normal", "mean": 1e300, "std": 1e300}):
+            with self.subTest(**asset):
+                response = self.client.post('/api/simulation/monte-carlo', json={
+                    "family_structure": FAMILY_STRUCTURE, "sample_count": 10, "assets": [{"value": 1}, asset]})
+                self.assertEqual(400, response.status_code)
+                self.assertEqual("VALIDATION_ERROR", response.get_json()["error"]["code"])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
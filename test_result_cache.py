@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+計算結果キャッシュ（ETag / 304）のテスト
+"""
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'api'))
+
+from main import app
+from routes.inheritance import result_cache
+from services.result_cache import ResultCache, request_key
+
+FAMILY_STRUCTURE = {"spouse_exists": True, "children_count": 2}
+TAX_AMOUNT_PAYLOAD = {"taxable_amount": 100_000_000, "family_structure": FAMILY_STRUCTURE}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestResultCache(unittest.TestCase):
+    def test_request_key_is_canonical(self):
+        self.assertEqual(request_key('tax-amount', {'a': 1, 'b': {'x': 1, 'y': 2}}),
+                         request_key('tax-amount', {'b': {'y': 2, 'x': 1}, 'a': 1}))
+        self.assertNotEqual(request_key('tax-amount', {'a': 1}), request_key('actual-division', {'a': 1}))
+
+    def test_ttl_and_eviction(self):
+        clock = FakeClock()
+        cache = ResultCache(maxsize=2, ttl=10, clock=clock)
+        cache.put('a', b'1')
+        cache.put('b', b'2')
+        self.assertEqual(b'1', cache.get('a'))
+        cache.put('c', b'3')  # 最も古く使われた b が追い出される
+        self.assertIsNone(cache.get('b'))
+        clock.now = 10
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(
+            {'hits': 1, 'misses': 2, 'evictions': 1, 'expirations': 1, 'not_modified': 0, 'size': 1, 'maxsize': 2},
+            cache.stats()
+        )
+
+
+class TestConditionalRequests(unittest.TestCase):
+    def setUp(self):
+        self.client = app.test_client()
+        result_cache.clear()
+
+    def test_etag_and_not_modified(self):
+        first = self.client.post('/api/calculation/tax-amount', json=TAX_AMOUNT_PAYLOAD)
+        self.assertEqual(200, first.status_code)
+        etag = first.headers['ETag']
+
+        # 家族構成の省略値を明示しても同じ入力として扱う
+        explicit = dict(TAX_AMOUNT_PAYLOAD, family_structure=dict(FAMILY_STRUCTURE, parents_alive=0))
+        second = self.client.post('/api/calculation/tax-amount', json=explicit)
+        self.assertEqual(etag, second.headers['ETag'])
+        self.assertEqual(first.get_data(), second.get_data())
+
+        not_modified = self.client.post('/api/calculation/tax-amount', json=TAX_AMOUNT_PAYLOAD,
+                                        headers={'If-None-Match': etag})
+        self.assertEqual(304, not_modified.status_code)
+        self.assertEqual(b'', not_modified.get_data())
+        self.assertEqual(etag, not_modified.headers['ETag'])
+
+        stats = result_cache.stats()
+        self.assertEqual((1, 1, 1), (stats['hits'], stats['misses'], stats['not_modified']))
+
+    def test_different_input_or_format_changes_etag(self):
+        etag = self.client.post('/api/calculation/tax-amount', json=TAX_AMOUNT_PAYLOAD).headers['ETag']
+        other = self.client.post('/api/calculation/tax-amount', json=dict(TAX_AMOUNT_PAYLOAD, taxable_amount=1))
+        compact = self.client.post('/api/calculation/tax-amount?format=compact', json=TAX_AMOUNT_PAYLOAD,
+                                   headers={'If-None-Match': etag})
+        self.assertNotEqual(etag, other.headers['ETag'])
+        self.assertEqual(200, compact.status_code)
+        self.assertNotEqual(etag, compact.headers['ETag'])
+
+    def test_actual_division(self):
+        heirs = self.client.post('/api/calculation/heirs', json={"family_structure": FAMILY_STRUCTURE}).get_json()
+        payload = {
+            "mode": "percentage", "total_amount": 100_000_000, "total_tax_amount": 3_200_000,
+            "heirs": heirs["result"]["legal_heirs"],
+            "percentages": {"spouse": 50, "child_1": 30, "child_2": 20}
+        }
+        first = self.client.post('/api/calculation/actual-division', json=payload)
+        self.assertEqual(200, first.status_code)
+        not_modified = self.client.post('/api/calculation/actual-division', json=payload,
+                                        headers={'If-None-Match': first.headers['ETag']})
+        self.assertEqual(304, not_modified.status_code)
+
+        changed = dict(payload, percentages={"spouse": 60, "child_1": 20, "child_2": 20})
+        self.assertNotEqual(first.headers['ETag'],
+                            self.client.post('/api/calculation/actual-division', json=changed).headers['ETag'])
+
+    def test_errors_are_not_cached(self):
+        response = self.client.post('/api/calculation/tax-amount', json=dict(TAX_AMOUNT_PAYLOAD, taxable_amount=0))
+        self.assertEqual(400, response.status_code)
+        self.assertNotIn('ETag', response.headers)
+        self.assertEqual(0, result_cache.stats()['size'])
+
+    def test_counters_are_exported(self):
+        self.client.post('/api/calculation/tax-amount', json=TAX_AMOUNT_PAYLOAD)
+        self.client.post('/api/calculation/tax-amount', json=TAX_AMOUNT_PAYLOAD)
+        body = self.client.get('/api/metrics').get_data(as_text=True)
+        self.assertIn('# TYPE inheritance_result_cache_hits_total counter', body)
+        self.assertIn('inheritance_result_cache_hits_total 1', body)
+        self.assertIn('inheritance_result_cache_not_modified_total 0', body)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
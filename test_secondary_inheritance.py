@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+二次相続シミュレーションのテスト
+"""
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'api'))
+
+from models.inheritance import DivisionInput, FamilyStructure
+from services.tax_calculator import InheritanceTaxCalculator
+from services.heir_cache import HeirCache
+from services.secondary_inheritance import SecondaryInheritanceSimulator
+
+FAMILY = FamilyStructure(
+    spouse_exists=True, children_count=2, adopted_children_count=0, grandchild_adopted_count=0,
+    parents_alive=0, grandparents_alive=0, siblings_count=0, half_siblings_count=0, non_heirs_count=0
+)
+
+
+class TestSecondaryInheritanceSimulator(unittest.TestCase):
+    def setUp(self):
+        self.calculator = InheritanceTaxCalculator()
+        self.simulator = SecondaryInheritanceSimulator(HeirCache(self.calculator), chunk_size=50)
+
+    def test_grid_point_matches_scalar_calculation(self):
+        taxable_amount = 400_000_000
+        result = self.simulator.simulate(FAMILY, taxable_amount, grid_points=11, spouse_own_assets=50_000_000)
+
+        heirs = self.calculator.determine_legal_heirs(FAMILY)
+        total_tax = self.calculator.calculate_tax_by_legal_share(taxable_amount, heirs).total_tax_amount
+        i = 6  # 配偶者60%
+        spouse_amount = 240_000_000
+        first = self.calculator.calculate_actual_division(DivisionInput(
+            mode='amount', total_amount=taxable_amount, heirs=heirs, total_tax_amount=total_tax,
+            amounts={"spouse": spouse_amount, "child_1": 80_000_000, "child_2": 80_000_000}
+        ))
+        self.assertEqual(spouse_amount, result.spouse_amounts[i])
+        self.assertEqual(first.total_tax_amount, result.first_taxes[i])
+
+        spouse_tax = next(d.final_tax_amount for d in first.heir_details if d.heir_id == "spouse")
+        second_estate = spouse_amount - spouse_tax + 50_000_000
+        self.assertEqual(second_estate, result.second_estates[i])
+        second_heirs = self.calculator.determine_legal_heirs(
+            FamilyStructure(**dict(FAMILY.__dict__, spouse_exists=False))
+        )
+        second = self.calculator.calculate_tax_by_legal_share(second_estate, second_heirs)
+        self.assertEqual(second.total_tax_amount, result.second_taxes[i])
+        self.assertEqual(first.total_tax_amount + second.total_tax_amount, result.combined_taxes[i])
+
+    def test_parallel_grid_matches_serial(self):
+        serial = self.simulator.simulate(FAMILY, 600_000_000, grid_points=1001, annual_growth_rate=0.02, years=10)
+        parallel = self.simulator.simulate(FAMILY, 600_000_000, grid_points=1001, annual_growth_rate=0.02,
+                                           years=10, workers=2)
+        np.testing.assert_array_equal(serial.combined_taxes, parallel.combined_taxes)
+        self.assertEqual(1001, len(serial.combined_taxes))
+
+    def test_optimum_is_interior_for_large_estate(self):
+        result = self.simulator.simulate(FAMILY, 1_000_000_000, grid_points=101)
+        self.assertLess(0, result.spouse_shares[result.best_index])
+        self.assertGreater(1, result.spouse_shares[result.best_index])
+
+    def test_requires_spouse(self):
+        with self.assertRaises(ValueError):
+            self.simulator.simulate(FamilyStructure(**dict(FAMILY.__dict__, spouse_exists=False)), 100_000_000)
+
+    def test_rejects_overflowing_second_estate(self):
+        for rate, years in ((10, 1000), (1, 80)):
+            with self.subTest(rate=rate, years=years), self.assertRaises(ValueError):
+                self.simulator.simulate(FAMILY, 100_000_000, grid_points=11, annual_growth_rate=rate, years=years)
+
+        result = self.simulator.simulate(FAMILY, 100_000_000, grid_points=11, annual_growth_rate=-1, years=5)
+        self.assertTrue((result.second_estates == 0).all())
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+モンテカルロ・シミュレーションのテスト
+"""
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'api'))
+
+from models.inheritance import DivisionInput, FamilyStructure
+from services.tax_calculator import InheritanceTaxCalculator
+from services.heir_cache import HeirCache
+from services.simulation import AssetDistribution, DivisionPolicy, MonteCarloSimulator
+
+FAMILY = FamilyStructure(
+    spouse_exists=True, children_count=2, adopted_children_count=0, grandchild_adopted_count=0,
+    parents_alive=0, grandparents_alive=0, siblings_count=0, half_siblings_count=0, non_heirs_count=1
+)
+
+ASSETS = [
+    AssetDistribution.from_dict({"name": "預金", "distribution": "fixed", "value": 80_000_000}),
+    AssetDistribution.from_dict({"name": "株式", "distribution": "lognormal", "mean": 120_000_000, "std": 40_000_000}),
+    AssetDistribution.from_dict({"name": "不動産", "distribution": "triangular",
+                                 "low": 50_000_000, "mode": 90_000_000, "high": 150_000_000}),
+]
+
+
+class TestMonteCarloSimulator(unittest.TestCase):
+    def setUp(self):
+        self.calculator = InheritanceTaxCalculator()
+        self.cache = HeirCache(self.calculator)
+        self.heirs = self.cache.get(FAMILY).heirs
+        self.curve = self.cache.get_tax_curve(FAMILY)
+
+    def test_samples_match_scalar_calculation(self):
+        percentages = {"spouse": 50, "child_1": 20, "child_2": 20, "non_heir_1": 10}
+        policy = DivisionPolicy.from_percentages(self.heirs, percentages)
+        simulator = MonteCarloSimulator(chunk_size=40)
+        result = simulator.simulate(ASSETS, self.heirs, self.curve, policy, sample_count=100, seed=3)
+
+        heirs = list(self.heirs)
+        for amount, legal_tax, final_tax in zip(result.taxable_amounts, result.legal_share_taxes, result.final_taxes):
+            amount = int(amount)
+            expected_legal = self.calculator.calculate_tax_by_legal_share(amount, heirs).total_tax_amount
+            self.assertEqual(expected_legal, legal_tax)
+            expected = self.calculator.calculate_actual_division(DivisionInput(
+                mode='percentage', total_amount=amount, heirs=heirs,
+                total_tax_amount=expected_legal, percentages=percentages
+            ))
+            self.assertEqual(expected.total_tax_amount, final_tax)
+
+    def test_seed_makes_result_independent_of_workers(self):
+        simulator = MonteCarloSimulator(chunk_size=5_000)
+        single = simulator.simulate(ASSETS, self.heirs, self.curve, sample_count=20_000, seed=42, workers=1)
+        pooled = simulator.simulate(ASSETS, self.heirs, self.curve, sample_count=20_000, seed=42, workers=2)
+        np.testing.assert_array_equal(single.final_taxes, pooled.final_taxes)
+
+    def test_summary(self):
+        fixed = [AssetDistribution.from_dict({"distribution": "fixed", "value": 40_000_000})]
+        result = MonteCarloSimulator().simulate(fixed, self.heirs, self.curve, sample_count=10, seed=1)
+        summary = result.summary()
+        self.assertEqual(10, summary["sample_count"])
+        self.assertEqual(0.0, summary["probability_of_tax"])
+        self.assertEqual(40_000_000, summary["taxable_amount"]["percentiles"]["50"])
+
+    def test_unknown_distribution(self):
+        with self.assertRaises(ValueError):
+            AssetDistribution.from_dict({"distribution": "cauchy"})
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
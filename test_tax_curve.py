@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+相続税総額の曲線 (TaxCurve) のテスト
+calculate_tax_by_legal_share と完全に一致することを検証
+"""
+import os
+import random
+import sys
+import unittest
+from datetime import date
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'api'))
+
+from models.inheritance import FamilyStructure
+from models.tax_schedule import schedule_for
+from services.tax_calculator import InheritanceTaxCalculator
+from services.heir_cache import HeirCache
+from services.tax_curve import TaxCurve
+
+
+def make_family(**overrides):
+    fs_data = {
+        "spouse_exists": False, "children_count": 0, "adopted_children_count": 0,
+        "grandchild_adopted_count": 0, "parents_alive": 0, "grandparents_alive": 0,
+        "siblings_count": 0, "half_siblings_count": 0, "non_heirs_count": 0
+    }
+    fs_data.update(overrides)
+    return FamilyStructure(**fs_data)
+
+
+FAMILIES = [
+    make_family(spouse_exists=True, children_count=3),
+    make_family(spouse_exists=True, parents_alive=2),
+    make_family(spouse_exists=True, siblings_count=3, half_siblings_count=2),
+    make_family(siblings_count=2, half_siblings_count=1, non_heirs_count=2),
+    make_family(spouse_exists=True),
+]
+
+
+class TestTaxCurve(unittest.TestCase):
+    def setUp(self):
+        self.calculator = InheritanceTaxCalculator()
+        self.cache = HeirCache(self.calculator)
+
+    def test_matches_scalar_path(self):
+        rng = random.Random(7)
+        for fs in FAMILIES:
+            heirs = self.calculator.determine_legal_heirs(fs)
+            curve = self.cache.get_tax_curve(fs)
+            amounts = [rng.randrange(0, 3_000_000_000) for _ in range(300)]
+            # 折れ点とその前後も検証
+            for point in curve.breakpoints:
+                amounts += [point - 1, point, point + 1]
+            amounts = [a for a in amounts if a > 0]
+            expected = [self.calculator.calculate_tax_by_legal_share(a, heirs).total_tax_amount for a in amounts]
+            self.assertEqual(expected, [curve.total_tax(a) for a in amounts])
+            self.assertEqual(expected, list(curve.total_tax_many(amounts)))
+
+    def test_segments_are_consistent(self):
+        curve = self.cache.get_tax_curve(FAMILIES[0])
+        segments = curve.segments()
+        self.assertEqual(curve.basic_deduction, segments[0].start_amount)
+        self.assertEqual(0, segments[0].tax_at_start)
+        for segment in segments:
+            self.assertEqual(curve.total_tax(segment.start_amount), segment.tax_at_start)
+        rates = [segment.marginal_rate for segment in segments]
+        self.assertEqual(sorted(rates), rates)
+
+    def test_other_schedule_version(self):
+        fs = FAMILIES[0]
+        heirs = self.calculator.determine_legal_heirs(fs)
+        inheritance_date = date(2014, 6, 1)
+        curve = self.cache.get_tax_curve(fs, inheritance_date)
+        self.assertIs(schedule_for(inheritance_date), curve.schedule)
+        for amount in (90_000_000, 250_000_000, 1_500_000_000):
+            expected = self.calculator.calculate_tax_by_legal_share(amount, heirs, inheritance_date)
+            self.assertEqual(expected.total_tax_amount, curve.total_tax(amount))
+
+    def test_no_taxable_heirs(self):
+        curve = TaxCurve([], 30_000_000)
+        self.assertEqual(0, curve.total_tax(100_000_000))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+コンパイル済み速算表 (TaxSchedule) のテスト
+"""
+import os
+import sys
+import unittest
+from datetime import date
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'api'))
+
+from models.inheritance import TAX_TABLE
+from models.tax_schedule import CURRENT_TAX_SCHEDULE, TAX_SCHEDULES, schedule_for
+
+
+# 国税庁が公表している相続税の速算表（上限額, 税率%, 控除額）。最後の区分は上限なし
+PUBLISHED_SCHEDULE_2015 = (
+    (10_000_000, 10, 0),
+    (30_000_000, 15, 500_000),
+    (50_000_000, 20, 2_000_000),
+    (100_000_000, 30, 7_000_000),
+    (200_000_000, 40, 17_000_000),
+    (300_000_000, 45, 27_000_000),
+    (600_000_000, 50, 42_000_000),
+    (None, 55, 72_000_000),
+)
+
+PUBLISHED_SCHEDULE_2003 = (
+    (10_000_000, 10, 0),
+    (30_000_000, 15, 500_000),
+    (50_000_000, 20, 2_000_000),
+    (100_000_000, 30, 7_000_000),
+    (300_000_000, 40, 17_000_000),
+    (None, 50, 47_000_000),
+)
+
+
+class TestTaxSchedule(unittest.TestCase):
+    def test_bracket_boundaries(self):
+        schedule = CURRENT_TAX_SCHEDULE
+        self.assertEqual(1_000_000, schedule.tax_for(10_000_000))
+        self.assertEqual(1_000_000, schedule.tax_for(10_000_001))
+        self.assertEqual(8_000_000, schedule.tax_for(50_000_000))
+        self.assertEqual(258_000_000, schedule.tax_for(600_000_000))
+        self.assertEqual(478_000_000, schedule.tax_for(1_000_000_000))
+        self.assertEqual(0, schedule.tax_for(0))
+
+    def test_matches_published_schedules(self):
+        for schedule, published in ((CURRENT_TAX_SCHEDULE, PUBLISHED_SCHEDULE_2015),
+                                    (TAX_SCHEDULES[0], PUBLISHED_SCHEDULE_2003)):
+            with self.subTest(version=schedule.version):
+                self.assertEqual(tuple(bound for bound, _, _ in published[:-1]), schedule.upper_bounds)
+                self.assertEqual(tuple(rate for _, rate, _ in published), schedule.rate_percents)
+                self.assertEqual(tuple(deduction for _, _, deduction in published), schedule.deductions)
+
+    def test_tax_amounts_by_hand(self):
+        # 取得金額 × 税率 − 控除額（1円未満切り捨て）を手計算した値
+        expected = {
+            30_000_000: 4_000_000,
+            30_000_001: 4_000_000,  # 6,000,000.2 − 2,000,000
+            100_000_000: 23_000_000,
+            200_000_000: 63_000_000,
+            300_000_000: 108_000_000,
+            12_345_678: 1_351_851,  # 1,851,851.7 − 500,000
+            123_456_789: 32_382_715,  # 49,382,715.6 − 17,000,000
+            777_777_777: 355_777_777,  # 427,777,777.35 − 72,000,000
+        }
+        for amount, tax in expected.items():
+            with self.subTest(amount=amount):
+                self.assertEqual(tax, CURRENT_TAX_SCHEDULE.tax_for(amount))
+
+        schedule_2003 = TAX_SCHEDULES[0]
+        self.assertEqual(103_000_000, schedule_2003.tax_for(300_000_000))
+        self.assertEqual(153_000_000, schedule_2003.tax_for(400_000_000))
+
+    def test_schedule_versions(self):
+        self.assertIs(CURRENT_TAX_SCHEDULE, schedule_for())
+        self.assertIs(TAX_SCHEDULES[-1], schedule_for(date(2025, 6, 30)))
+        self.assertIs(TAX_SCHEDULES[-1], schedule_for(date(2015, 1, 1)))
+        self.assertIs(TAX_SCHEDULES[0], schedule_for(date(2014, 12, 31)))
+        self.assertEqual(50_000_000 + 10_000_000 * 3, schedule_for(date(2014, 12, 31)).basic_deduction(3))
+        with self.assertRaises(ValueError):
+            schedule_for(date(2002, 12, 31))
+
+    def test_to_table_round_trip(self):
+        table = CURRENT_TAX_SCHEDULE.to_table()
+        self.assertEqual(len(TAX_TABLE), len(table))
+        self.assertIsNone(table[-1]["max_amount"])
+        for original, row in zip(TAX_TABLE[:-1], table[:-1]):
+            self.assertEqual(original, row)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)